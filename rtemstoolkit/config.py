@@ -91,6 +91,7 @@ class file(object):
         self.wss = re.compile(r'\s+')
         self.tags = re.compile(r':+')
         self.sf = re.compile(r'%\([^\)]+\)')
+        self._expand_used = None
         for arg in self.opts.args:
             if arg.startswith('--with-') or arg.startswith('--without-'):
                 label = arg[2:].lower().replace('-', '_')
@@ -222,7 +223,48 @@ class file(object):
                     raise error.general('shell macro failed: %s:%d: %s' % (s, exit_code, output))
         return line
 
+    def _used(self, name):
+        """Return the macro for a name and note the expansion used it."""
+        macro = self.macros.get(name)
+        if self._expand_used is not None:
+            self._expand_used[name] = macro
+        return macro
+
+    def _defined(self, name):
+        macro = self._used(name)
+        return macro is not None and macro[1] != 'undefine'
+
+    def _uncached(self):
+        """The expansion has a side effect so it cannot be cached."""
+        self._expand_used = None
+
     def _expand(self, s):
+        """Expand a string using the expansion cache. An expansion without
+        side effects is cached with the macros it used and is reused until one
+        of them changes."""
+        if self.ignores is not None:
+            return self._expand_macros(s)
+        used = self._expand_used
+        cached = self.macros.cached_expansion(s)
+        if cached is not None:
+            if used is not None:
+                used.update(cached[0])
+            return cached[1]
+        self._expand_used = {}
+        try:
+            e = self._expand_macros(s)
+        finally:
+            expand_used = self._expand_used
+            self._expand_used = used
+        if expand_used is None:
+            self._uncached()
+        else:
+            self.macros.cache_expansion(s, expand_used, e)
+            if used is not None:
+                used.update(expand_used)
+        return e
+
+    def _expand_macros(self, s):
         expand_count = 0
         expanded = True
         while expanded:
@@ -254,6 +296,7 @@ class file(object):
                     colon = m.find(':')
                     if colon < 8:
                         log.warning('malformed expand macro, no colon found')
+                        self._uncached()
                     else:
                         e = self._expand(m[colon + 1:-1].strip())
                         s = s.replace(m, e)
@@ -264,13 +307,14 @@ class file(object):
                     # Change the ' ' to '_' because the macros have no spaces.
                     #
                     n = self._label('with_' + m[7:-1].strip())
-                    if n in self.macros:
+                    if self._defined(n):
                         s = s.replace(m, '1')
                     else:
                         s = s.replace(m, '0')
                     expanded = True
                     mn = None
                 elif m.startswith('%{echo'):
+                    self._uncached()
                     if not m.endswith('}'):
                         log.warning("malformed conditional macro '%s'" % (m))
                         mn = None
@@ -282,7 +326,7 @@ class file(object):
                         mn = None
                 elif m.startswith('%{defined'):
                     n = self._label(m[9:-1].strip())
-                    if n in self.macros:
+                    if self._defined(n):
                         s = s.replace(m, '1')
                     else:
                         s = s.replace(m, '0')
@@ -297,6 +341,7 @@ class file(object):
                     if colon < 0:
                         if not m.endswith('}'):
                             log.warning("malformed conditional macro '%s'" % (m))
+                            self._uncached()
                             mn = None
                         else:
                             mn = self._label(m[start:-1])
@@ -305,7 +350,7 @@ class file(object):
                     if mn:
                         if m.startswith('%{?'):
                             istrue = False
-                            if mn in self.macros:
+                            if self._defined(mn):
                                 # If defined and 0 then it is false.
                                 istrue = _check_bool(self.macros[mn])
                                 if istrue is None:
@@ -318,7 +363,7 @@ class file(object):
                                 mn = '%{nil}'
                         else:
                             isfalse = True
-                            if mn in self.macros:
+                            if self._defined(mn):
                                 istrue = _check_bool(self.macros[mn])
                                 if istrue is None or istrue == True:
                                     isfalse = False
@@ -329,11 +374,14 @@ class file(object):
                             else:
                                 mn = '%{nil}'
                 if mn:
-                    if mn.lower() in self.macros:
+                    if self._defined(mn.lower()):
                         s = s.replace(m, self.macros[mn.lower()])
                         expanded = True
                     elif show_warning:
+                        self._uncached()
                         self._error("macro '%s' not found" % (mn))
+        if self.sf.search(s) is not None:
+            self._uncached()
         return self._shell(s)
 
     def _disable(self, config, ls):
@@ -36,9 +36,14 @@
 
 from __future__ import print_function
 
+import atexit
+import codecs
+import errno
 import functools
+import heapq
 import os
 import re
+import select
 import sys
 import subprocess
 import threading
@@ -62,6 +67,15 @@ trace_threads = False
 # Redefine the PIPE from subprocess
 PIPE = subprocess.PIPE
 
+# The size of a read from a process's stdout or stderr pipe.
+read_size = 64 * 1024
+
+# A clock that does not step if available.
+try:
+    _now = time.monotonic
+except AttributeError:
+    _now = time.time
+
 # Regular expression to find quotes.
 qstr = re.compile('[rR]?\'([^\\n\'\\\\]|\\\\.)*\'|[rR]?"([^\\n"\\\\]|\\\\.)*"')
 
@@ -110,6 +124,338 @@ def arg_subst_str(command, subst):
     def add(x, y): return x + ' ' + str(y)
     return functools.reduce(add, cmd, '')
 
+class _reader(object):
+    """Read the output of a process from a file handle and pass it to the
+    output handler a line at a time until the file closes. The reading is
+    performed by the I/O multiplexer if the host supports it else a thread
+    is created."""
+    def __init__(self, exe, fh, out, prefix = ''):
+        self.exe = exe
+        self.fh = fh
+        self.out = out
+        self.prefix = prefix
+        self.count = 0
+        self.line = ''
+        # str and bytes are the same type in Python2
+        if bytes is not str:
+            self.decoder = codecs.getincrementaldecoder(sys.stdout.encoding)('replace')
+        else:
+            self.decoder = None
+        self.finished = threading.Event()
+
+    def _output_line(self, line, count):
+        self.exe._outputting()
+        if self.out:
+            self.out(self.prefix + line)
+        else:
+            log.output(self.prefix + line)
+            if count > 10:
+                log.flush()
+
+    def _readthread(self):
+        if trace_threads:
+            print('execute:_readthread: start')
+        try:
+            while self.read():
+                pass
+        except:
+            if trace_threads:
+                print('execute:_readthread: exception')
+                print(traceback.format_exc())
+            self.close()
+            raise
+        if trace_threads:
+            print('execute:_readthread: finished')
+
+    def start(self, name):
+        mux = _io_mux.get()
+        if mux is not None:
+            mux.add(self)
+        else:
+            thread = threading.Thread(target = self._readthread,
+                                      name = name)
+            thread.daemon = True
+            thread.start()
+
+    def read(self):
+        """Read the available data and output any complete lines. Return False
+        when the file has closed."""
+        data = os.read(self.fh.fileno(), read_size)
+        eof = len(data) == 0
+        if self.decoder is not None:
+            data = self.decoder.decode(data, eof)
+        lines = (self.line + data).split('\n')
+        self.line = lines.pop()
+        for l in lines:
+            self.count += 1
+            self._output_line(l + '\n', self.count)
+            if self.count > 10:
+                self.count = 0
+        if eof:
+            self.close()
+            return False
+        return True
+
+    def close(self):
+        if self.finished.is_set():
+            return
+        try:
+            self.fh.close()
+        except:
+            pass
+        try:
+            if len(self.line):
+                self._output_line(self.line, 100)
+        finally:
+            self.line = ''
+            self.finished.set()
+
+    def join(self, timeout):
+        self.finished.wait(timeout)
+
+class _io_mux(object):
+    """Multiplex the stdout and stderr pipes of all processes on a single
+    thread. The thread is created when first used and runs until the program
+    exits. A forked process does not have the thread so it creates its own
+    multiplexer. Hosts without poll support for pipes, for example Windows,
+    return None and a thread is created for each pipe."""
+
+    _lock = threading.Lock()
+    _mux = None
+
+    @staticmethod
+    def get():
+        if not hasattr(select, 'poll'):
+            return None
+        _io_mux._lock.acquire()
+        try:
+            if _io_mux._mux is None or _io_mux._mux.pid != os.getpid():
+                _io_mux._mux = _io_mux()
+        finally:
+            _io_mux._lock.release()
+        return _io_mux._mux
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.readers = {}
+        self.pending = []
+        self.poller = select.poll()
+        self.wake_read, self.wake_write = os.pipe()
+        self.poller.register(self.wake_read, select.POLLIN)
+        self.thread = threading.Thread(target = self._run, name = '_io_mux')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _wake(self):
+        os.write(self.wake_write, b'.')
+
+    def _add_pending(self):
+        self.lock.acquire()
+        try:
+            pending = self.pending
+            self.pending = []
+        finally:
+            self.lock.release()
+        for reader in pending:
+            fd = reader.fh.fileno()
+            self.readers[fd] = reader
+            self.poller.register(fd, select.POLLIN | select.POLLPRI)
+
+    def _remove(self, fd):
+        try:
+            self.poller.unregister(fd)
+        except:
+            pass
+        del self.readers[fd]
+
+    def _run(self):
+        if trace_threads:
+            print('execute:_io_mux: start')
+        while True:
+            try:
+                events = self.poller.poll()
+            except (select.error, OSError, IOError) as err:
+                if err.args[0] == errno.EINTR:
+                    continue
+                raise
+            for fd, event in events:
+                if fd == self.wake_read:
+                    os.read(self.wake_read, read_size)
+                    self._add_pending()
+                    continue
+                if fd not in self.readers:
+                    continue
+                reader = self.readers[fd]
+                try:
+                    if event & select.POLLNVAL:
+                        reader.close()
+                        reading = False
+                    else:
+                        reading = reader.read()
+                except:
+                    if trace_threads:
+                        print('execute:_io_mux: exception')
+                        print(traceback.format_exc())
+                    try:
+                        reader.close()
+                    except:
+                        pass
+                    reading = False
+                if not reading:
+                    self._remove(fd)
+
+    def add(self, reader):
+        self.lock.acquire()
+        try:
+            self.pending += [reader]
+        finally:
+            self.lock.release()
+        self._wake()
+
+class _timer(object):
+    """A timeout. The deadline is moved out by the interval each time the
+    timer is reset. A timer with a limit times out when the limit has passed
+    since it was started even if it is reset."""
+    def __init__(self, interval, function, limit = None):
+        self.function = function
+        self.cancelled = False
+        self.entry = None
+        self.start(interval, limit)
+
+    def start(self, interval, limit = None):
+        self.interval = interval
+        self.limit = limit
+        now = _now()
+        if limit is None:
+            self.end = None
+        else:
+            self.end = now + limit
+        self.reset()
+
+    def reset(self):
+        deadline = _now() + self.interval
+        if self.end is not None and deadline > self.end:
+            deadline = self.end
+        self.deadline = deadline
+
+    def cancel(self):
+        self.cancelled = True
+
+class _timers(object):
+    """Manage the timeouts of all processes on a single thread. The timers are
+    held in a heap ordered by deadline. A reset only moves a timer's deadline
+    and the timer is pushed back into the heap when its old deadline
+    reaches the top. The thread is created when first used and a forked
+    process creates its own."""
+
+    _lock = threading.Lock()
+    _timers = None
+
+    @staticmethod
+    def get():
+        _timers._lock.acquire()
+        try:
+            if _timers._timers is None or _timers._timers.pid != os.getpid():
+                _timers._timers = _timers()
+        finally:
+            _timers._lock.release()
+        return _timers._timers
+
+    @staticmethod
+    def stop_at_exit():
+        # Stop the thread before the interpreter tears down the modules it
+        # uses.
+        timers = _timers._timers
+        if timers is not None and timers.pid == os.getpid():
+            timers.cond.acquire()
+            try:
+                timers.running = False
+                timers.cond.notify()
+            finally:
+                timers.cond.release()
+            timers.thread.join()
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.cond = threading.Condition()
+        self.heap = []
+        self.count = 0
+        self.running = True
+        self.thread = threading.Thread(target = self._run, name = '_timers')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _push(self, timer):
+        # The count orders timers with the same deadline and identifies the
+        # timer's current entry. A restarted timer leaves a stale entry.
+        self.count += 1
+        timer.entry = self.count
+        heapq.heappush(self.heap, (timer.deadline, self.count, timer))
+
+    def _run(self):
+        if trace_threads:
+            print('execute:_timers: start')
+        self.cond.acquire()
+        try:
+            while self.running:
+                if len(self.heap) == 0:
+                    self.cond.wait()
+                    continue
+                deadline, count, timer = self.heap[0]
+                if timer.cancelled or count != timer.entry:
+                    heapq.heappop(self.heap)
+                    continue
+                if timer.deadline > deadline:
+                    heapq.heappop(self.heap)
+                    self._push(timer)
+                    continue
+                now = _now()
+                if deadline > now:
+                    self.cond.wait(deadline - now)
+                    continue
+                heapq.heappop(self.heap)
+                timer.cancelled = True
+                self.cond.release()
+                try:
+                    timer.function()
+                except:
+                    if trace_threads:
+                        print('execute:_timers: exception')
+                        print(traceback.format_exc())
+                finally:
+                    self.cond.acquire()
+        finally:
+            self.cond.release()
+
+    def add(self, interval, function, limit = None):
+        """Call the function after the interval in seconds unless the timer
+        is cancelled or reset. The interval can be a fraction of a second. A
+        limit in seconds is the longest time to wait however often the timer
+        is reset."""
+        timer = _timer(interval, function, limit)
+        self.cond.acquire()
+        try:
+            self._push(timer)
+            self.cond.notify()
+        finally:
+            self.cond.release()
+        return timer
+
+    def restart(self, timer, interval, limit = None):
+        """Start a timer again with a new interval and limit. The new deadline
+        can be earlier so the timer is given a new entry."""
+        self.cond.acquire()
+        try:
+            if not timer.cancelled:
+                timer.start(interval, limit)
+                self._push(timer)
+                self.cond.notify()
+        finally:
+            self.cond.release()
+
+atexit.register(_timers.stop_at_exit)
+
 class execute(object):
     """Execute commands or scripts. The 'output' is a funtion that handles the
     output from the process. The 'input' is a function that blocks and returns
@@ -126,14 +472,13 @@ class execute(object):
         self.shell_commands = False
         self.path = None
         self.environment = None
-        self.outputting = False
-        self.timing_out = False
+        self.timer = None
         self.proc = None
 
     def capture(self, proc, command = 'pipe', timeout = None):
-        """Create 3 threads to read stdout and stderr and send to the output handler
-        and call an input handler is provided. Based on the 'communicate' code
-        in the subprocess module."""
+        """Read stdout and stderr and send to the output handler and create a
+        thread to call an input handler if provided. Based on the 'communicate'
+        code in the subprocess module."""
         def _writethread(exe, fh, input):
             """Call the input handler and write it to the stdin. The input handler should
             block and return None or False if this thread is to exit and True if this
@@ -173,102 +518,29 @@ class execute(object):
             if trace_threads:
                 print('execute:_writethread: finished')
 
-        def _readthread(exe, fh, out, prefix = ''):
-            """Read from a file handle and write to the output handler
-            until the file closes."""
-            def _output_line(line, exe, prefix, out, count):
-                #exe.lock.acquire()
-                #exe.outputting = True
-                #exe.lock.release()
-                if out:
-                    out(prefix + line)
-                else:
-                    log.output(prefix + line)
-                    if count > 10:
-                        log.flush()
-
-            if trace_threads:
-                print('execute:_readthread: start')
-            count = 0
-            line = ''
-            try:
-                while True:
-                    data = fh.read(1)
-                    if len(data) == 0:
-                        break
-                    # str and bytes are the same type in Python2
-                    if type(data) is not str and type(data) is bytes:
-                        data = data.decode(sys.stdout.encoding)
-                    for c in data:
-                        line += c
-                        if c == '\n':
-                            count += 1
-                            _output_line(line, exe, prefix, out, count)
-                            if count > 10:
-                                count = 0
-                            line = ''
-            except:
-                raise
-                if trace_threads:
-                    print('execute:_readthread: exception')
-                    print(traceback.format_exc())
-                pass
+        def _timedout(proc, function):
+            """The process has not produced output for the timeout interval
+            or has reached the timeout's limit."""
             try:
-                fh.close()
+                proc.kill()
             except:
                 pass
-            if len(line):
-                _output_line(line, exe, prefix, out, 100)
-            if trace_threads:
-                print('execute:_readthread: finished')
-
-        def _timerthread(exe, interval, function):
-            """Timer thread is used to timeout a process if no output is
-            produced for the timeout interval."""
-            count = interval
-            while exe.timing_out:
-                time.sleep(1)
-                if count > 0:
-                    count -= 1
-                exe.lock.acquire()
-                if exe.outputting:
-                    count = interval
-                    exe.outputting = False
-                exe.lock.release()
-                if count == 0:
-                    try:
-                        proc.kill()
-                    except:
-                        pass
-                    else:
-                        function()
-                    break
+            else:
+                function()
 
         name = os.path.basename(command[0])
 
         stdin_thread = None
-        stdout_thread = None
-        stderr_thread = None
-        timeout_thread = None
+        stdout_reader = None
+        stderr_reader = None
 
         if proc.stdout:
-            stdout_thread = threading.Thread(target = _readthread,
-                                             name = '_stdout[%s]' % (name),
-                                             args = (self,
-                                                     proc.stdout,
-                                                     self.output,
-                                                     ''))
-            stdout_thread.daemon = True
-            stdout_thread.start()
+            stdout_reader = _reader(self, proc.stdout, self.output)
+            stdout_reader.start('_stdout[%s]' % (name))
         if proc.stderr:
-            stderr_thread = threading.Thread(target = _readthread,
-                                             name = '_stderr[%s]' % (name),
-                                             args = (self,
-                                                     proc.stderr,
-                                                     self.output,
-                                                     self.error_prefix))
-            stderr_thread.daemon = True
-            stderr_thread.start()
+            stderr_reader = _reader(self, proc.stderr, self.output,
+                                    self.error_prefix)
+            stderr_reader.start('_stderr[%s]' % (name))
         if self.input and proc.stdin:
             stdin_thread = threading.Thread(target = _writethread,
                                             name = '_stdin[%s]' % (name),
@@ -278,14 +550,14 @@ class execute(object):
             stdin_thread.daemon = True
             stdin_thread.start()
         if timeout:
-            self.timing_out = True
-            timeout_thread = threading.Thread(target = _timerthread,
-                                              name = '_timeout[%s]' % (name),
-                                              args = (self,
-                                                      timeout[0],
-                                                      timeout[1]))
-            timeout_thread.daemon = True
-            timeout_thread.start()
+            limit = None
+            if len(timeout) > 2:
+                limit = timeout[2]
+            self.timer = _timers.get().add(timeout[0],
+                                           functools.partial(_timedout,
+                                                             proc,
+                                                             timeout[1]),
+                                           limit)
         try:
             self.lock.acquire()
             try:
@@ -308,15 +580,15 @@ class execute(object):
                 self.lock.release()
             if self.cleanup:
                 self.cleanup(proc)
-            if timeout_thread:
-                self.timing_out = False
-                timeout_thread.join(10)
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
             if stdin_thread:
                 stdin_thread.join(2)
-            if stdout_thread:
-                stdout_thread.join(2)
-            if stderr_thread:
-                stderr_thread.join(2)
+            if stdout_reader:
+                stdout_reader.join(2)
+            if stderr_reader:
+                stderr_reader.join(2)
         return exitcode
 
     def open(self, command, capture = True, shell = False,
@@ -324,7 +596,9 @@ class execute(object):
              stdin = None, stdout = None, stderr = None,
              timeout = None):
         """Open a command with arguments. Provide the arguments as a list or
-        a string."""
+        a string. The timeout is a tuple of the interval the process can be
+        without output, the function called if it times out and an optional
+        limit on the process's run time."""
         if self.verbose:
             s = command
             if type(command) is list:
@@ -436,6 +710,19 @@ class execute(object):
         as Cygwin or MSYS. This may cause piping to fail."""
         self.shell_commands = True
 
+    def _outputting(self):
+        """The process has output data so restart the timeout."""
+        timer = self.timer
+        if timer is not None:
+            timer.reset()
+
+    def restart_timeout(self, interval, limit = None):
+        """Restart the running process's timeout with a new interval and
+        limit."""
+        timer = self.timer
+        if timer is not None:
+            _timers.get().restart(timer, interval, limit)
+
     def set_output(self, output):
         """Set the output handler. The stdout of the last process in a pipe
         line is passed to this handler."""
@@ -528,6 +815,33 @@ class capture_execution(execute):
         raise error.general('output capture cannot be overrided')
 
 if __name__ == "__main__":
+    def read_benchmark(size = 16 * 1024 * 1024, line_size = 80):
+        """Measure the rate output is read from a process and passed to the
+        output handler a line at a time."""
+        class _counter:
+            def __init__(self):
+                self.lines = 0
+                self.size = 0
+            def handler(self, text):
+                self.lines += 1
+                self.size += len(text)
+        blocks = size // (line_size * 1024)
+        script = 'import sys\n' + \
+                 'l = \'%s\\n\' * 1024\n' % ('x' * (line_size - 1)) + \
+                 'for b in range(%d): sys.stdout.write(l)\n' % (blocks)
+        counter = _counter()
+        e = execute(output = counter.handler)
+        start = time.time()
+        e.spawn([sys.executable, '-c', script])
+        elapsed = time.time() - start
+        print('read benchmark: %d lines, %.1f MB in %.2f secs: %.2f MB/s' % \
+              (counter.lines, counter.size / 1e6, elapsed,
+               counter.size / 1e6 / elapsed))
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+        read_benchmark()
+        sys.exit(0)
+
     def run_tests(e, commands, use_shell):
         for c in commands['shell']:
             e.shell(c)
@@ -34,6 +34,8 @@
 
 from __future__ import print_function
 
+import atexit
+import collections
 import os
 import sys
 import threading
@@ -67,6 +69,19 @@ def set_default_once(log):
     if default is None:
         default = log
 
+def _print(text, file = None):
+    """Print the lines of text as a single write."""
+    text = text.replace(chr(13), '').splitlines()
+    if len(text):
+        if file is None and default is not None and default.has_writer():
+            default.stdout('\n'.join(text) + '\n')
+        else:
+            lock.acquire()
+            try:
+                print('\n'.join(text), file = file)
+            finally:
+                lock.release()
+
 def _output(text = os.linesep, log = None):
     """Output the text to a log if provided else send it to stdout."""
     if text is None:
@@ -81,16 +96,10 @@ def _output(text = os.linesep, log = None):
     elif default is not None:
         default.output(text)
     else:
-        lock.acquire()
-        for l in text.replace(chr(13), '').splitlines():
-            print(l)
-        lock.release()
+        _print(text)
 
 def stderr(text = os.linesep, log = None):
-    lock.acquire()
-    for l in text.replace(chr(13), '').splitlines():
-        print(l, file = sys.stderr)
-    lock.release()
+    _print(text, file = sys.stderr)
 
 def output(text = os.linesep, log = None):
     if not quiet:
@@ -99,10 +108,7 @@ def output(text = os.linesep, log = None):
 def notice(text = os.linesep, log = None, stdout_only = False):
     if not quiet and \
             (default is not None and not default.has_stdout() or stdout_only):
-        lock.acquire()
-        for l in text.replace(chr(13), '').splitlines():
-            print(l)
-        lock.release()
+        _print(text)
     if not stdout_only:
         _output(text, log)
 
@@ -120,12 +126,23 @@ def flush(log = None):
     elif default is not None:
         default.flush()
 
+def _flush_at_exit():
+    if default is not None:
+        default.stop_writer()
+
+atexit.register(_flush_at_exit)
+
 class log:
-    """Log output to stdout or a file."""
+    """Log output to stdout or a file. The output can be written by a
+    background writer thread that batches the writes and flushes the files
+    periodically. A flush waits for the writer to write all queued output."""
+
     def __init__(self, streams = None, tail_size = 100):
         self.lock = threading.Lock()
-        self.tail = []
+        self.tail = collections.deque(maxlen = tail_size)
         self.tail_size = tail_size
+        self.writer = None
+        self.writer_pid = None
         self.fhs = [None, None]
         if streams:
             for s in streams:
@@ -145,17 +162,164 @@ class log:
             self.fhs[f].close()
 
     def __str__(self):
-        t = ''
-        for tl in self.tail:
-            t += tl + os.linesep
-        return t[:-len(os.linesep)]
+        return os.linesep.join(self.tail)
 
     def _tail(self, text):
         if type(text) is not list:
             text = text.splitlines()
-        self.tail += text
-        if len(self.tail) > self.tail_size:
-            self.tail = self.tail[-self.tail_size:]
+        self.tail.extend(text)
+
+    def _write(self, out):
+        for f in range(0, len(self.fhs)):
+            if self.fhs[f] is not None:
+                self.fhs[f].write(out)
+
+    def _flush(self):
+        for f in range(0, len(self.fhs)):
+            if self.fhs[f] is not None:
+                self.fhs[f].flush()
+
+    def _put(self, entry):
+        """Queue the entry for the writer. Return False if the writer is
+        stopping, once it has stopped, so the caller writes the entry."""
+        self.writer_cond.acquire()
+        try:
+            while len(self.writer_entries) >= self.writer_size and \
+                  self.writer_error is None and not self.writer_stopping:
+                self.writer_cond.wait()
+            if self.writer_error is not None:
+                raise self.writer_error
+            if self.writer_stopping:
+                while not self.writer_stopped:
+                    self.writer_cond.wait()
+                return False
+            self.writer_entries.append(entry)
+            if self.writer_waiting:
+                self.writer_cond.notify_all()
+            return True
+        finally:
+            self.writer_cond.release()
+
+    def _get(self, timeout):
+        self.writer_cond.acquire()
+        try:
+            if len(self.writer_entries) == 0:
+                self.writer_waiting = True
+                self.writer_cond.wait(timeout)
+                self.writer_waiting = False
+            entries = list(self.writer_entries)
+            self.writer_entries.clear()
+            self.writer_cond.notify_all()
+        finally:
+            self.writer_cond.release()
+        return entries
+
+    def _writer(self, flush_interval, flush_size):
+        barriers = []
+        try:
+            self._writer_loop(flush_interval, flush_size, barriers)
+        except Exception as e:
+            #
+            # A write failed, for example stdout is a closed pipe. Record the
+            # error so it is raised in the threads producing output and
+            # release anyone waiting on the writer.
+            #
+            self.writer_cond.acquire()
+            try:
+                self.writer_error = e
+                for entry in self.writer_entries:
+                    if type(entry) is tuple and entry[0] == 'flush':
+                        barriers += [entry[1]]
+                self.writer_entries.clear()
+                self.writer_cond.notify_all()
+            finally:
+                self.writer_cond.release()
+            for b in barriers:
+                b.set()
+        self.writer_cond.acquire()
+        try:
+            self.writer_stopped = True
+            self.writer_cond.notify_all()
+        finally:
+            self.writer_cond.release()
+
+    def _writer_loop(self, flush_interval, flush_size, barriers):
+        pending = 0
+        running = True
+        while running:
+            if pending:
+                entries = self._get(flush_interval)
+            else:
+                entries = self._get(None)
+            out = []
+            barriers += [e[1] for e in entries
+                         if type(e) is tuple and e[0] == 'flush']
+            stdout = False
+            self.lock.acquire()
+            try:
+                for entry in entries:
+                    if entry is None:
+                        running = False
+                    elif type(entry) is tuple:
+                        if entry[0] == 'stdout':
+                            if len(out):
+                                self._write(''.join(out))
+                                out = []
+                            sys.stdout.write(entry[1])
+                            stdout = True
+                    else:
+                        out += [entry]
+                        pending += len(entry)
+                if len(out):
+                    self._write(''.join(out))
+                if not running or len(barriers) or len(entries) == 0 or \
+                   pending >= flush_size:
+                    self._flush()
+                    pending = 0
+                if stdout:
+                    sys.stdout.flush()
+            finally:
+                self.lock.release()
+            for b in barriers:
+                b.set()
+            del barriers[:]
+
+    def has_writer(self):
+        return self.writer is not None and self.writer_pid == os.getpid()
+
+    def start_writer(self, queue_size = 1000, flush_interval = 0.5, flush_size = 64 * 1024):
+        """Start a background writer thread. The queue is bounded and output
+        blocks when it is full. The files are flushed after the flush interval
+        in seconds or when the flush size of output has been written."""
+        if self.writer is None:
+            self.writer_cond = threading.Condition()
+            self.writer_entries = collections.deque()
+            self.writer_size = queue_size
+            self.writer_waiting = False
+            self.writer_error = None
+            self.writer_stopping = False
+            self.writer_stopped = False
+            self.writer_pid = os.getpid()
+            self.writer = threading.Thread(target = self._writer,
+                                           name = '_log_writer',
+                                           args = (flush_interval, flush_size))
+            self.writer.daemon = True
+            self.writer.start()
+
+    def stop_writer(self):
+        """Write all queued output and stop the background writer. Output
+        from other threads once the writer is stopping is written directly
+        after the writer has stopped."""
+        if self.has_writer():
+            self.writer_cond.acquire()
+            try:
+                self.writer_stopping = True
+                self.writer_entries.append(None)
+                self.writer_cond.notify_all()
+            finally:
+                self.writer_cond.release()
+            self.writer.join()
+        self.writer = None
 
     def has_stdout(self):
         return self.fhs[0] is not None
@@ -168,25 +332,40 @@ class log:
         # Reformat the text to have local line types.
         text = text.replace(chr(13), '').splitlines()
         self._tail(text)
-        out = ''
-        for l in text:
-            out += l + os.linesep
-        self.lock.acquire()
-        try:
-            for f in range(0, len(self.fhs)):
-                if self.fhs[f] is not None:
-                    self.fhs[f].write(out)
-            self.flush()
-        except:
-            raise
-        finally:
-            self.lock.release()
+        if len(text):
+            out = os.linesep.join(text) + os.linesep
+        else:
+            out = ''
+        if not self.has_writer() or not self._put(out):
+            self.lock.acquire()
+            try:
+                self._write(out)
+                self._flush()
+            finally:
+                self.lock.release()
+
+    def stdout(self, text):
+        """Output the text to stdout only and in order with the logs."""
+        if not self.has_writer() or not self._put(('stdout', text)):
+            lock.acquire()
+            try:
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            finally:
+                lock.release()
 
     def flush(self):
-        """Flush the output."""
-        for f in range(0, len(self.fhs)):
-            if self.fhs[f] is not None:
-                self.fhs[f].flush()
+        """Flush the output. If there is a background writer wait until all
+        queued output has been written."""
+        barrier = threading.Event()
+        if self.has_writer() and self._put(('flush', barrier)):
+            barrier.wait()
+        else:
+            self.lock.acquire()
+            try:
+                self._flush()
+            finally:
+                self.lock.release()
 
 if __name__ == "__main__":
     l = log(['stdout', 'log.txt'], tail_size = 20)
@@ -35,10 +35,13 @@
 from __future__ import print_function
 
 import copy
+import hashlib
 import inspect
-import re
+import itertools
 import os
-import string
+import pickle
+import re
+import sys
 
 #
 # Support to handle use in a package and as a unit test.
@@ -53,6 +56,34 @@ except (ValueError, SystemError):
     import log
     import path
 
+#
+# The path to cache the parsed macro files. Set to None to disable the cache.
+#
+if 'XDG_CACHE_HOME' in os.environ:
+    cache_path = os.path.join(os.environ['XDG_CACHE_HOME'], 'rtems-tools', 'macros')
+elif 'HOME' in os.environ:
+    cache_path = os.path.join(os.environ['HOME'], '.cache', 'rtems-tools', 'macros')
+else:
+    cache_path = None
+
+#
+# The number of expansions held in the expansion cache.
+#
+expansion_cache_size = 4096
+
+#
+# Every change to a macro table gets a new generation.
+#
+_generations = itertools.count(1)
+
+#
+# Macro file parsing.
+#
+_parse_space = re.compile(r'\s*')
+_parse_map = re.compile(r'\[([^\]\s#]*)\]')
+_parse_directive = re.compile(r'%include\s')
+_parse_macro = re.compile(r"([^\s:\[%#]*)\s*:\s*([^\s,#]*)\s*,\s*([^\s,#]*)\s*,[^'\n]*'")
+
 #
 # Macro tables
 #
@@ -92,7 +123,14 @@ class macros:
     def __init__(self, name = None, original = None, rtdir = '.'):
         self.files = []
         self.macro_filter = re.compile(r'%{[^}]+}')
+        self._index = None
+        self._index_shared = False
+        self._keys = None
+        self._read_map_names = None
+        self._shared = set()
+        self.generation = next(_generations)
         if original is None:
+            self._expansions = {}
             self.macros = {}
             self.read_maps = []
             self.read_map_locked = False
@@ -113,12 +151,19 @@ class macros:
                                                path.abspath(self.expand(rtdir)))
             self.macros['global']['_rttop'] = ('dir', 'required', self.prefix)
         else:
-            self.macros = {}
-            for m in original.macros:
-                if m not in self.macros:
-                    self.macros[m] = {}
-                for k in original.macros[m]:
-                    self.macros[m][k] = copy.copy(original.macros[m][k])
+            #
+            # The maps and the index are shared with the original until one of
+            # them writes to a map. The macro tuples are immutable.
+            #
+            self.macros = dict(original.macros)
+            self._shared = set(self.macros)
+            original._shared = set(original.macros)
+            self._index = original._index
+            self._index_shared = original._index_shared = True
+            self._keys = original._keys
+            self._read_map_names = original._read_map_names
+            self.generation = original.generation
+            self._expansions = original._expansions
             self.read_maps = sorted(copy.copy(original.read_maps))
             self.read_map_locked = copy.copy(original.read_map_locked)
             self.write_map = copy.copy(original.write_map)
@@ -217,7 +262,9 @@ class macros:
             raise TypeError('bad value tuple (attrib field): %s' % (value[1]))
         if value[1] == 'convert':
             value = self.expand(value)
-        self.macros[self.write_map][self.key_filter(key)] = value
+        key = self.key_filter(key)
+        self._writable(self.write_map)[key] = value
+        self._index_key(key)
 
     def __delitem__(self, key):
         self.undefine(key)
@@ -228,176 +275,241 @@ class macros:
     def __len__(self):
         return len(list(self.keys()))
 
+    def _writable(self, map):
+        """Return a map that can be written to. A map shared with a copy is
+        copied on the first write."""
+        if map in self._shared:
+            self.macros[map] = dict(self.macros[map])
+            self._shared.discard(map)
+        return self.macros[map]
+
+    def _resolved(self):
+        """Return the index of the resolved macros. A key resolves to the
+        macro in the first read map that has it else the global map. The
+        index is rebuilt when the maps are loaded or the read maps change."""
+        if self._index is None:
+            index = dict(self.macros['global'])
+            for rm in reversed(self.get_read_maps()):
+                index.update(self.macros[rm])
+            self._index = index
+            self._index_shared = False
+        return self._index
+
+    def _index_key(self, key):
+        """Update the index for a key that has been set or deleted."""
+        self._keys = None
+        self.generation = next(_generations)
+        if self._index is not None:
+            if self._index_shared:
+                self._index = dict(self._index)
+                self._index_shared = False
+            for rm in self.get_read_maps():
+                if key in self.macros[rm]:
+                    self._index[key] = self.macros[rm][key]
+                    return
+            if key in self.macros['global']:
+                self._index[key] = self.macros['global'][key]
+            elif key in self._index:
+                del self._index[key]
+
+    def _index_invalidate(self):
+        self._index = None
+        self._keys = None
+        self.generation = next(_generations)
+
     def keys(self):
-        keys = list(self.macros['global'].keys())
-        for rm in self.get_read_maps():
-            for mk in self.macros[rm]:
-                if self.macros[rm][mk][1] == 'undefine':
-                    if mk in keys:
-                        keys.remove(mk)
-                else:
-                    keys.append(mk)
-        return sorted(set(keys))
+        if self._keys is None:
+            self._keys = sorted([k for k, v in self._resolved().items() \
+                                 if v[1] != 'undefine'])
+        return list(self._keys)
 
     def has_key(self, key):
         if type(key) is not str:
             raise TypeError('bad key type (want str): %s' % (type(key)))
-        if self.key_filter(key) not in list(self.keys()):
-            return False
-        return True
+        macro = self._resolved().get(self.key_filter(key))
+        return macro is not None and macro[1] != 'undefine'
+
+    def cached_expansion(self, s):
+        """Return the cached expansion of a string as the macros it used and
+        the expanded string. None is returned if there is no expansion or a
+        macro it used has changed. The cache is shared with copies."""
+        entry = self._expansions.get(s)
+        if entry is None:
+            return None
+        generation, used, expanded = entry
+        if generation != self.generation:
+            index = self._resolved()
+            for key in used:
+                if index.get(self.key_filter(key)) != used[key]:
+                    return None
+            self._expansions[s] = (self.generation, used, expanded)
+        return used, expanded
+
+    def cache_expansion(self, s, used, expanded):
+        """Cache the expansion of a string. The used argument is a dict of
+        the macros the expansion looked up and the macro found or None."""
+        if len(self._expansions) >= expansion_cache_size:
+            self._expansions.clear()
+        self._expansions[s] = (self.generation, used, expanded)
 
     def maps(self):
         return self.macros.keys()
 
     def get_read_maps(self):
-        return [rm[5:] for rm in self.read_maps]
+        if self._read_map_names is None:
+            self._read_map_names = [rm[5:] for rm in self.read_maps]
+        return self._read_map_names
 
     def key_filter(self, key):
-        if key.startswith('%{') and key[-1] is '}':
+        if key.startswith('%{') and key[-1] == '}':
             key = key[2:-1]
         return key.lower()
 
-    def parse(self, lines):
+    def _parse(self, lines):
+        """Parse the lines of a macro file into a list of records. A record
+        is a map, a macro or an include. The records only depend on the lines
+        so they can be cached."""
 
         def _clean(l):
             if '#' in l:
                 l = l[:l.index('#')]
             if '\r' in l:
-                l = l[:l.index('r')]
+                l = l[:l.index('\r')]
             if '\n' in l:
                 l = l[:l.index('\n')]
             return l.strip()
 
-        trace_me = False
-        if trace_me:
-            print('[[[[]]]] parsing macros')
-        orig_macros = copy.copy(self.macros)
-        map = 'global'
+        if type(lines) is str:
+            lines = lines.splitlines(True)
+        records = []
         lc = 0
-        state = 'key'
-        token = ''
-        macro = []
+        macro = None
+        value = None
         for l in lines:
             lc += 1
-            #print 'l:%s' % (l[:-1])
             if len(l) == 0:
                 continue
-            l_remaining = l
-            for c in l:
-                if trace_me:
-                    print(']]]]]]]] c:%s(%d) s:%s t:"%s" m:%r M:%s' % \
-                        (c, ord(c), state, token, macro, map))
-                l_remaining = l_remaining[1:]
-                if c is '#' and not state.startswith('value'):
+            pos = 0
+            if value is not None:
+                end = l.find("\'\'\'")
+                if end < 0:
+                    value += [l]
+                    continue
+                value += [l[:end]]
+                records += [('macro', macro[0], (macro[1], macro[2], ''.join(value)))]
+                macro = None
+                value = None
+                pos = end + 3
+            while True:
+                m = _parse_space.match(l, pos)
+                pos = m.end()
+                if pos == len(l) or l[pos] == '#':
                     break
-                if c == '\n' or c == '\r':
-                    if not (state is 'key' and len(token) == 0) and \
-                            not state.startswith('value-multiline'):
-                        self.macros = orig_macros
-                        raise error.general('malformed macro line:%d: %s' % (lc, l))
-                if state is 'key':
-                    if c not in string.whitespace:
-                        if c is '[':
-                            state = 'map'
-                        elif c is '%':
-                            state = 'directive'
-                        elif c is ':':
-                            macro += [token]
-                            token = ''
-                            state = 'attribs'
-                        elif c is '#':
-                            break
-                        else:
-                            token += c
-                elif state is 'map':
-                    if c is ']':
-                        if token not in self.macros:
-                            self.macros[token] = {}
-                        map = token
-                        token = ''
-                        state = 'key'
-                    elif c in string.printable and c not in string.whitespace:
-                        token += c
-                    else:
-                        self.macros = orig_macros
+                c = l[pos]
+                if c == '[':
+                    m = _parse_map.match(l, pos)
+                    if m is None:
                         raise error.general('invalid macro map:%d: %s' % (lc, l))
-                elif state is 'directive':
-                    if c in string.whitespace:
-                        if token == 'include':
-                            self.load(_clean(l_remaining))
-                            token = ''
-                            state = 'key'
-                            break
-                    elif c in string.printable and c not in string.whitespace:
-                        token += c
-                    else:
-                        self.macros = orig_macros
-                        raise error.general('invalid macro directive:%d: %s' % (lc, l))
-                elif state is 'include':
-                    if c is string.whitespace:
-                        if token == 'include':
-                            state = 'include'
-                    elif c in string.printable and c not in string.whitespace:
-                        token += c
-                    else:
-                        self.macros = orig_macros
+                    records += [('map', m.group(1))]
+                    pos = m.end()
+                elif c == '%':
+                    m = _parse_directive.match(l, pos)
+                    if m is None:
                         raise error.general('invalid macro directive:%d: %s' % (lc, l))
-                elif state is 'attribs':
-                    if c not in string.whitespace:
-                        if c is ',':
-                            macro += [token]
-                            token = ''
-                            if len(macro) == 3:
-                                state = 'value-start'
-                        else:
-                            token += c
-                elif state is 'value-start':
-                    if c is "'":
-                        state = 'value-line-start'
-                elif state is 'value-line-start':
-                    if c is "'":
-                        state = 'value-multiline-start'
-                    else:
-                        state = 'value-line'
-                        token += c
-                elif state is 'value-multiline-start':
-                    if c is "'":
-                        state = 'value-multiline'
-                    else:
-                        macro += [token]
-                        state = 'macro'
-                elif state is 'value-line':
-                    if c is "'":
-                        macro += [token]
-                        state = 'macro'
-                    else:
-                        token += c
-                elif state is 'value-multiline':
-                    if c is "'":
-                        state = 'value-multiline-end'
-                    else:
-                        token += c
-                elif state is 'value-multiline-end':
-                    if c is "'":
-                        state = 'value-multiline-end-end'
-                    else:
-                        state = 'value-multiline'
-                        token += "'" + c
-                elif state is 'value-multiline-end-end':
-                    if c is "'":
-                        macro += [token]
-                        state = 'macro'
-                    else:
-                        state = 'value-multiline'
-                        token += "''" + c
+                    records += [('include', _clean(l[m.end():]))]
+                    break
                 else:
-                    self.macros = orig_macros
-                    raise error.internal('bad state: %s' % (state))
-                if state is 'macro':
-                    self.macros[map][macro[0].lower()] = (macro[1], macro[2], macro[3])
-                    macro = []
-                    token = ''
-                    state = 'key'
+                    m = _parse_macro.match(l, pos)
+                    if m is None:
+                        raise error.general('malformed macro line:%d: %s' % (lc, l))
+                    macro = (m.group(1).lower(), m.group(2), m.group(3))
+                    pos = m.end()
+                    if l.startswith("\'\'\'", pos - 1):
+                        end = l.find("\'\'\'", pos + 2)
+                        if end < 0:
+                            value = [l[pos + 2:]]
+                            break
+                        records += [('macro', macro[0], (macro[1], macro[2], l[pos + 2:end]))]
+                        pos = end + 3
+                    elif l.startswith("\'\'", pos - 1):
+                        records += [('macro', macro[0], (macro[1], macro[2], ''))]
+                        pos += 2
+                    else:
+                        end = l.find("\'", pos)
+                        if end < 0:
+                            raise error.general('malformed macro line:%d: %s' % (lc, l))
+                        records += [('macro', macro[0], (macro[1], macro[2], l[pos:end]))]
+                        pos = end + 1
+                    macro = None
+        return records
+
+    def _apply(self, records):
+        map = 'global'
+        for r in records:
+            if r[0] == 'map':
+                if r[1] not in self.macros:
+                    self.macros[r[1]] = {}
+                map = r[1]
+            elif r[0] == 'macro':
+                self._writable(map)[r[1]] = r[2]
+            elif r[0] == 'include':
+                self.load(r[1])
+        self._index_invalidate()
+
+    def _hash(self, text):
+        # str and bytes are the same type in Python2
+        if type(text) is not bytes:
+            text = text.encode('utf-8')
+        return hashlib.sha1(text).hexdigest()
+
+    def _cache_file(self, name):
+        if cache_path is None:
+            return None
+        key = self._hash(path.abspath(name))
+        return os.path.join(cache_path, 'py%d-%s' % (sys.version_info[0], key))
+
+    def _load_records(self, name):
+        """Return the records for the macro file. The records are cached on
+        disk keyed by the file's path, modification time and a hash of the
+        content."""
+        mc = open(path.host(name), 'r')
+        try:
+            content = mc.read()
+        finally:
+            mc.close()
+        mtime = os.stat(path.host(name)).st_mtime
+        digest = self._hash(content)
+        cache_file = self._cache_file(name)
+        if cache_file is not None:
+            try:
+                cf = open(cache_file, 'rb')
+                try:
+                    cached = pickle.load(cf)
+                finally:
+                    cf.close()
+                if cached[0] == path.abspath(name) and \
+                   cached[1] == mtime and cached[2] == digest:
+                    return cached[3]
+            except:
+                pass
+        records = self._parse(content)
+        if cache_file is not None:
+            try:
+                if not os.path.isdir(cache_path):
+                    os.makedirs(cache_path)
+                tmp = '%s.%d' % (cache_file, os.getpid())
+                cf = open(tmp, 'wb')
+                try:
+                    pickle.dump((path.abspath(name), mtime, digest, records), cf, 2)
+                finally:
+                    cf.close()
+                os.rename(tmp, cache_file)
+            except:
+                pass
+        return records
+
+    def parse(self, lines):
+        self._apply(self._parse(lines))
 
     def load(self, name):
         names = self.expand(name).split(':')
@@ -405,26 +517,19 @@ class macros:
             log.trace('opening: %s' % (n))
             if path.exists(n):
                 try:
-                    mc = open(path.host(n), 'r')
-                    macros = self.parse(mc)
-                    mc.close()
-                    self.files += [n]
-                    return
+                    records = self._load_records(n)
                 except IOError as err:
-                    pass
+                    continue
+                self._apply(records)
+                self.files += [n]
+                return
         raise error.general('opening macro file: %s' % \
                                 (path.host(self.expand(name))))
 
     def get(self, key):
         if type(key) is not str:
             raise TypeError('bad key type: %s' % (type(key)))
-        key = self.key_filter(key)
-        for rm in self.get_read_maps():
-            if key in self.macros[rm]:
-                return self.macros[rm][key]
-        if key in self.macros['global']:
-            return self.macros['global'][key]
-        return None
+        return self._resolved().get(self.key_filter(key))
 
     def get_type(self, key):
         m = self.get(key)
@@ -458,7 +563,8 @@ class macros:
         key = self.key_filter(key)
         for map in self.macros:
             if key in self.macros[map]:
-                del self.macros[map][key]
+                del self._writable(map)[key]
+        self._index_key(key)
 
     def expand(self, _str):
         """Simple basic expander of config file macros."""
@@ -495,6 +601,8 @@ class macros:
                 if _map not in self.get_read_maps():
                     rm = '%04d_%s' % (len(self.read_maps), _map)
                     self.read_maps = sorted(self.read_maps + [rm])
+                    self._read_map_names = None
+                    self._index_invalidate()
                 return True
         return False
 
@@ -504,6 +612,8 @@ class macros:
                 for i in range(0, len(self.read_maps)):
                     if '%04d_%s' % (i, _map) == self.read_maps[i]:
                         self.read_maps.pop(i)
+                self._read_map_names = None
+                self._index_invalidate()
                 return True
         return False
 
@@ -522,6 +632,52 @@ class macros:
 if __name__ == "__main__":
     import copy
     import sys
+    import time
+
+    def lookup_benchmark(rtdir, bsp = 'erc32', loops = 100):
+        """Time the lookups of the tester's macros with a BSP's read map."""
+        m = macros(name = path.join(rtdir, 'rtems', 'testing', 'defaults.mc'),
+                   rtdir = rtdir)
+        m.load(path.join(rtdir, 'rtems', 'testing', 'bsps', bsp + '.mc'))
+        m.set_read_map(bsp)
+        keys = m.keys()
+        start = time.time()
+        for l in range(0, loops):
+            for k in keys:
+                m.has_key(k)
+                m.get(k)
+        elapsed = time.time() - start
+        print('lookup benchmark: %d keys, %d lookups in %.3f secs: %.2f usecs/lookup' % \
+              (len(keys), loops * len(keys) * 2, elapsed,
+               elapsed * 1e6 / (loops * len(keys) * 2)))
+
+    def copy_benchmark(rtdir, bsp = 'erc32', loops = 1000):
+        """Time copying the macros and setting a test's keys in the copy."""
+        m = macros(name = path.join(rtdir, 'rtems', 'testing', 'defaults.mc'),
+                   rtdir = rtdir)
+        m.load(path.join(rtdir, 'rtems', 'testing', 'bsps', bsp + '.mc'))
+        m.set_read_map(bsp)
+        m.keys()
+        start = time.time()
+        for l in range(0, loops):
+            c = copy.copy(m)
+            c['test_index'] = str(l)
+            c['test_executable'] = 'test.exe'
+            c.get('bsp')
+        elapsed = time.time() - start
+        print('copy benchmark: %d copies in %.3f secs: %.2f usecs/copy' % \
+              (loops, elapsed, elapsed * 1e6 / loops))
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+        if len(sys.argv) > 2:
+            rtdir = sys.argv[2]
+        else:
+            rtdir = path.join(path.dirname(path.dirname(path.abspath(sys.argv[0]))),
+                              'tester')
+        lookup_benchmark(rtdir)
+        copy_benchmark(rtdir)
+        sys.exit(0)
+
     print(inspect.getfile(macros))
     m = macros()
     d = copy.copy(m)
@@ -529,6 +685,10 @@ if __name__ == "__main__":
     if d.has_key('test1'):
         print('error: copy failed.')
         sys.exit(1)
+    d['test2'] = 'something else'
+    if m.has_key('test2'):
+        print('error: copy write failed.')
+        sys.exit(1)
     m.parse("[test]\n" \
             "test1: none, undefine, ''\n" \
             "name:  none, override, 'pink'\n")
@@ -144,6 +144,8 @@ class command_line(object):
                 self.defaults[long_opts[lo][0]] = ('none', 'none', long_opts[lo][3])
             if long_opts[lo][1] == 'int':
                 handler = self._lo_int
+            elif long_opts[lo][1] == 'float':
+                handler = self._lo_float
             elif long_opts[lo][1] == 'string':
                 handler = self._lo_string
             elif long_opts[lo][1] == 'path':
@@ -201,6 +203,16 @@ class command_line(object):
         self.opts[opt[2:]] = value
         self.defaults[macro] = value
 
+    def _lo_float(self, opt, macro, value):
+        if value is None:
+            raise error.general('option requires a value: %s' % (opt))
+        try:
+            num = float(value)
+        except:
+            raise error.general('option conversion to float failed: %s' % (opt))
+        self.opts[opt[2:]] = value
+        self.defaults[macro] = value
+
     def _lo_string(self, opt, macro, value):
         if value is None:
             raise error.general('option requires a value: %s' % (opt))
@@ -0,0 +1,271 @@
+/*! @file AnalysisCache.cc
+ *  @brief AnalysisCache Implementation
+ *
+ *  This file contains the implementation of the functions
+ *  which provide the on disk cache of the analysis tool output.
+ */
+
+#include <dirent.h>
+#include <errno.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/stat.h>
+#include <sys/types.h>
+#include <unistd.h>
+#include <utime.h>
+
+#if WIN32
+#include <direct.h>
+#endif
+
+#include <algorithm>
+#include <vector>
+
+#include "AnalysisCache.h"
+
+namespace Coverage {
+
+  /*
+   *  The 64 bit FNV-1a hash.
+   */
+  #define FNV_OFFSET_BASIS 0xcbf29ce484222325ULL
+  #define FNV_PRIME        0x100000001b3ULL
+
+  static uint64_t hashBytes(
+    uint64_t             hash,
+    const unsigned char* data,
+    size_t               length
+  )
+  {
+    size_t i;
+
+    for (i = 0; i < length; i++) {
+      hash ^= data[i];
+      hash *= FNV_PRIME;
+    }
+    return hash;
+  }
+
+  static bool copyFile(
+    const std::string& from,
+    const std::string& to
+  )
+  {
+    unsigned char buffer[64 * 1024];
+    FILE*         in;
+    FILE*         out;
+    size_t        length;
+    bool          status = true;
+
+    in = fopen( from.c_str(), "rb" );
+    if (!in)
+      return false;
+
+    out = fopen( to.c_str(), "wb" );
+    if (!out) {
+      fclose( in );
+      return false;
+    }
+
+    while ((length = fread( buffer, 1, sizeof( buffer ), in )) > 0) {
+      if (fwrite( buffer, 1, length, out ) != length) {
+        status = false;
+        break;
+      }
+    }
+
+    if (ferror( in ))
+      status = false;
+    fclose( in );
+    if (fclose( out ))
+      status = false;
+    if (!status)
+      unlink( to.c_str() );
+    return status;
+  }
+
+  AnalysisCache::AnalysisCache(
+    const std::string& directory,
+    uint64_t           maxSize
+  ) : directory( directory ),
+      maxSize( maxSize ),
+      size( 0 )
+  {
+    int status;
+
+#if WIN32
+    status = _mkdir( directory.c_str() );
+#else
+    status = mkdir( directory.c_str(), 0755 );
+#endif
+    if (status && errno != EEXIST) {
+      fprintf(
+        stderr,
+        "ERROR: AnalysisCache - unable to create directory %s\n",
+        directory.c_str()
+      );
+      exit(-1);
+    }
+
+    size = evict( maxSize );
+  }
+
+  AnalysisCache::~AnalysisCache()
+  {
+  }
+
+  std::string AnalysisCache::key(
+    const std::string& fileName,
+    const std::string& command,
+    const std::string& input
+  )
+  {
+    uint64_t hash;
+    uint64_t fileHash;
+    char     name[ 17 ];
+
+    if (!hashFile( fileName, fileHash ))
+      return "";
+
+    hash = hashBytes(
+      FNV_OFFSET_BASIS, (const unsigned char*) &fileHash, sizeof( fileHash )
+    );
+    hash = hashBytes(
+      hash, (const unsigned char*) command.c_str(), command.length() + 1
+    );
+    hash = hashBytes(
+      hash, (const unsigned char*) input.c_str(), input.length()
+    );
+
+    sprintf( name, "%016llx", (unsigned long long) hash );
+    return name;
+  }
+
+  bool AnalysisCache::fetch(
+    const std::string& key,
+    const std::string& fileName
+  )
+  {
+    std::string entry = directory + "/" + key;
+
+    if (key.empty() || !copyFile( entry, fileName ))
+      return false;
+
+    // Mark the entry as recently used.
+    utime( entry.c_str(), NULL );
+    return true;
+  }
+
+  void AnalysisCache::store(
+    const std::string& key,
+    const std::string& fileName
+  )
+  {
+    std::string entry = directory + "/" + key;
+    std::string temp;
+    char        pid[ 32 ];
+    struct stat buf;
+
+    if (key.empty())
+      return;
+
+    // Copy to a temporary file and rename it so other covoar instances
+    // using the cache never see a partial entry.
+    sprintf( pid, ".%d.tmp", (int) getpid() );
+    temp = entry + pid;
+
+    if (!copyFile( fileName, temp ))
+      return;
+
+    if (rename( temp.c_str(), entry.c_str() )) {
+      unlink( temp.c_str() );
+      return;
+    }
+
+    if (stat( entry.c_str(), &buf ) == 0)
+      size += buf.st_size;
+
+    // Remove a quarter of the cache so it is not scanned on every store.
+    if (size > maxSize)
+      size = evict( maxSize - (maxSize / 4) );
+  }
+
+  bool AnalysisCache::hashFile(
+    const std::string& fileName,
+    uint64_t&          hash
+  )
+  {
+    std::map<std::string, uint64_t>::iterator itr;
+    unsigned char                             buffer[64 * 1024];
+    FILE*                                     file;
+    size_t                                    length;
+
+    itr = fileHashes.find( fileName );
+    if (itr != fileHashes.end()) {
+      hash = itr->second;
+      return true;
+    }
+
+    file = fopen( fileName.c_str(), "rb" );
+    if (!file)
+      return false;
+
+    hash = FNV_OFFSET_BASIS;
+    while ((length = fread( buffer, 1, sizeof( buffer ), file )) > 0)
+      hash = hashBytes( hash, buffer, length );
+
+    fclose( file );
+
+    fileHashes[ fileName ] = hash;
+    return true;
+  }
+
+  uint64_t AnalysisCache::evict(
+    uint64_t size
+  )
+  {
+    typedef std::pair<time_t, std::string> entry_t;
+
+    std::vector<entry_t>           entries;
+    std::vector<entry_t>::iterator itr;
+    std::map<std::string, off_t>   sizes;
+    DIR*                           dir;
+    struct dirent*                 dirEntry;
+    struct stat                    buf;
+    std::string                    entry;
+    uint64_t                       total = 0;
+
+    dir = opendir( directory.c_str() );
+    if (!dir)
+      return 0;
+
+    // Entries being stored are temporary files and are left alone.
+    while ((dirEntry = readdir( dir )) != NULL) {
+      if (dirEntry->d_name[0] == '.' || strchr( dirEntry->d_name, '.' ))
+        continue;
+      entry = directory + "/" + dirEntry->d_name;
+      if (stat( entry.c_str(), &buf ) || !S_ISREG( buf.st_mode ))
+        continue;
+      entries.push_back( entry_t( buf.st_mtime, entry ) );
+      sizes[ entry ] = buf.st_size;
+      total += buf.st_size;
+    }
+
+    closedir( dir );
+
+    if (total <= size)
+      return total;
+
+    // Remove the least recently used entries first.
+    std::sort( entries.begin(), entries.end() );
+
+    for (itr = entries.begin(); itr != entries.end() && total > size; itr++) {
+      if (unlink( itr->second.c_str() ) == 0)
+        total -= sizes[ itr->second ];
+    }
+
+    return total;
+  }
+
+}
@@ -0,0 +1,137 @@
+/*! @file AnalysisCache.h
+ *  @brief AnalysisCache Specification
+ *
+ *  This file contains the specification of the AnalysisCache class.
+ */
+
+#ifndef __ANALYSIS_CACHE_H__
+#define __ANALYSIS_CACHE_H__
+
+#include <map>
+#include <stdint.h>
+#include <string>
+
+namespace Coverage {
+
+  /*! @class AnalysisCache
+   *
+   *  This class defines an on disk cache of the output of the tools
+   *  covoar runs to analyze a file, for example the objdump listing of
+   *  an executable or the nm symbol table of a library. An entry is
+   *  keyed by a hash of the contents of the analyzed file, the tool
+   *  command and any extra input given to the tool so an unchanged file
+   *  is not analyzed again. The least recently used entries are removed
+   *  when the size of the cache is more than the maximum size.
+   */
+  class AnalysisCache {
+
+  public:
+
+    /*!
+     *  This method constructs an AnalysisCache instance.
+     *
+     *  @param[in] directory specifies the directory holding the cache
+     *  @param[in] maxSize specifies the maximum size of the cache in bytes
+     */
+    AnalysisCache(
+      const std::string& directory,
+      uint64_t           maxSize
+    );
+
+    /*!
+     *  This method destructs an AnalysisCache instance.
+     */
+    ~AnalysisCache();
+
+    /*!
+     *  This method returns the key of the output of a tool.
+     *
+     *  @param[in] fileName specifies the file the tool analyzes
+     *  @param[in] command specifies the tool command without file names
+     *  @param[in] input specifies any other input given to the tool
+     *
+     *  @return Returns the key of the tool output or an empty string
+     *   if the file cannot be read.
+     */
+    std::string key(
+      const std::string& fileName,
+      const std::string& command,
+      const std::string& input = ""
+    );
+
+    /*!
+     *  This method copies the cached output for the key to a file.
+     *
+     *  @param[in] key specifies the key of the tool output
+     *  @param[in] fileName specifies the file to write
+     *
+     *  @return Returns TRUE if the output was in the cache and
+     *   FALSE otherwise.
+     */
+    bool fetch(
+      const std::string& key,
+      const std::string& fileName
+    );
+
+    /*!
+     *  This method adds the tool output in a file to the cache.
+     *
+     *  @param[in] key specifies the key of the tool output
+     *  @param[in] fileName specifies the file holding the tool output
+     */
+    void store(
+      const std::string& key,
+      const std::string& fileName
+    );
+
+  private:
+
+    /*!
+     *  This method calculates the hash of the contents of a file. The
+     *  hash of each file is only calculated once.
+     *
+     *  @param[in] fileName specifies the file to hash
+     *  @param[out] hash returns the hash of the file
+     *
+     *  @return Returns TRUE if the file was hashed and FALSE otherwise.
+     */
+    bool hashFile(
+      const std::string& fileName,
+      uint64_t&          hash
+    );
+
+    /*!
+     *  This method returns the size of the cache after removing the
+     *  least recently used entries until it is no larger than the
+     *  specified size.
+     *
+     *  @param[in] size specifies the size the cache is reduced to
+     */
+    uint64_t evict(
+      uint64_t size
+    );
+
+    /*!
+     *  This member variable contains the cache directory.
+     */
+    std::string directory;
+
+    /*!
+     *  This member variable contains the maximum size of the cache.
+     */
+    uint64_t maxSize;
+
+    /*!
+     *  This member variable contains the size of the cache.
+     */
+    uint64_t size;
+
+    /*!
+     *  This member variable contains the hash of each file hashed.
+     */
+    std::map<std::string, uint64_t> fileHashes;
+  };
+
+}
+
+#endif
@@ -11,6 +11,8 @@
 #include <string.h>
 
 #include "CoverageFactory.h"
+#include "CoverageMap.h"
+#include "CoverageMapCompact.h"
 #include "CoverageReaderQEMU.h"
 #include "CoverageReaderRTEMS.h"
 #include "CoverageWriterRTEMS.h"
@@ -79,3 +81,15 @@ Coverage::CoverageWriterBase* Coverage::CreateCoverageWriter(
   }
   return NULL;
 }
+
+Coverage::CoverageMapBase* Coverage::CreateCoverageMap(
+  const std::string& exefileName,
+  uint32_t           low,
+  uint32_t           high,
+  bool               compact
+)
+{
+  if (compact)
+    return new Coverage::CoverageMapCompact( exefileName, low, high );
+  return new Coverage::CoverageMap( exefileName, low, high );
+}
@@ -3,12 +3,16 @@
  *
  *  This file contains the specification of the CoverageFactory methods.
  *  This collection of methods is used to create CoverageReader and/or
- *  CoverageWriter instances for a particular coverage file format.
+ *  CoverageWriter instances for a particular coverage file format and
+ *  CoverageMap instances.
  */
 
 #ifndef __COVERAGE_FACTORY_H__
 #define __COVERAGE_FACTORY_H__
 
+#include <string>
+
+#include "CoverageMapBase.h"
 #include "CoverageReaderBase.h"
 #include "CoverageWriterBase.h"
 
@@ -59,6 +63,25 @@ namespace Coverage {
   CoverageWriterBase* CreateCoverageWriter(
     CoverageFormats_t format
   );
+
+  /*!
+   *  This method returns an instance of a Coverage Map class for
+   *  the specified address range.
+   *
+   *  @param[in] exefileName specifies the executable this originated in
+   *  @param[in] low specifies the lowest address of the coverage map
+   *  @param[in] high specifies the highest address of the coverage map
+   *  @param[in] compact specifies if the map keeps its flags in bitsets
+   *             and only the counters which are needed
+   *
+   *  @return Returns a Coverage Map class instance.
+   */
+  CoverageMapBase* CreateCoverageMap(
+    const std::string& exefileName,
+    uint32_t           low,
+    uint32_t           high,
+    bool               compact
+  );
 }
 
 #endif
@@ -2,7 +2,7 @@
  *  @brief CoverageMap Implementation
  *
  *  This file contains the implementation of the functions supporting
- *  a CoverageMap.  Currently, it adds no functionality to CoverageMapBase.
+ *  a CoverageMap which keeps a record for each address.
  */
 
 #include "CoverageMap.h"
@@ -15,10 +15,162 @@ namespace Coverage {
     uint32_t           high
   ) : CoverageMapBase(exefileName, low, high)
   {
+    uint32_t a;
+
+    Info = new perAddressInfo_t[ Size ];
+
+    for (a=0; a<Size; a++) {
+
+      perAddressInfo_t *i = &Info[ a ];
+
+      i->isStartOfInstruction = false;
+      i->wasExecuted          = 0;
+      i->isBranch             = false;
+      i->isNop                = false;
+      i->wasTaken             = 0;
+      i->wasNotTaken          = 0;
+    }
   }
 
   CoverageMap::~CoverageMap()
   {
+    if (Info)
+      delete [] Info;
+  }
+
+  void CoverageMap::setIsStartOfInstruction(
+    uint32_t    address
+  )
+  {
+    uint32_t offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return;
+
+    Info[ offset ].isStartOfInstruction = true;
+  }
+
+  bool CoverageMap::isStartOfInstruction( uint32_t address ) const
+  {
+    uint32_t offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return false;
+
+    return Info[ offset ].isStartOfInstruction;
+  }
+
+  void CoverageMap::sumWasExecuted( uint32_t address, uint32_t addition)
+  {
+    uint32_t offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return;
+
+    Info[ offset ].wasExecuted += addition;
+  }
+
+  void CoverageMap::sumWasExecutedOffsets(
+    uint32_t offset,
+    uint32_t count,
+    uint32_t addition
+  )
+  {
+    for (uint32_t i = 0; i < count; i++)
+      Info[ offset + i ].wasExecuted += addition;
   }
 
+  uint32_t CoverageMap::getWasExecuted( uint32_t address ) const
+  {
+    uint32_t offset;
+
+    if (determineOffset( address, &offset ) != true)
+      return 0;
+
+    return Info[ offset ].wasExecuted;	
+  }
+
+  void CoverageMap::setIsBranch(
+    uint32_t    address
+  )
+  {
+    uint32_t offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return;
+
+    Info[ offset ].isBranch = true;
+  }
+
+  bool CoverageMap::isNop( uint32_t address ) const
+  {
+    uint32_t offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return false;
+
+    return Info[ offset ].isNop;
+  }
+
+  void CoverageMap::setIsNop(
+    uint32_t    address
+  )
+  {
+    uint32_t offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return;
+
+    Info[ offset ].isNop = true;
+  }
+
+  bool CoverageMap::isBranch( uint32_t address ) const
+  {
+    uint32_t offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return false;
+
+    return Info[ offset ].isBranch;
+  }
+
+  void CoverageMap::sumWasNotTaken( uint32_t address, uint32_t addition)
+  {
+    uint32_t offset;
+
+    if (determineOffset( address, &offset ) != true)
+      return;
+
+    Info[ offset ].wasNotTaken += addition;
+  }
+
+  uint32_t CoverageMap::getWasNotTaken( uint32_t address ) const
+  {
+    uint32_t offset;
+
+    if (determineOffset( address, &offset ) != true)
+      return 0;
+
+    return Info[ offset ].wasNotTaken;
+  }
+
+  void CoverageMap::sumWasTaken( uint32_t address, uint32_t addition)
+  {
+    uint32_t offset;
+
+    if (determineOffset( address, &offset ) != true)
+      return;
+
+    Info[ offset ].wasTaken += addition;
+  }
+
+  uint32_t CoverageMap::getWasTaken( uint32_t address ) const
+  {
+    uint32_t offset;
+
+    if (determineOffset( address, &offset ) != true)
+      return 0;
+
+    return Info[ offset ].wasTaken;
+  }
 }
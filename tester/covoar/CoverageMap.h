@@ -14,7 +14,8 @@ namespace Coverage {
   /*! @class CoverageMap
    *
    *  This class implements a coverage map which supports a single
-   *  range of addresses from low to high. 
+   *  range of addresses from low to high. It keeps a record of the
+   *  flags and counters of each address.
    */
   class CoverageMap : public CoverageMapBase {
 
@@ -23,6 +24,7 @@ namespace Coverage {
     /*! 
      *  This method constructs a CoverageMap instance.
      *
+     *  @param[in] exefileName specifies the executable this originated in
      *  @param[in] low specifies the lowest address of the coverage map.
      *  @param[in] high specifies the highest address of the coverage map.
      */
@@ -35,6 +37,92 @@ namespace Coverage {
     /* Inherit documentation from base class. */
     virtual ~CoverageMap();
 
+    /* Inherit documentation from base class. */
+    void setIsStartOfInstruction(
+      uint32_t address
+    );
+
+    /* Inherit documentation from base class. */
+    bool isStartOfInstruction( uint32_t address ) const;
+
+    /* Inherit documentation from base class. */
+    void sumWasExecuted( uint32_t address, uint32_t addition );
+
+    /* Inherit documentation from base class. */
+    uint32_t getWasExecuted( uint32_t address ) const;
+
+    /* Inherit documentation from base class. */
+    void setIsBranch( uint32_t address );
+
+    /* Inherit documentation from base class. */
+    bool isNop( uint32_t address ) const;
+
+    /* Inherit documentation from base class. */
+    void setIsNop( uint32_t address );
+
+    /* Inherit documentation from base class. */
+    bool isBranch( uint32_t address ) const;
+
+    /* Inherit documentation from base class. */
+    void sumWasTaken( uint32_t address, uint32_t addition );
+
+    /* Inherit documentation from base class. */
+    uint32_t getWasTaken( uint32_t address ) const;
+
+    /* Inherit documentation from base class. */
+    void sumWasNotTaken( uint32_t address, uint32_t addition );
+
+    /* Inherit documentation from base class. */
+    uint32_t getWasNotTaken( uint32_t address ) const;
+
+  protected:
+
+    /* Inherit documentation from base class. */
+    void sumWasExecutedOffsets(
+      uint32_t offset,
+      uint32_t count,
+      uint32_t addition
+    );
+
+    /*!
+     *  This structure defines the information that is gathered and
+     *  tracked per address.
+     */
+    typedef struct {
+      /*!
+       *  This member indicates that the address is the start of
+       *  an instruction.
+       */
+      bool isStartOfInstruction;
+      /*!
+       *  This member indicates how many times the address was executed.
+       */
+      uint32_t wasExecuted;
+      /*!
+       *  This member indicates that the address is a branch instruction.
+       */
+      bool isBranch;
+      /*!
+       *  This member indicates that the address is a NOP instruction.
+       */
+      bool isNop;
+      /*!
+       *  When isBranch is TRUE, this member indicates that the branch
+       *  instruction at the address was taken.
+       */
+      uint32_t wasTaken;
+      /*!
+       *  When isBranch is TRUE, this member indicates that the branch
+       *  instruction at the address was NOT taken.
+       */
+      uint32_t wasNotTaken;
+    } perAddressInfo_t;
+
+    /*!
+     *  This is a dynamically allocated array of data that is
+     *  kept for each address.
+     */
+    perAddressInfo_t* Info;
   };
 
 }
@@ -21,7 +21,6 @@ namespace Coverage {
     uint32_t           high
   )
   {
-    uint32_t       a;
     AddressRange_t range;
 
     range.fileName    = exefileName;
@@ -30,26 +29,10 @@ namespace Coverage {
     RangeList.push_back( range );
 
     Size = high - low + 1;
-
-    Info = new perAddressInfo_t[ Size ];
-
-    for (a=0; a<Size; a++) {
-
-      perAddressInfo_t *i = &Info[ a ];
-
-      i->isStartOfInstruction = false;
-      i->wasExecuted          = 0;
-      i->isBranch             = false;
-      i->isNop                = false;
-      i->wasTaken             = 0;
-      i->wasNotTaken          = 0;
-    }
   }
 
   CoverageMapBase::~CoverageMapBase()
   {
-    if (Info)
-      delete Info;
   }
  
   void  CoverageMapBase::Add( uint32_t low, uint32_t high )
@@ -81,8 +64,8 @@ namespace Coverage {
 
   void CoverageMapBase::dump( void ) const {
 
-    uint32_t          a;
-    perAddressInfo_t* entry;
+    uint32_t a;
+    uint32_t address;
 
     fprintf( stderr, "Coverage Map Contents:\n" );
 
@@ -92,21 +75,21 @@ namespace Coverage {
 
     for (a = 0; a < Size; a++) {
 
-      entry = &Info[ a ];
+      address = a + RangeList.front().lowAddress;
 
       fprintf(
         stderr,
         "0x%x - isStartOfInstruction = %s, wasExecuted = %s\n",
-        a + RangeList.front().lowAddress,
-        entry->isStartOfInstruction ? "TRUE" : "FALSE",
-        entry->wasExecuted ? "TRUE" : "FALSE"
+        address,
+        isStartOfInstruction( address ) ? "TRUE" : "FALSE",
+        wasExecuted( address ) ? "TRUE" : "FALSE"
       );
       fprintf(
         stderr,
         "           isBranch = %s, wasTaken = %s, wasNotTaken = %s\n",
-        entry->isBranch ? "TRUE" : "FALSE",
-        entry->wasTaken ? "TRUE" : "FALSE",
-        entry->wasNotTaken ? "TRUE" : "FALSE"
+        isBranch( address ) ? "TRUE" : "FALSE",
+        wasTaken( address ) ? "TRUE" : "FALSE",
+        wasNotTaken( address ) ? "TRUE" : "FALSE"
       );
     }
   }
@@ -128,7 +111,7 @@ namespace Coverage {
     start = address;
 
     while (start >= range.lowAddress ) {
-      if (Info[ start - range.lowAddress ].isStartOfInstruction) {
+      if (isStartOfInstruction( start )) {
         *beginning = start;
         status = true;
         break;
@@ -169,233 +152,80 @@ namespace Coverage {
     return Size;
   }
 
-  void CoverageMapBase::setIsStartOfInstruction(
-    uint32_t    address
-  )
-  {
-    uint32_t offset;
- 
-    if (determineOffset( address, &offset ) != true)
-      return;
-
-    Info[ offset ].isStartOfInstruction = true;
-  }
-
-  bool CoverageMapBase::isStartOfInstruction( uint32_t address ) const
-  {
-    uint32_t offset;
- 
-    if (determineOffset( address, &offset ) != true)
-      return false;
-
-    return Info[ offset ].isStartOfInstruction;
-  }
-
   void CoverageMapBase::setWasExecuted( uint32_t address )
   {
-    uint32_t offset;
- 
-    if (determineOffset( address, &offset ) != true)
-      return;
-
-    Info[ offset ].wasExecuted += 1;
-  }
-
-  void CoverageMapBase::sumWasExecuted( uint32_t address, uint32_t addition)
-  {
-    uint32_t offset;
- 
-    if (determineOffset( address, &offset ) != true)
-      return;
-
-    Info[ offset ].wasExecuted += addition;
-  }
-
-  bool CoverageMapBase::wasExecuted( uint32_t address ) const
-  {
-    uint32_t offset;
-    bool     result;
- 
-    result = true;
-
-    if (determineOffset( address, &offset ) != true)
-      result = false;
-
-    if (Info[ offset ].wasExecuted <= 0)
-      result = false;
-
-    return result;
-  }
-
-  uint32_t CoverageMapBase::getWasExecuted( uint32_t address ) const
-  {
-    uint32_t offset;
-
-    if (determineOffset( address, &offset ) != true)
-      return 0;
-
-    return Info[ offset ].wasExecuted;	
-  }
-
-  void CoverageMapBase::setIsBranch(
-    uint32_t    address
-  )
-  {
-    uint32_t offset;
- 
-    if (determineOffset( address, &offset ) != true)
-      return;
-
-    Info[ offset ].isBranch = true;
-  }
-
-  bool CoverageMapBase::isNop( uint32_t address ) const
-  {
-    uint32_t offset;
- 
-    if (determineOffset( address, &offset ) != true)
-      return false;
-
-    return Info[ offset ].isNop;
+    sumWasExecuted( address, 1 );
   }
 
-  void CoverageMapBase::setIsNop(
-    uint32_t    address
+  void CoverageMapBase::sumWasExecutedRange(
+    uint32_t address,
+    uint32_t size,
+    uint32_t addition
   )
   {
-    uint32_t offset;
- 
-    if (determineOffset( address, &offset ) != true)
-      return;
+    AddressRange::const_iterator itr;
+    uint32_t                     count;
+    uint32_t                     offset;
+
+    while (size) {
+
+      // Mark the part of the block in the range holding the address or skip
+      // the address if it is not in the map.
+      count = 1;
+      for ( itr = RangeList.begin(); itr != RangeList.end(); itr++ ) {
+        if ((address >= itr->lowAddress) && (address <= itr->highAddress)){
+          offset = address - itr->lowAddress;
+          count = itr->highAddress - address + 1;
+          if ((count == 0) || (count > size))
+            count = size;
+          sumWasExecutedOffsets( offset, count, addition );
+          break;
+        }
+      }
 
-    Info[ offset ].isNop = true;
+      address += count;
+      size -= count;
+    }
   }
 
-  bool CoverageMapBase::isBranch( uint32_t address ) const
+  bool CoverageMapBase::wasExecuted( uint32_t address ) const
   {
-    uint32_t offset;
- 
-    if (determineOffset( address, &offset ) != true)
-      return false;
-
-    return Info[ offset ].isBranch;
+    return getWasExecuted( address ) > 0;
   }
 
   void CoverageMapBase::setWasTaken(
     uint32_t    address
   )
   {
-    uint32_t offset;
- 
-    if (determineOffset( address, &offset ) != true)
-      return;
-
-    Info[ offset ].wasTaken += 1;
+    sumWasTaken( address, 1 );
   }
 
   void CoverageMapBase::setWasNotTaken(
     uint32_t    address
   )
   {
-    uint32_t offset;
- 
-    if (determineOffset( address, &offset ) != true)
-      return;
-
-    Info[ offset ].wasNotTaken += 1;
+    sumWasNotTaken( address, 1 );
   }
 
   bool CoverageMapBase::wasAlwaysTaken( uint32_t address ) const
   {
-    uint32_t offset;
- 
-    if (determineOffset( address, &offset ) != true)
-      return false;
-
-    return (Info[ offset ].wasTaken &&
-            !Info[ offset ].wasNotTaken);
+    return (getWasTaken( address ) &&
+            !getWasNotTaken( address ));
   }
 
   bool CoverageMapBase::wasNeverTaken( uint32_t address ) const
   {
-    uint32_t offset;
- 
-    if (determineOffset( address, &offset ) != true)
-      return false;
-
-    return (!Info[ offset ].wasTaken &&
-            Info[ offset ].wasNotTaken);
+    return (!getWasTaken( address ) &&
+            getWasNotTaken( address ));
   }
 
   bool CoverageMapBase::wasNotTaken( uint32_t address ) const
   {
-	    uint32_t offset;
-	    bool     result;
-
-	    result = true;
-
-	    if (determineOffset( address, &offset ) != true)
-	      result = false;
-
-	    if (Info[ offset ].wasNotTaken <= 0)
-	      result = false;
-
-	    return result;
-  }
-
-  void CoverageMapBase::sumWasNotTaken( uint32_t address, uint32_t addition)
-  {
-    uint32_t offset;
-
-    if (determineOffset( address, &offset ) != true)
-      return;
-
-    Info[ offset ].wasNotTaken += addition;
-  }
-
-  uint32_t CoverageMapBase::getWasNotTaken( uint32_t address ) const
-  {
-    uint32_t offset;
-
-    if (determineOffset( address, &offset ) != true)
-      return 0;
-
-    return Info[ offset ].wasNotTaken;
+    return getWasNotTaken( address ) > 0;
   }
 
   bool CoverageMapBase::wasTaken( uint32_t address ) const
   {
-    uint32_t offset;
-    bool     result;
-
-    result = true;
- 
-    if (determineOffset( address, &offset ) != true)
-      result = false;
-
-    if (Info[ offset ].wasTaken <= 0)
-      result = false;
-
-    return result;
-  }
-
-  void CoverageMapBase::sumWasTaken( uint32_t address, uint32_t addition)
-  {
-    uint32_t offset;
-
-    if (determineOffset( address, &offset ) != true)
-      return;
-
-    Info[ offset ].wasTaken += addition;
-  }
-
-  uint32_t CoverageMapBase::getWasTaken( uint32_t address ) const
-  {
-    uint32_t offset;
-
-    if (determineOffset( address, &offset ) != true)
-      return 0;
-
-    return Info[ offset ].wasTaken;
+    return getWasTaken( address ) > 0;
   }
 }
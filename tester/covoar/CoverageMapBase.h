@@ -15,7 +15,9 @@ namespace Coverage {
 
   /*! @class CoverageMapBase
    *
-   *  This is the base class for Coverage Map implementations.
+   *  This is the base class for Coverage Map implementations. It
+   *  manages the address ranges of the map and defines the interface
+   *  used to record and query the coverage of each address.
    */
   class CoverageMapBase {
 
@@ -163,9 +165,9 @@ namespace Coverage {
      *
      *  @param[in] address specifies the address of the start of an instruction
      */
-    void setIsStartOfInstruction(
+    virtual void setIsStartOfInstruction(
       uint32_t address
-    );
+    ) = 0;
 
     /*!
      *  This method returns a boolean which indicates if this
@@ -176,7 +178,7 @@ namespace Coverage {
      *  @return Returns TRUE if the specified address is the start
      *   of an instruction and FALSE otherwise.
      */
-    bool isStartOfInstruction( uint32_t address ) const;
+    virtual bool isStartOfInstruction( uint32_t address ) const = 0;
 
     /*!
      *  This method increments the counter which indicates how many times
@@ -206,7 +208,23 @@ namespace Coverage {
      *  @param[in] address specifies the execution count that should be
      *             added
      */
-    virtual void sumWasExecuted( uint32_t address, uint32_t addition );
+    virtual void sumWasExecuted( uint32_t address, uint32_t addition ) = 0;
+
+    /*!
+     *  This method increases the counter which indicates how many times
+     *  each address of the specified block was executed. Addresses of
+     *  the block not in the map are ignored.
+     *
+     *  @param[in] address specifies the first address of the block
+     *  @param[in] size specifies the size of the block in bytes
+     *  @param[in] addition specifies the execution count that should be
+     *             added
+     */
+    virtual void sumWasExecutedRange(
+      uint32_t address,
+      uint32_t size,
+      uint32_t addition
+    );
 
     /*!
      *  This method returns an unsigned integer which indicates how often
@@ -216,7 +234,7 @@ namespace Coverage {
      *  
      *  @return Returns number of executins
      */
-    uint32_t getWasExecuted( uint32_t address ) const;
+    virtual uint32_t getWasExecuted( uint32_t address ) const = 0;
 
     /*!
      *  This method sets the boolean which indicates if the specified
@@ -224,7 +242,7 @@ namespace Coverage {
      *
      *  @param[in] address specifies the address of the branch instruction
      */
-    void setIsBranch( uint32_t address );
+    virtual void setIsBranch( uint32_t address ) = 0;
 
     /*!
      *  This method returns a boolean which indicates if the specified
@@ -235,7 +253,7 @@ namespace Coverage {
      *  @return Returns TRUE if a NOP instruction is at the
      *   specified address and FALSE otherwise.
      */
-    bool isNop( uint32_t address ) const;
+    virtual bool isNop( uint32_t address ) const = 0;
 
     /*!
      *  This method sets the boolean which indicates if the specified
@@ -243,7 +261,7 @@ namespace Coverage {
      *
      *  @param[in] address specifies the address of the NOP instruction
      */
-    void setIsNop( uint32_t address );
+    virtual void setIsNop( uint32_t address ) = 0;
 
     /*!
      *  This method returns a boolean which indicates if the specified
@@ -254,7 +272,7 @@ namespace Coverage {
      *  @return Returns TRUE if a branch instruction is at the
      *   specified address and FALSE otherwise.
      */
-    bool isBranch( uint32_t address ) const;
+    virtual bool isBranch( uint32_t address ) const = 0;
 
     /*!
      *  This method increments the counter which indicates how many times
@@ -262,7 +280,7 @@ namespace Coverage {
      *
      *  @param[in] address specifies the address of the branch instruction
      */
-    void setWasTaken( uint32_t address );
+    virtual void setWasTaken( uint32_t address );
 
     /*!
      *  This method increases the counter which indicates how many times
@@ -273,7 +291,7 @@ namespace Coverage {
      *  @param[in] address specifies the execution count that should be
      *             added
      */
-    virtual void sumWasTaken( uint32_t address, uint32_t addition );
+    virtual void sumWasTaken( uint32_t address, uint32_t addition ) = 0;
 
     /*!
      *  This method returns an unsigned integer which indicates how often
@@ -283,7 +301,7 @@ namespace Coverage {
      *
      *  @return Returns number of executins
      */
-    uint32_t getWasTaken( uint32_t address ) const;
+    virtual uint32_t getWasTaken( uint32_t address ) const = 0;
 
     /*!
      *  This method increments the counter which indicates how many times
@@ -291,7 +309,7 @@ namespace Coverage {
      *
      *  @param[in] address specifies the address of the branch instruction
      */
-    void setWasNotTaken( uint32_t address );
+    virtual void setWasNotTaken( uint32_t address );
 
     /*!
      *  This method increases the counter which indicates how many times
@@ -302,7 +320,7 @@ namespace Coverage {
      *  @param[in] address specifies the execution count that should be
      *             added
      */
-    virtual void sumWasNotTaken( uint32_t address, uint32_t addition );
+    virtual void sumWasNotTaken( uint32_t address, uint32_t addition ) = 0;
 
     /*!
      *  This method returns an unsigned integer which indicates how often
@@ -312,7 +330,7 @@ namespace Coverage {
      *
      *  @return Returns number of executins
      */
-    uint32_t getWasNotTaken( uint32_t address ) const;
+    virtual uint32_t getWasNotTaken( uint32_t address ) const = 0;
 
 
     /*!
@@ -362,38 +380,20 @@ namespace Coverage {
   protected:
 
     /*!
-     *  This structure defines the information that is gathered and
-     *  tracked per address.
+     *  This method increases the counter which indicates how many times
+     *  each address of a block within one address range was executed.
+     *
+     *  @param[in] offset specifies the offset of the first address of
+     *             the block
+     *  @param[in] count specifies the number of addresses in the block
+     *  @param[in] addition specifies the execution count that should be
+     *             added
      */
-    typedef struct {
-      /*!
-       *  This member indicates that the address is the start of
-       *  an instruction.
-       */
-      bool isStartOfInstruction;
-      /*!
-       *  This member indicates how many times the address was executed.
-       */
-      uint32_t wasExecuted;
-      /*!
-       *  This member indicates that the address is a branch instruction.
-       */
-      bool isBranch;
-      /*!
-       *  This member indicates that the address is a NOP instruction.
-       */
-      bool isNop;
-      /*!
-       *  When isBranch is TRUE, this member indicates that the branch
-       *  instruction at the address was taken.
-       */
-      uint32_t wasTaken;
-      /*!
-       *  When isBranch is TRUE, this member indicates that the branch
-       *  instruction at the address was NOT taken.
-       */
-      uint32_t wasNotTaken;
-    } perAddressInfo_t;
+    virtual void sumWasExecutedOffsets(
+      uint32_t offset,
+      uint32_t count,
+      uint32_t addition
+    ) = 0;
 
     /*!
      * 
@@ -406,12 +406,6 @@ namespace Coverage {
      *  This variable contains the size of the code block.
      */
     uint32_t Size;
-
-    /*!
-     *  This is a dynamically allocated array of data that is
-     *  kept for each address.
-     */
-    perAddressInfo_t* Info;
   };
 
 }
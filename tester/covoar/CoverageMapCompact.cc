@@ -0,0 +1,281 @@
+/*! @file CoverageMapCompact.cc
+ *  @brief CoverageMapCompact Implementation
+ *
+ *  This file contains the implementation of the functions supporting
+ *  a CoverageMapCompact which keeps the flags of each address in
+ *  bitsets and only the counters which are needed.
+ */
+
+#include <algorithm>
+
+#include "CoverageMapCompact.h"
+
+namespace Coverage {
+
+  /*
+   *  Orders the counts by the offset they are kept for.
+   */
+  struct offsetLess {
+    template <typename T>
+    bool operator()( const T& count, uint32_t offset ) const
+    {
+      return count.offset < offset;
+    }
+  };
+
+  CoverageMapCompact::CoverageMapCompact(
+    const std::string& exefileName,
+    uint32_t           low,
+    uint32_t           high
+  ) : CoverageMapBase(exefileName, low, high),
+      StartOfInstruction( Size, false ),
+      Executed( Size, false ),
+      Branch( Size, false ),
+      Nop( Size, false )
+  {
+  }
+
+  CoverageMapCompact::~CoverageMapCompact()
+  {
+  }
+
+  CoverageMapCompact::executionCount_t* CoverageMapCompact::findExecutionCount(
+    uint32_t offset
+  )
+  {
+    std::vector<executionCount_t>::iterator itr;
+
+    itr = std::lower_bound(
+      ExecutionCounts.begin(), ExecutionCounts.end(), offset, offsetLess()
+    );
+    if ((itr == ExecutionCounts.end()) || (itr->offset != offset))
+      return NULL;
+
+    return &(*itr);
+  }
+
+  const CoverageMapCompact::branchCount_t* CoverageMapCompact::findBranchCount(
+    uint32_t offset
+  ) const
+  {
+    std::vector<branchCount_t>::const_iterator itr;
+
+    itr = std::lower_bound(
+      BranchCounts.begin(), BranchCounts.end(), offset, offsetLess()
+    );
+    if ((itr == BranchCounts.end()) || (itr->offset != offset))
+      return NULL;
+
+    return &(*itr);
+  }
+
+  CoverageMapCompact::branchCount_t* CoverageMapCompact::addBranchCount(
+    uint32_t offset
+  )
+  {
+    std::vector<branchCount_t>::iterator itr;
+    branchCount_t                        count;
+
+    itr = std::lower_bound(
+      BranchCounts.begin(), BranchCounts.end(), offset, offsetLess()
+    );
+    if ((itr == BranchCounts.end()) || (itr->offset != offset)) {
+      count.offset      = offset;
+      count.wasTaken    = 0;
+      count.wasNotTaken = 0;
+      itr = BranchCounts.insert( itr, count );
+    }
+
+    return &(*itr);
+  }
+
+  void CoverageMapCompact::setIsStartOfInstruction(
+    uint32_t    address
+  )
+  {
+    std::vector<executionCount_t>::iterator itr;
+    executionCount_t                        count;
+    uint32_t                                offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return;
+
+    if (StartOfInstruction[ offset ])
+      return;
+
+    StartOfInstruction[ offset ] = true;
+
+    // The instructions are normally added in address order so the count
+    // is appended.
+    count.offset      = offset;
+    count.wasExecuted = Executed[ offset ] ? 1 : 0;
+    if (ExecutionCounts.empty() || (ExecutionCounts.back().offset < offset))
+      ExecutionCounts.push_back( count );
+    else {
+      itr = std::lower_bound(
+        ExecutionCounts.begin(), ExecutionCounts.end(), offset, offsetLess()
+      );
+      ExecutionCounts.insert( itr, count );
+    }
+  }
+
+  bool CoverageMapCompact::isStartOfInstruction( uint32_t address ) const
+  {
+    uint32_t offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return false;
+
+    return StartOfInstruction[ offset ];
+  }
+
+  void CoverageMapCompact::sumWasExecuted( uint32_t address, uint32_t addition)
+  {
+    executionCount_t* count;
+    uint32_t          offset;
+ 
+    if ((determineOffset( address, &offset ) != true) || (addition == 0))
+      return;
+
+    Executed[ offset ] = true;
+
+    if (StartOfInstruction[ offset ]) {
+      count = findExecutionCount( offset );
+      if (count)
+        count->wasExecuted += addition;
+    }
+  }
+
+  void CoverageMapCompact::sumWasExecutedOffsets(
+    uint32_t offset,
+    uint32_t count,
+    uint32_t addition
+  )
+  {
+    std::vector<executionCount_t>::iterator itr;
+    uint32_t                                i;
+
+    if (addition == 0)
+      return;
+
+    for (i = 0; i < count; i++)
+      Executed[ offset + i ] = true;
+
+    // Every instruction has a count so the counts of the instructions in
+    // the block follow each other.
+    itr = std::lower_bound(
+      ExecutionCounts.begin(), ExecutionCounts.end(), offset, offsetLess()
+    );
+    for (; (itr != ExecutionCounts.end()) && (itr->offset - offset < count);
+         itr++)
+      itr->wasExecuted += addition;
+  }
+
+  uint32_t CoverageMapCompact::getWasExecuted( uint32_t address ) const
+  {
+    std::vector<executionCount_t>::const_iterator itr;
+    uint32_t                                      offset;
+
+    if (determineOffset( address, &offset ) != true)
+      return 0;
+
+    if (!Executed[ offset ])
+      return 0;
+
+    if (!StartOfInstruction[ offset ])
+      return 1;
+
+    itr = std::lower_bound(
+      ExecutionCounts.begin(), ExecutionCounts.end(), offset, offsetLess()
+    );
+    return itr->wasExecuted;
+  }
+
+  void CoverageMapCompact::setIsBranch(
+    uint32_t    address
+  )
+  {
+    uint32_t offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return;
+
+    Branch[ offset ] = true;
+  }
+
+  bool CoverageMapCompact::isNop( uint32_t address ) const
+  {
+    uint32_t offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return false;
+
+    return Nop[ offset ];
+  }
+
+  void CoverageMapCompact::setIsNop(
+    uint32_t    address
+  )
+  {
+    uint32_t offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return;
+
+    Nop[ offset ] = true;
+  }
+
+  bool CoverageMapCompact::isBranch( uint32_t address ) const
+  {
+    uint32_t offset;
+ 
+    if (determineOffset( address, &offset ) != true)
+      return false;
+
+    return Branch[ offset ];
+  }
+
+  void CoverageMapCompact::sumWasNotTaken( uint32_t address, uint32_t addition)
+  {
+    uint32_t offset;
+
+    if ((determineOffset( address, &offset ) != true) || (addition == 0))
+      return;
+
+    addBranchCount( offset )->wasNotTaken += addition;
+  }
+
+  uint32_t CoverageMapCompact::getWasNotTaken( uint32_t address ) const
+  {
+    const branchCount_t* count;
+    uint32_t             offset;
+
+    if (determineOffset( address, &offset ) != true)
+      return 0;
+
+    count = findBranchCount( offset );
+    return count ? count->wasNotTaken : 0;
+  }
+
+  void CoverageMapCompact::sumWasTaken( uint32_t address, uint32_t addition)
+  {
+    uint32_t offset;
+
+    if ((determineOffset( address, &offset ) != true) || (addition == 0))
+      return;
+
+    addBranchCount( offset )->wasTaken += addition;
+  }
+
+  uint32_t CoverageMapCompact::getWasTaken( uint32_t address ) const
+  {
+    const branchCount_t* count;
+    uint32_t             offset;
+
+    if (determineOffset( address, &offset ) != true)
+      return 0;
+
+    count = findBranchCount( offset );
+    return count ? count->wasTaken : 0;
+  }
+}
@@ -0,0 +1,193 @@
+/*! @file CoverageMapCompact.h
+ *  @brief CoverageMapCompact Specification
+ *
+ *  This file contains the specification of the CoverageMapCompact class.
+ */
+
+#ifndef __COVERAGE_MAP_COMPACT_H__
+#define __COVERAGE_MAP_COMPACT_H__
+
+#include <vector>
+
+#include "CoverageMapBase.h"
+
+namespace Coverage {
+
+  /*! @class CoverageMapCompact
+   *
+   *  This class implements a coverage map which supports a single
+   *  range of addresses from low to high using less memory than a
+   *  CoverageMap. The flags of each address are kept in bitsets and
+   *  the execution counts are only kept for the start of each
+   *  instruction. The branch counts are only kept for the addresses
+   *  with a branch taken or not taken. The execution count of an
+   *  address which is not the start of an instruction is one if the
+   *  address was executed and zero otherwise.
+   */
+  class CoverageMapCompact : public CoverageMapBase {
+
+  public:
+
+    /*! 
+     *  This method constructs a CoverageMapCompact instance.
+     *
+     *  @param[in] exefileName specifies the executable this originated in
+     *  @param[in] low specifies the lowest address of the coverage map.
+     *  @param[in] high specifies the highest address of the coverage map.
+     */
+    CoverageMapCompact(
+      const std::string& exefileName,
+      uint32_t           low,
+      uint32_t           high
+    );
+
+    /* Inherit documentation from base class. */
+    virtual ~CoverageMapCompact();
+
+    /* Inherit documentation from base class. */
+    void setIsStartOfInstruction(
+      uint32_t address
+    );
+
+    /* Inherit documentation from base class. */
+    bool isStartOfInstruction( uint32_t address ) const;
+
+    /* Inherit documentation from base class. */
+    void sumWasExecuted( uint32_t address, uint32_t addition );
+
+    /* Inherit documentation from base class. */
+    uint32_t getWasExecuted( uint32_t address ) const;
+
+    /* Inherit documentation from base class. */
+    void setIsBranch( uint32_t address );
+
+    /* Inherit documentation from base class. */
+    bool isNop( uint32_t address ) const;
+
+    /* Inherit documentation from base class. */
+    void setIsNop( uint32_t address );
+
+    /* Inherit documentation from base class. */
+    bool isBranch( uint32_t address ) const;
+
+    /* Inherit documentation from base class. */
+    void sumWasTaken( uint32_t address, uint32_t addition );
+
+    /* Inherit documentation from base class. */
+    uint32_t getWasTaken( uint32_t address ) const;
+
+    /* Inherit documentation from base class. */
+    void sumWasNotTaken( uint32_t address, uint32_t addition );
+
+    /* Inherit documentation from base class. */
+    uint32_t getWasNotTaken( uint32_t address ) const;
+
+  protected:
+
+    /* Inherit documentation from base class. */
+    void sumWasExecutedOffsets(
+      uint32_t offset,
+      uint32_t count,
+      uint32_t addition
+    );
+
+    /*!
+     *  This structure defines the execution count of an instruction.
+     */
+    typedef struct {
+      /*!
+       *  This member is the offset of the start of the instruction.
+       */
+      uint32_t offset;
+      /*!
+       *  This member indicates how many times the instruction was executed.
+       */
+      uint32_t wasExecuted;
+    } executionCount_t;
+
+    /*!
+     *  This structure defines the branch counts of an address.
+     */
+    typedef struct {
+      /*!
+       *  This member is the offset of the branch instruction.
+       */
+      uint32_t offset;
+      /*!
+       *  This member indicates how many times the branch was taken.
+       */
+      uint32_t wasTaken;
+      /*!
+       *  This member indicates how many times the branch was NOT taken.
+       */
+      uint32_t wasNotTaken;
+    } branchCount_t;
+
+    /*!
+     *  This method returns the execution count of the instruction
+     *  starting at the specified offset.
+     *
+     *  @param[in] offset specifies the offset of the instruction
+     *
+     *  @return Returns the execution count or NULL if the offset is
+     *   not the start of an instruction.
+     */
+    executionCount_t* findExecutionCount( uint32_t offset );
+
+    /*!
+     *  This method returns the branch counts of the specified offset.
+     *
+     *  @param[in] offset specifies the offset of the branch instruction
+     *
+     *  @return Returns the branch counts or NULL if the branch at the
+     *   offset was never taken or not taken.
+     */
+    const branchCount_t* findBranchCount( uint32_t offset ) const;
+
+    /*!
+     *  This method returns the branch counts of the specified offset
+     *  adding them if they do not exist.
+     *
+     *  @param[in] offset specifies the offset of the branch instruction
+     *
+     *  @return Returns the branch counts.
+     */
+    branchCount_t* addBranchCount( uint32_t offset );
+
+    /*!
+     *  This member is the bitset of the addresses which are the start
+     *  of an instruction.
+     */
+    std::vector<bool> StartOfInstruction;
+
+    /*!
+     *  This member is the bitset of the addresses which were executed.
+     */
+    std::vector<bool> Executed;
+
+    /*!
+     *  This member is the bitset of the addresses which are the start
+     *  of a branch instruction.
+     */
+    std::vector<bool> Branch;
+
+    /*!
+     *  This member is the bitset of the addresses which are the start
+     *  of a NOP instruction.
+     */
+    std::vector<bool> Nop;
+
+    /*!
+     *  This member contains the execution count of each instruction
+     *  sorted by offset.
+     */
+    std::vector<executionCount_t> ExecutionCounts;
+
+    /*!
+     *  This member contains the branch counts sorted by offset.
+     */
+    std::vector<branchCount_t> BranchCounts;
+  };
+
+}
+#endif
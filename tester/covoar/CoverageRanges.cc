@@ -39,23 +39,18 @@ namespace Coverage {
     c.reason           = why;
     c.instructionCount = numInstructions;
     set.push_back(c);
+    ids.insert( std::make_pair( lowAddressArg, c.id ) );
   }
 
   uint32_t  CoverageRanges::getId( uint32_t lowAddress )
   {
-    Coverage::CoverageRanges::ranges_t::iterator    ritr;
-    uint32_t                                        result = 0;
-
-    for (ritr =  set.begin() ;
-         ritr != set.end() ;
-         ritr++ ) {
-      if ( ritr->lowAddress == lowAddress ) {
-        result = ritr->id;
-        break;
-      }
-    }
-
-    return result;
+    std::map<uint32_t, uint32_t>::iterator itr;
+
+    itr = ids.find( lowAddress );
+    if (itr == ids.end())
+      return 0;
+
+    return itr->second;
   }
 
 }
@@ -9,6 +9,7 @@
 
 #include <stdint.h>
 #include <list>
+#include <map>
 #include <string>
 
 namespace Coverage {
@@ -122,6 +123,11 @@ namespace Coverage {
  
     protected:
 
+    /*!
+     *  This member contains the index of the first range added
+     *  with each low address.
+     */
+    std::map<uint32_t, uint32_t> ids;
 
   };
 
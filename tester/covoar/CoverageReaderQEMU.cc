@@ -11,6 +11,10 @@
 #include <stdlib.h>
 #include <sys/stat.h>
 
+#if HAVE_MMAP
+#include <sys/mman.h>
+#endif
+
 #include "app_common.h"
 #include "CoverageReaderQEMU.h"
 #include "CoverageMap.h"
@@ -26,6 +30,28 @@
 
 namespace Coverage {
 
+  /*
+   *  The trace entries are counted by block. A block is the same if the
+   *  address, size and operation are the same so the key packs them into
+   *  a single value.
+   */
+  static inline uint64_t blockKey( const struct trace_entry* entry )
+  {
+    return ((uint64_t) entry->pc) |
+           (((uint64_t) entry->size) << 32) |
+           (((uint64_t) entry->op) << 48);
+  }
+
+  static void countBlocks(
+    const struct trace_entry*             entries,
+    size_t                                num_entries,
+    CoverageReaderQEMU::blockCounts_t&    blocks
+  )
+  {
+    for (size_t count=0; count<num_entries; count++)
+      blocks[ blockKey( &entries[count] ) ]++;
+  }
+
   CoverageReaderQEMU::CoverageReaderQEMU()
   {
     BranchInfoAvailable = true;
@@ -40,8 +66,11 @@ namespace Coverage {
     ExecutableInfo* const executableInformation
   )
   {
+    blockCounts_t       blocks;
     struct trace_header header;
-    uintptr_t           i;
+    uintptr_t           entries = 0;
+    bool                mapped = false;
+    bool                consolidated;
     int                 status;
     FILE*               traceFile;
     uint8_t             taken;
@@ -76,6 +105,10 @@ namespace Coverage {
       exit( -1 );
     }
 
+    // A consolidated trace has an entry for each block with the ops of the
+    // block OR-ed together so a branch can be taken and not taken.
+    consolidated = (header.kind == QEMU_TRACE_KIND_CONSOLIDATED);
+
     #if 0
       fprintf(
         stderr,
@@ -95,19 +128,40 @@ namespace Coverage {
     #endif
 
     //
-    // Read ENTRIES number of trace entries.
+    // Count the trace entries of each block. A long running test executes
+    // the same blocks many times so there are far fewer blocks to mark in
+    // the coverage maps than there are trace entries. Map the file if we
+    // can else read ENTRIES number of trace entries at a time.
     //
+#if HAVE_MMAP
+    struct stat traceStat;
+    if (fstat( fileno( traceFile ), &traceStat ) == 0) {
+      size_t length = traceStat.st_size;
+      if (length > sizeof(trace_header)) {
+        void* base = mmap( NULL, length, PROT_READ, MAP_PRIVATE,
+                           fileno( traceFile ), 0 );
+        if (base != MAP_FAILED) {
+          entries = (length - sizeof(trace_header)) / sizeof(struct trace_entry);
+          countBlocks(
+            (const struct trace_entry*) ((char*) base + sizeof(trace_header)),
+            entries,
+            blocks
+          );
+          munmap( base, length );
+        }
+        mapped = (base != MAP_FAILED);
+      }
+    }
+#endif
+
 #define ENTRIES 1024
-    while (1) {
-      CoverageMapBase     *aCoverageMap = NULL;
-      struct trace_entry  entries[ENTRIES];
-      struct trace_entry  *entry;
+    while (!mapped) {
+      struct trace_entry  entries_read[ENTRIES];
       int                 num_entries;
 
-
-      // Read and process each line of the coverage file.
+      // Read and count each entry of the coverage file.
       num_entries = fread(
-        entries,
+        entries_read,
         sizeof(struct trace_entry),
         ENTRIES,
         traceFile
@@ -115,56 +169,78 @@ namespace Coverage {
       if (num_entries == 0)
         break;
 
-      // Get the coverage map for each entry.  Note that the map is
-      // the same for each entry in the coverage map
-      for (int count=0; count<num_entries; count++) {
+      countBlocks( entries_read, num_entries, blocks );
+      entries += num_entries;
+    }
+
+    fclose( traceFile );
+
+    if (Verbose)
+      fprintf(
+        stderr,
+        "%s: %lu trace entries, %lu blocks\n",
+        file,
+        (unsigned long) entries,
+        (unsigned long) blocks.size()
+      );
+
+    //
+    // Mark each block in the coverage map holding it by the number of times
+    // it was in the trace.
+    //
+    for (blockCounts_t::iterator bitr = blocks.begin();
+         bitr != blocks.end();
+         bitr++) {
+      CoverageMapBase     *aCoverageMap = NULL;
+      struct trace_entry  block;
+      struct trace_entry  *entry = &block;
+      uint32_t            executions = bitr->second;
 
-        entry = &entries[count];
+      entry->pc = bitr->first & 0xffffffff;
+      entry->size = (bitr->first >> 32) & 0xffff;
+      entry->op = (bitr->first >> 48) & 0xff;
 
-        // Mark block as fully executed.
-        // Obtain the coverage map containing the specified address.
-        aCoverageMap = executableInformation->getCoverageMap( entry->pc );
+      // Obtain the coverage map containing the specified address.
+      aCoverageMap = executableInformation->getCoverageMap( entry->pc );
 
-        // Ensure that coverage map exists.
-        if (!aCoverageMap)
-          continue;
+      // Ensure that coverage map exists.
+      if (!aCoverageMap)
+        continue;
 
-        // Set was executed for each TRACE_OP_BLOCK
-        if (entry->op & TRACE_OP_BLOCK) {
-         for (i=0; i<entry->size; i++) {
-            aCoverageMap->setWasExecuted( entry->pc + i );
-          }
-        }
+      // Set was executed for each TRACE_OP_BLOCK
+      if (entry->op & TRACE_OP_BLOCK) {
+        aCoverageMap->sumWasExecutedRange( entry->pc, entry->size, executions );
+      }
 
-        // Determine if additional branch information is available.
-        if ( (entry->op & branchInfo) != 0 ) {
-          uint32_t  offset_e, offset_a;
-          uint32_t  a = entry->pc + entry->size - 1;
-          if ((aCoverageMap->determineOffset( a, &offset_a ) != true)   ||
-             (aCoverageMap->determineOffset( entry->pc, &offset_e ) != true))
-          {
-            fprintf(
-              stderr,
-              "*** Trace block is inconsistent with coverage map\n"
-              "*** Trace block (0x%08x - 0x%08x) for %d bytes\n"
-              "*** Coverage map %s\n",
-              entry->pc,
-              a,
-              entry->size,
-              file
-            );
-          } else {
-            while (!aCoverageMap->isStartOfInstruction(a))
-              a--;
-            if (entry->op & taken) {
-              aCoverageMap->setWasTaken( a );
-            } else if (entry->op & notTaken) {
-              aCoverageMap->setWasNotTaken( a );
-            }
+      // Determine if additional branch information is available.
+      if ( (entry->op & branchInfo) != 0 ) {
+        uint32_t  offset_e, offset_a;
+        uint32_t  a = entry->pc + entry->size - 1;
+        if ((aCoverageMap->determineOffset( a, &offset_a ) != true)   ||
+           (aCoverageMap->determineOffset( entry->pc, &offset_e ) != true))
+        {
+          fprintf(
+            stderr,
+            "*** Trace block is inconsistent with coverage map\n"
+            "*** Trace block (0x%08x - 0x%08x) for %d bytes\n"
+            "*** Coverage map %s\n",
+            entry->pc,
+            a,
+            entry->size,
+            file
+          );
+        } else {
+          while (!aCoverageMap->isStartOfInstruction(a))
+            a--;
+          if (entry->op & taken) {
+            aCoverageMap->sumWasTaken( a, executions );
+            if (consolidated && (entry->op & notTaken))
+              aCoverageMap->sumWasNotTaken( a, executions );
+          } else if (entry->op & notTaken) {
+            aCoverageMap->sumWasNotTaken( a, executions );
           }
         }
       }
     }
-    fclose( traceFile );
   }
 }
@@ -7,6 +7,9 @@
 #ifndef __COVERAGE_READER_QEMU_H__
 #define __COVERAGE_READER_QEMU_H__
 
+#include <stdint.h>
+#include <unordered_map>
+
 #include "CoverageReaderBase.h"
 #include "ExecutableInfo.h"
 
@@ -29,6 +32,12 @@ TBD
 
   public:
 
+    /*!
+     *  This type counts the trace entries of each block keyed on the
+     *  block's address, size and operation.
+     */
+    typedef std::unordered_map<uint64_t, uint32_t> blockCounts_t;
+
     /* Inherit documentation from base class. */
     CoverageReaderQEMU();
 
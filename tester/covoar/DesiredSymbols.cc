@@ -14,7 +14,7 @@
 
 #include "DesiredSymbols.h"
 #include "app_common.h"
-#include "CoverageMap.h"
+#include "CoverageFactory.h"
 #include "ObjdumpProcessor.h"
 
 namespace Coverage {
@@ -28,7 +28,8 @@ namespace Coverage {
   }
 
   void DesiredSymbols::load(
-    const char* const symbolsFile
+    const char* const symbolsFile,
+    bool              reportDuplicates
   )
   {
     int                     cStatus;
@@ -80,13 +81,14 @@ namespace Coverage {
       // Have we already seen this one?
       if ( !done ) {
         if (set.find( inputBuffer ) != set.end()) {
-          fprintf(
-            stderr,
-            "File: %s, Line %d: Duplicate symbol: %s\n",
-            symbolsFile,
-            line,
-            inputBuffer
-          );
+          if (reportDuplicates)
+            fprintf(
+              stderr,
+              "File: %s, Line %d: Duplicate symbol: %s\n",
+              symbolsFile,
+              line,
+              inputBuffer
+            );
 
           delete symInfo;
         }
@@ -135,6 +137,53 @@ namespace Coverage {
     }
   }
 
+  DesiredSymbols* DesiredSymbols::subset(
+    const char* const symbolsFile
+  )
+  {
+    DesiredSymbols*       theSubset;
+    symbolSet_t::iterator sitr;
+    symbolSet_t::iterator uitr;
+
+    theSubset = new DesiredSymbols();
+    theSubset->load( symbolsFile );
+
+    // Look at each symbol of the subset.
+    for (sitr = theSubset->set.begin();
+         sitr != theSubset->set.end();
+         sitr++) {
+
+      uitr = set.find( sitr->first );
+      if (uitr == set.end())
+        continue;
+
+      sitr->second = uitr->second;
+
+      // If the unified coverage map does not exist, the symbol was
+      // never referenced by any executable and is not in the totals.
+      if (!sitr->second.unifiedCoverageMap)
+        continue;
+
+      theSubset->stats.branchesAlwaysTaken +=
+        sitr->second.stats.branchesAlwaysTaken;
+      theSubset->stats.branchesExecuted +=
+        sitr->second.stats.branchesExecuted;
+      theSubset->stats.branchesNeverTaken +=
+        sitr->second.stats.branchesNeverTaken;
+      theSubset->stats.branchesNotExecuted +=
+        sitr->second.stats.branchesNotExecuted;
+      theSubset->stats.sizeInBytes += sitr->second.stats.sizeInBytes;
+      theSubset->stats.sizeInInstructions +=
+        sitr->second.stats.sizeInInstructions;
+      theSubset->stats.uncoveredBytes += sitr->second.stats.uncoveredBytes;
+      theSubset->stats.uncoveredInstructions +=
+        sitr->second.stats.uncoveredInstructions;
+      theSubset->stats.uncoveredRanges += sitr->second.stats.uncoveredRanges;
+    }
+
+    return theSubset;
+  }
+
   void DesiredSymbols::calculateStatistics( void )
   {
     uint32_t                              a;
@@ -388,7 +437,9 @@ namespace Coverage {
 
       highAddress = size - 1;
 
-      aCoverageMap = new CoverageMap( exefileName, 0, highAddress );
+      aCoverageMap = CreateCoverageMap(
+        exefileName, 0, highAddress, CompactCoverageMaps
+      );
       if (!aCoverageMap) {
 
         fprintf(
@@ -425,15 +476,24 @@ namespace Coverage {
     CoverageRanges::ranges_t::iterator ritr;
     char                               rpath[PATH_MAX];
     FILE*                              tmpfile;
+    std::string                        addresses;
+    std::string                        key;
+    char                               ranges1[64];
+    char                               ranges2[64];
+
+    // Name the temporary files after the process so covoar instances
+    // running in the same directory do not share them.
+    sprintf( ranges1, "ranges1.%d.tmp", (int) getpid() );
+    sprintf( ranges2, "ranges2.%d.tmp", (int) getpid() );
 
     // Open a temporary file for the uncovered ranges.
-    tmpfile = fopen( "ranges1.tmp", "w" );
+    tmpfile = fopen( ranges1, "w" );
     if ( !tmpfile ) {
       fprintf(
         stderr,
         "ERROR: DesiredSymbols::determineSourceLines - "
         "unable to open %s\n",
-        "ranges1.tmp"
+        ranges1
       );
       exit(-1);
     }
@@ -442,12 +502,14 @@ namespace Coverage {
     for (ritr =  theRanges->set.begin();
          ritr != theRanges->set.end();
          ritr++ ) {
-      fprintf(
-        tmpfile,
+      sprintf(
+        command,
         "0x%08x\n0x%08x\n",
         ritr->lowAddress - theExecutable->getLoadAddress(),
         ritr->highAddress - theExecutable->getLoadAddress()
       );
+      fputs( command, tmpfile );
+      addresses += command;
     }
 
     fclose( tmpfile );
@@ -458,33 +520,45 @@ namespace Coverage {
     else
       fileName = theExecutable->getFileName();
 
-    sprintf(
-      command,
-      "%s -Ce %s <%s | dos2unix >%s",
-      TargetInfo->getAddr2line(),
-      fileName.c_str(),
-      "ranges1.tmp",
-      "ranges2.tmp"
-    );
+    // The cache has the source lines if an identical file has been
+    // given the same addresses.
+    if (analysisCache) {
+      sprintf( command, "%s -Ce | dos2unix", TargetInfo->getAddr2line() );
+      key = analysisCache->key( fileName, command, addresses );
+    }
 
-    if (system( command )) {
-      fprintf(
-        stderr,
-        "ERROR: DesiredSymbols::determineSourceLines - "
-        "command (%s) failed\n",
-        command
+    if (!analysisCache || !analysisCache->fetch( key, ranges2 )) {
+      sprintf(
+        command,
+        "%s -Ce %s <%s | dos2unix >%s",
+        TargetInfo->getAddr2line(),
+        fileName.c_str(),
+        ranges1,
+        ranges2
       );
-      exit( -1 );
+
+      if (system( command )) {
+        fprintf(
+          stderr,
+          "ERROR: DesiredSymbols::determineSourceLines - "
+          "command (%s) failed\n",
+          command
+        );
+        exit( -1 );
+      }
+
+      if (analysisCache)
+        analysisCache->store( key, ranges2 );
     }
 
     // Open the addr2line output file.
-    tmpfile = fopen( "ranges2.tmp", "r" );
+    tmpfile = fopen( ranges2, "r" );
     if ( !tmpfile ) {
       fprintf(
         stderr,
         "ERROR: DesiredSymbols::determineSourceLines - "
         "unable to open %s\n",
-        "ranges2.tmp"
+        ranges2
       );
       exit(-1);
     }
@@ -533,8 +607,8 @@ namespace Coverage {
     }
 
     fclose( tmpfile );
-    unlink( "ranges1.tmp" );
-    unlink( "ranges2.tmp" );
+    unlink( ranges1 );
+    unlink( ranges2 );
   }
 
   SymbolInformation* DesiredSymbols::find(
@@ -127,7 +127,7 @@ namespace Coverage {
     /*!
      *  This member contains the disassembly associated with a symbol.
      */
-    std::list<ObjdumpProcessor::objdumpLine_t> instructions;
+    ObjdumpProcessor::objdumpLines_t instructions;
 
     /*!
      *  This member contains the executable that was used to
@@ -293,9 +293,13 @@ namespace Coverage {
     /*!
      *  This method creates the set of symbols to analyze from the symbols
      *  listed in the specified file.
+     *  @param[in] symbolsFile specifies the file listing the symbols
+     *  @param[in] reportDuplicates specifies if symbols already in the
+     *             set are reported
      */
     void load(
-      const char* const symbolsFile
+      const char* const symbolsFile,
+      bool              reportDuplicates = true
     );
 
     /*!
@@ -317,6 +321,18 @@ namespace Coverage {
      */
     void preprocess( void );
 
+    /*!
+     *  This method creates the set of symbols listed in the specified
+     *  file from this set after the coverage has been analyzed. The
+     *  symbol information is shared with this set and the statistics
+     *  are the totals of the symbols in the subset.
+     *  @param[in] symbolsFile specifies the file listing the symbols
+     *  @return Returns a pointer to the subset
+     */
+    DesiredSymbols* subset(
+      const char* const symbolsFile
+    );
+
     /*!
      *  This member contains the statistics kept on each symbol.
      */    
@@ -9,7 +9,7 @@
 
 #include "ExecutableInfo.h"
 #include "app_common.h"
-#include "CoverageMap.h"
+#include "CoverageFactory.h"
 #include "DesiredSymbols.h"
 #include "SymbolTable.h"
 
@@ -100,7 +100,9 @@ namespace Coverage {
 
     itr = coverageMaps.find( symbolName );
     if ( itr == coverageMaps.end() ) {
-      theMap = new CoverageMap( fileName, lowAddress, highAddress );
+      theMap = CreateCoverageMap(
+        fileName, lowAddress, highAddress, CompactCoverageMaps
+      );
       coverageMaps[ symbolName ] = theMap;
     } else {
       theMap = itr->second;
@@ -237,7 +237,7 @@ namespace Gcov {
     uint32_t	    baseAddress = 0;
     uint32_t        baseSize;
     uint32_t        currentAddress;
-    std::list<Coverage::ObjdumpProcessor::objdumpLine_t>::iterator   instruction;
+    Coverage::ObjdumpProcessor::objdumpLines_t::iterator   instruction;
 
     if ( coverageMap != NULL ) {
 
@@ -399,7 +399,7 @@ namespace Gcov {
 
     uint32_t               baseAddress = 0;
     uint32_t               currentAddress = 0;
-    std::list<Coverage::ObjdumpProcessor::objdumpLine_t>::iterator  instruction;
+    Coverage::ObjdumpProcessor::objdumpLines_t::iterator  instruction;
     blocks_iterator_t 	   blockIterator;
     blocks_iterator_t 	   blockIterator2;
     arcs_iterator_t 	   arcIterator;
@@ -567,7 +567,7 @@ namespace Gcov {
   {
     uint32_t	    baseAddress = 0;
     uint32_t        currentAddress;
-    std::list<Coverage::ObjdumpProcessor::objdumpLine_t>::iterator   instruction;
+    Coverage::ObjdumpProcessor::objdumpLines_t::iterator   instruction;
 
     if ( coverageMap == NULL )
       return false;
@@ -8,9 +8,11 @@
 
 #include <assert.h>
 #include <ctype.h>
+#include <limits.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <unistd.h>
 #include <algorithm>
 #include <string>
 
@@ -28,7 +30,7 @@ namespace Coverage {
     std::string&                     symbolName,
     uint32_t                         lowAddress,
     uint32_t                         highAddress,
-    ObjdumpProcessor::objdumpLines_t instructions
+    ObjdumpProcessor::objdumpLines_t& instructions
   ) {
 
     CoverageMapBase*                                   aCoverageMap = NULL;
@@ -108,12 +110,7 @@ namespace Coverage {
            itr++ ) {
 
         aCoverageMap->setIsStartOfInstruction( itr->address );
-        if (strcmp(symbolName.c_str(), "_Thread_Handler"))
-        {
-          fprintf(stderr, "%s\n", itr->line.c_str());
-        }
       }
-      
 
       // Create a unified coverage map for the symbol.
       SymbolsToAnalyze->createCoverageMap(
@@ -237,31 +234,68 @@ namespace Coverage {
 
   FILE* ObjdumpProcessor::getFile( std::string fileName ) 
   {
-    char               dumpFile[128];
+    char               dumpFile[PATH_MAX];
+    char               tempFile[PATH_MAX];
     FILE*              objdumpFile;
     char               buffer[ 512 ];
     int                status;
 
     sprintf( dumpFile, "%s.dmp", fileName.c_str() );
       
-    // Generate the objdump.
+    // Generate the objdump unless the cache has the objdump of an
+    // identical file. The objdump is written to a temporary file and
+    // renamed so covoar instances running in parallel never read a
+    // partial objdump.
     if (FileIsNewer( fileName.c_str(), dumpFile )) {
-      sprintf(
-        buffer,
-        "%s -Cda --section=.text --source %s | sed -e \'s/ *$//\' >%s",
-        TargetInfo->getObjdump(),
-        fileName.c_str(),
-        dumpFile
-      );
+      std::string key;
+
+      sprintf( tempFile, "%s.%d", dumpFile, (int) getpid() );
+
+      if (analysisCache) {
+        sprintf(
+          buffer,
+          "%s -Cda --section=.text --source",
+          TargetInfo->getObjdump()
+        );
+        key = analysisCache->key( fileName, buffer );
+      }
+
+      if (!analysisCache || !analysisCache->fetch( key, tempFile )) {
+        sprintf(
+          buffer,
+          "%s -Cda --section=.text --source %s | sed -e \'s/ *$//\' >%s",
+          TargetInfo->getObjdump(),
+          fileName.c_str(),
+          tempFile
+        );
 
-      status = system( buffer );
-      if (status) {
+        status = system( buffer );
+        if (status) {
+          fprintf(
+            stderr,
+            "ERROR: ObjdumpProcessor::getFile - command (%s) failed with %d\n",
+            buffer,
+            status
+          );
+          unlink( tempFile );
+          exit( -1 );
+        }
+
+        if (analysisCache)
+          analysisCache->store( key, tempFile );
+      }
+
+#if WIN32
+      unlink( dumpFile );
+#endif
+      if (rename( tempFile, dumpFile )) {
         fprintf(
           stderr,
-          "ERROR: ObjdumpProcessor::getFile - command (%s) failed with %d\n",
-          buffer,
-          status
+          "ERROR: ObjdumpProcessor::getFile - unable to rename %s to %s\n",
+          tempFile,
+          dumpFile
         );
+        unlink( tempFile );
         exit( -1 );
       }
     } 
@@ -284,8 +318,8 @@ namespace Coverage {
   {
     objdumpFile_t::iterator itr;
 
-    itr = find ( objdumpList.begin(), objdumpList.end(), address );
-    if (itr == objdumpList.end()) {
+    itr = std::lower_bound( objdumpList.begin(), objdumpList.end(), address );
+    if ((itr == objdumpList.end()) || (*itr != address)) {
       return 0;
     }
     
@@ -338,6 +372,12 @@ namespace Coverage {
         );
       }
     }
+
+    // Sort the addresses so they can be searched.
+    std::sort( objdumpList.begin(), objdumpList.end() );
+    objdumpList.erase(
+      std::unique( objdumpList.begin(), objdumpList.end() ), objdumpList.end()
+    );
   }
 
   void ObjdumpProcessor::load(
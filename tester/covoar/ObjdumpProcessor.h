@@ -9,6 +9,7 @@
 
 #include <list>
 #include <string>
+#include <vector>
 
 #include "ExecutableInfo.h"
 #include "TargetBase.h"
@@ -72,14 +73,14 @@ namespace Coverage {
      *  This object defines a list of object dump lines
      *  for a file.
      */
-    typedef std::list<objdumpLine_t> objdumpLines_t;
+    typedef std::vector<objdumpLine_t> objdumpLines_t;
 
    
     /*!
-     *  This object defines a list of instruction addresses
+     *  This object defines a sorted list of instruction addresses
      *  that will be extracted from the objdump file.
      */ 
-    typedef std::list<uint32_t> objdumpFile_t;
+    typedef std::vector<uint32_t> objdumpFile_t;
 
     /*!
      *  This method constructs an ObjdumpProcessor instance.
@@ -174,8 +174,8 @@ void ReportsBase::WriteAnnotatedReport(
   Coverage::CoverageMapBase*                                     theCoverageMap = NULL;
   uint32_t                                                       bAddress = 0;
   AnnotatedLineState_t                                           state;
-  std::list<Coverage::ObjdumpProcessor::objdumpLine_t>*          theInstructions;
-  std::list<Coverage::ObjdumpProcessor::objdumpLine_t>::iterator itr;
+  Coverage::ObjdumpProcessor::objdumpLines_t*                   theInstructions;
+  Coverage::ObjdumpProcessor::objdumpLines_t::iterator           itr;
 
   aFile = OpenAnnotatedFile(fileName);
   if (!aFile)
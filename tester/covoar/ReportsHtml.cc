@@ -30,7 +30,8 @@
 namespace Coverage {
 
   ReportsHtml::ReportsHtml( time_t timestamp ):
-    ReportsBase( timestamp )
+    ReportsBase( timestamp ),
+    lastState_m( A_SOURCE )
   {
     reportExtension_m = ".html";
   }
@@ -41,9 +41,8 @@ private:
 	std::vector<std::string> libraries;
 	std::vector<std::string> symbols;
 
-	std::string parseNmOutputLine(std::string line);
 	std::string getLibname(std::string libPath);
-	void parseNmOutput(std::ifstream& nm_out, const std::string& lib);
+	void loadSymbols(const std::string& lib);
 };
 
 } /* namespace Symbols */
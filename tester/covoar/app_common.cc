@@ -56,12 +56,14 @@
 /*
  *  Global variables for the program
  */
+Coverage::AnalysisCache*    analysisCache       = NULL;
 Coverage::Explanations*     AllExplanations     = NULL;
 Coverage::ObjdumpProcessor* objdumpProcessor    = NULL;
 Coverage::DesiredSymbols*   SymbolsToAnalyze    = NULL;
 bool                        Verbose             = false;
 const char*                 outputDirectory     = ".";
 bool                        BranchInfoAvailable = false;
+bool                        CompactCoverageMaps = false;
 Target::TargetBase*         TargetInfo          = NULL;
 const char*                 dynamicLibrary      = NULL;
 const char*                 projectName         = NULL;
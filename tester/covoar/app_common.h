@@ -3,16 +3,19 @@
 
 #include <list>
 
+#include "AnalysisCache.h"
 #include "DesiredSymbols.h"
 #include "Explanations.h"
 #include "TargetBase.h"
 
+extern Coverage::AnalysisCache*     analysisCache;
 extern Coverage::Explanations*      AllExplanations;
 extern Coverage::ObjdumpProcessor*  objdumpProcessor;
 extern Coverage::DesiredSymbols*    SymbolsToAnalyze;
 extern bool                         Verbose;
 extern const char*                  outputDirectory;
 extern bool                         BranchInfoAvailable;
+extern bool                         CompactCoverageMaps;
 extern Target::TargetBase*          TargetInfo;
 extern const char*                  dynamicLibrary;
 extern const char*                  projectName;
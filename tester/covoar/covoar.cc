@@ -11,6 +11,14 @@
 #include <unistd.h>
 
 #include <list>
+#include <mutex>
+#include <thread>
+#include <utility>
+#include <vector>
+
+#if WIN32
+#include <direct.h>
+#endif
 
 #include "app_common.h"
 #include "CoverageFactory.h"
@@ -39,9 +47,13 @@ const char*                          executableExtension = NULL;
 int                                  executableExtensionLength = 0;
 std::list<Coverage::ExecutableInfo*> executablesToAnalyze;
 const char*                          explanations = NULL;
+const char*                          cacheDirectory = NULL;
+const char*                          cacheSize = NULL;
+const char*                          jobs = NULL;
 char*                                progname;
 const char*                          symbolsFile = NULL;
-const char*							 symbolSetFile = NULL;
+std::list<const char*>               symbolSetFiles;
+std::list<std::string>               symbolSetNames;
 const char*		             gcnosFileName = NULL;
 char				     gcnoFileName[FILE_NAME_LENGTH];
 char				     gcdaFileName[FILE_NAME_LENGTH];
@@ -69,6 +81,8 @@ void usage()
     "  -E EXPLANATIONS           - name of file with explanations\n"
     "  -s SYMBOLS_FILE           - name of file with symbols of interest\n"
     "  -S SYMBOL_SET_FILE        - name of file specifying symbol set of interest\n"
+    "                              (repeat for more symbol sets, each set is\n"
+    "                              reported in a directory of the output directory)\n"
     "  -1 EXECUTABLE             - name of executable to get symbols from\n"
     "  -e EXE_EXTENSION          - extension of the executables to analyze\n"
     "  -c COVERAGEFILE_EXTENSION - extension of the coverage files to analyze\n"
@@ -76,6 +90,12 @@ void usage()
     "  -p PROJECT_NAME           - name of the project\n"
     "  -C ConfigurationFileName  - name of configuration file\n"
     "  -O Output_Directory       - name of output directory (default=."
+    "\n"
+    "  -K CACHE_DIRECTORY        - name of directory caching the tool output\n"
+    "                              of unchanged files between runs\n"
+    "  -M                        - use compact coverage maps\n"
+    "  -j JOBS                   - number of coverage files to read in\n"
+    "                              parallel (default=1)"
     "\n",
     progname,
     progname
@@ -102,6 +122,10 @@ Configuration::Options_t Options[] = {
   { "target",               NULL },
   { "verbose",              NULL },
   { "projectName",          NULL },
+  { "cacheDirectory",       NULL },
+  { "cacheSize",            NULL },
+  { "compactCoverageMaps",  NULL },
+  { "jobs",                 NULL },
   { NULL,                   NULL }
 };
 
@@ -130,6 +154,7 @@ bool isTrue(const char *value)
 void check_configuration(void)
 {
   GET_BOOL( "verbose", Verbose );
+  GET_BOOL( "compactCoverageMaps", CompactCoverageMaps );
 
   GET_STRING( "format",               format );
   GET_STRING( "target",               target );
@@ -140,6 +165,9 @@ void check_configuration(void)
   GET_STRING( "coverageExtension",    coverageFileExtension );
   GET_STRING( "gcnosFile",            gcnosFileName );
   GET_STRING( "projectName",          projectName );
+  GET_STRING( "cacheDirectory",       cacheDirectory );
+  GET_STRING( "cacheSize",            cacheSize );
+  GET_STRING( "jobs",                 jobs );
 
   // Now calculate some values
   if ( coverageFileExtension )
@@ -152,6 +180,120 @@ void check_configuration(void)
     coverageFormat = Coverage::CoverageFormatToEnum( format );
 }
 
+/*
+ *  Report the coverage data of the symbols to analyze to the output
+ *  directory.
+ */
+void GenerateSetReports()
+{
+  std::map<std::string, Coverage::Explanation>::iterator eitr;
+
+  if (Verbose)
+    fprintf(
+      stderr, "Generate Reports (%s)\n", outputDirectory
+    );
+
+  // The explanations found are those used by the reports.
+  for (eitr = AllExplanations->set.begin();
+       eitr != AllExplanations->set.end();
+       eitr++)
+    eitr->second.found = false;
+
+  Coverage::GenerateReports();
+
+  // Write explanations that were not found.
+  if ( explanations ) {
+    std::string notFound;
+
+    notFound = outputDirectory;
+    notFound += "/";
+    notFound += "ExplanationsNotFound.txt";
+
+    if (Verbose)
+      fprintf( stderr, "Writing Not Found Report (%s)\n", notFound.c_str() );
+    AllExplanations->writeNotFound( notFound.c_str() );
+  }
+}
+
+/*
+ *  Read the coverage file of each executable/coverage file pair on up to
+ *  the specified number of threads and merge the coverage maps. The
+ *  coverage maps of each executable are the partial coverage maps of its
+ *  coverage file so the files are read in parallel. The partial maps are
+ *  merged in order into the unified coverage maps once all the files are
+ *  read.
+ */
+void ProcessCoverageFiles(
+  unsigned int threads
+)
+{
+  typedef std::pair<Coverage::ExecutableInfo*, std::string> pair_t;
+
+  std::list<std::string>::iterator               citr;
+  std::list<Coverage::ExecutableInfo*>::iterator eitr;
+  std::vector<pair_t>                            pairs;
+  std::vector<Coverage::CoverageReaderBase*>     readers;
+  std::vector<std::thread>                       workers;
+  std::mutex                                     lock;
+  size_t                                         next = 0;
+  unsigned int                                   t;
+
+  eitr = executablesToAnalyze.begin();
+  for (citr = coverageFileNames.begin();
+       citr != coverageFileNames.end();
+       citr++, eitr++)
+    pairs.push_back( pair_t( *eitr, *citr ) );
+
+  if (threads > pairs.size())
+    threads = pairs.size();
+
+  // Each thread has its own reader.
+  readers.push_back( coverageReader );
+  for (t = 1; t < threads; t++) {
+    readers.push_back( Coverage::CreateCoverageReader( coverageFormat ) );
+    if (!readers.back()) {
+      fprintf( stderr, "ERROR: Unable to create coverage file reader\n" );
+      exit(-1);
+    }
+  }
+
+  for (t = 0; t < threads; t++) {
+    Coverage::CoverageReaderBase* reader = readers[ t ];
+    workers.push_back( std::thread( [&pairs, &lock, &next, reader]() {
+      size_t p;
+
+      while (true) {
+        lock.lock();
+        p = next++;
+        lock.unlock();
+
+        if (p >= pairs.size())
+          break;
+
+        if (Verbose)
+          fprintf(
+            stderr,
+            "Processing coverage file %s for executable %s\n",
+            pairs[ p ].second.c_str(),
+            (pairs[ p ].first->getFileName()).c_str()
+          );
+
+        reader->processFile( pairs[ p ].second.c_str(), pairs[ p ].first );
+      }
+    } ) );
+  }
+
+  for (t = 0; t < threads; t++)
+    workers[ t ].join();
+
+  for (t = 1; t < threads; t++)
+    delete readers[ t ];
+
+  // Merge each symbols coverage map into a unified coverage map.
+  for (next = 0; next < pairs.size(); next++)
+    pairs[ next ].first->mergeCoverage();
+}
+
 int main(
   int    argc,
   char** argv
@@ -164,6 +306,7 @@ int main(
   int                                            i;
   int                                            opt;
   const char*                                    singleExecutable = NULL;
+  unsigned int                                   threads = 1;
 
   CoverageConfiguration = new Configuration::FileReader(Options);
 
@@ -172,7 +315,7 @@ int main(
   //
   progname = argv[0];
 
-  while ((opt = getopt(argc, argv, "C:1:L:e:c:g:E:f:s:S:T:O:p:v")) != -1) {
+  while ((opt = getopt(argc, argv, "C:1:L:e:c:g:E:f:s:S:T:O:K:Mj:p:v")) != -1) {
     switch (opt) {
       case 'C': CoverageConfiguration->processFile( optarg ); break;
       case '1': singleExecutable      = optarg; break;
@@ -183,9 +326,12 @@ int main(
       case 'E': explanations          = optarg; break;
       case 'f': format                = optarg; break;
       case 's': symbolsFile           = optarg; break;
-      case 'S': symbolSetFile		  = optarg; break;
+      case 'S': symbolSetFiles.push_back( optarg ); break;
       case 'T': target                = optarg; break;
       case 'O': outputDirectory       = optarg; break;
+      case 'K': cacheDirectory        = optarg; break;
+      case 'M': CompactCoverageMaps   = true;   break;
+      case 'j': jobs                  = optarg; break;
       case 'v': Verbose               = true;   break;
       case 'p': projectName           = optarg; break;
       default: /* '?' */
@@ -329,6 +475,16 @@ int main(
   // Validate inputs.
   //
 
+  // Validate the number of jobs.
+  if (jobs) {
+    threads = strtoul( jobs, NULL, 0 );
+    if (threads == 0) {
+      fprintf( stderr, "ERROR: invalid number of jobs %s\n", jobs );
+      usage();
+      exit(-1);
+    }
+  }
+
   // Target name must be set.
   if (!target) {
     fprintf( stderr, "ERROR: target not specified\n" );
@@ -344,7 +500,7 @@ int main(
   }
 
   // Validate that we have a symbols of interest file.
-  if (!symbolsFile && !symbolSetFile) {
+  if (!symbolsFile && symbolSetFiles.empty()) {
     fprintf( stderr, "ERROR: neither symbols of interest file nor symbol set file not specified\n" );
     usage();
     exit(-1);
@@ -357,6 +513,16 @@ int main(
   // Create data based on target.
   TargetInfo = Target::TargetFactory( target );
 
+  // Create the cache of the tool output. The size is in megabytes.
+  if (cacheDirectory) {
+    uint64_t size = 512;
+    if (cacheSize)
+      size = strtoull( cacheSize, NULL, 0 );
+    analysisCache = new Coverage::AnalysisCache(
+      cacheDirectory, size * 1024 * 1024
+    );
+  }
+
   // Create the set of desired symbols.
   SymbolsToAnalyze = new Coverage::DesiredSymbols();
 
@@ -365,16 +531,24 @@ int main(
 	  SymbolsToAnalyze->load( symbolsFile );
   }
 
-  //Read symbol configuration file and load needed symbols
-  if(symbolSetFile) {
-	  fprintf(stderr,"Reading symbols sets configuration for symbol set file: %s\n", symbolSetFile);
+  //Read symbol configuration files and load needed symbols. The symbols
+  //of all the sets are analyzed together and each set is reported on its
+  //own so the executables and coverage files are only processed once.
+  for (std::list<const char*>::iterator sitr = symbolSetFiles.begin();
+       sitr != symbolSetFiles.end();
+       sitr++) {
+	  fprintf(stderr,"Reading symbols sets configuration for symbol set file: %s\n", *sitr);
 	  Symbols::SymbolSetReader ssr;
-	  std::vector<Symbols::SymbolSet> symbolSets = ssr.readSetFile(symbolSetFile);
-
-	  Symbols::SymbolSet& set = symbolSets[0];
-	  fprintf(stderr,"Generating symbol file for %s\n", set.getName().c_str());
-	  set.generateSymbolFile(set.getName() + ".syms", target);
-	  SymbolsToAnalyze->load((set.getName() + ".syms").c_str());
+	  std::vector<Symbols::SymbolSet> symbolSets = ssr.readSetFile(*sitr);
+
+	  for (std::vector<Symbols::SymbolSet>::iterator set = symbolSets.begin();
+	       set != symbolSets.end();
+	       set++) {
+		  fprintf(stderr,"Generating symbol file for %s\n", set->getName().c_str());
+		  set->generateSymbolFile(set->getName() + ".syms", target);
+		  SymbolsToAnalyze->load((set->getName() + ".syms").c_str(), false);
+		  symbolSetNames.push_back(set->getName());
+	  }
   }
 
   if (Verbose)
@@ -425,31 +599,38 @@ int main(
   // Analyze the coverage data.
   //
 
-  // Process each executable/coverage file pair.
-  eitr = executablesToAnalyze.begin();
-  for (citr = coverageFileNames.begin();
-       citr != coverageFileNames.end();
-       citr++) {
+  // Process each executable/coverage file pair. The coverage files of
+  // a single executable all add to its coverage maps so they are
+  // processed one at a time.
+  if (!singleExecutable && (threads > 1))
+    ProcessCoverageFiles( threads );
 
-    if (Verbose)
-      fprintf(
-        stderr,
-        "Processing coverage file %s for executable %s\n",
-        (*citr).c_str(),
-        ((*eitr)->getFileName()).c_str()
-      );
+  else {
+    eitr = executablesToAnalyze.begin();
+    for (citr = coverageFileNames.begin();
+         citr != coverageFileNames.end();
+         citr++) {
+
+      if (Verbose)
+        fprintf(
+          stderr,
+          "Processing coverage file %s for executable %s\n",
+          (*citr).c_str(),
+          ((*eitr)->getFileName()).c_str()
+        );
 
-    // Process its coverage file.
-    coverageReader->processFile( (*citr).c_str(), *eitr );
+      // Process its coverage file.
+      coverageReader->processFile( (*citr).c_str(), *eitr );
 
-    // Merge each symbols coverage map into a unified coverage map.
-    (*eitr)->mergeCoverage();
+      // Merge each symbols coverage map into a unified coverage map.
+      (*eitr)->mergeCoverage();
 
-    // DEBUG Print ExecutableInfo content
-    //(*eitr)->dumpExecutableInfo();
+      // DEBUG Print ExecutableInfo content
+      //(*eitr)->dumpExecutableInfo();
 
-    if (!singleExecutable)
-      eitr++;
+      if (!singleExecutable)
+        eitr++;
+    }
   }
 
   // Do necessary preprocessing of uncovered ranges and branches
@@ -508,24 +689,41 @@ int main(
   //
   // Report the coverage data.
   //
-  if (Verbose)
-    fprintf(
-      stderr, "Generate Reports\n"
-    );
-  Coverage::GenerateReports();
+  if (symbolSetNames.size() > 1) {
+    std::list<std::string>::iterator nitr;
+    Coverage::DesiredSymbols*        allSymbols = SymbolsToAnalyze;
+    const char*                      baseDirectory = outputDirectory;
+    int                              sc;
+    std::string                      setDirectory;
+
+#if WIN32
+    sc = _mkdir( baseDirectory );
+#else
+    sc = mkdir( baseDirectory, 0755 );
+#endif
+    if ( (sc == -1) && (errno != EEXIST) ) {
+      fprintf(
+        stderr, "ERROR: Unable to create output directory %s\n", baseDirectory
+      );
+      exit(-1);
+    }
 
-  // Write explanations that were not found.
-  if ( explanations ) {
-    std::string notFound;
+    for (nitr = symbolSetNames.begin(); nitr != symbolSetNames.end(); nitr++) {
+      setDirectory = baseDirectory;
+      setDirectory += "/";
+      setDirectory += *nitr;
+      outputDirectory = setDirectory.c_str();
 
-    notFound = outputDirectory;
-    notFound += "/";
-    notFound += "ExplanationsNotFound.txt";
+      SymbolsToAnalyze = allSymbols->subset( (*nitr + ".syms").c_str() );
+      GenerateSetReports();
+      delete SymbolsToAnalyze;
+    }
 
-    if (Verbose)
-      fprintf( stderr, "Writing Not Found Report (%s)\n", notFound.c_str() );
-    AllExplanations->writeNotFound( notFound.c_str() );
+    SymbolsToAnalyze = allSymbols;
+    outputDirectory = baseDirectory;
   }
+  else
+    GenerateSetReports();
 
   return 0;
 }
@@ -0,0 +1,160 @@
+#
+# RTEMS Tools Project (http://www.rtems.org/)
+# Copyright 2013-2014 Chris Johns (chrisj@rtems.org)
+# All rights reserved.
+#
+# This file is part of the RTEMS Tools package in 'rtems-tools'.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+
+#
+# RTEMS Testing Boards
+#
+# A BSP can declare the boards of a test farm. Tests are run on the free
+# boards in parallel. The boards are listed in the BSP's 'bsp_boards' macro
+# and each board is a macro map. A board's macros override the BSP's macros
+# for the tests run on it, for example the console's 'bsp_tty_dev' or a
+# 'bsp_reset_cmd' run before each test. A board is failed if the reset
+# fails and the test is run on another board. A test that times out or
+# has no console output on a board also fails the board, as a dead tty or
+# a hung target looks like this, but the test's result is reported and it
+# is not run again. A board that fails too many times in a row is not
+# used again. A test that really times out also counts against its board
+# so a run of such tests in a row can retire a good board. The testing
+# stops with an error if all the boards are retired and tests remain.
+#
+
+from __future__ import print_function
+
+import threading
+
+from rtemstoolkit import error
+from rtemstoolkit import execute
+from rtemstoolkit import log
+
+class board(object):
+    '''A board in a test farm.'''
+
+    def __init__(self, name, macros):
+        self.name = name
+        self.macros = macros
+        self.tests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.retired = False
+
+    def __str__(self):
+        s = '%s: tests:%d failures:%d' % (self.name, self.tests, self.failures)
+        if self.retired:
+            s += ' retired'
+        return s
+
+    def apply(self, macros, bsp):
+        '''Set the board's macros in the BSP's map of a test's macros.'''
+        write_map = macros.write_map
+        macros.set_write_map(bsp)
+        try:
+            for key in self.macros:
+                macros[key] = self.macros[key]
+            macros['bsp_board'] = self.name
+        finally:
+            macros.set_write_map(write_map)
+
+    def reset(self, macros):
+        '''Run the board's reset command if it has one. Return None if the
+        board is ready else the reason it is not.'''
+        if not macros.has_key('bsp_reset_cmd'):
+            return None
+        command = macros.expand('%{bsp_reset_cmd}')
+        timeout = float(macros.expand('%{timeout}'))
+        e = execute.capture_execution()
+        ec, proc, output = e.shell(command, timeout = (timeout, lambda: None))
+        if ec != 0:
+            why = 'reset failed: %s: exit-code:%d' % (command, ec)
+            if output:
+                why += ': ' + output.splitlines()[-1]
+            return why
+        return None
+
+class farm(object):
+    '''The boards of a BSP. A free board is acquired to run a test and
+    released with the test's board failure when it finishes.'''
+
+    def __init__(self, macros):
+        self.lock = threading.Lock()
+        self.boards = []
+        self.free = []
+        self.max_failures = int(macros.expand('%{board_failures}'))
+        if macros.has_key('bsp_boards'):
+            for name in macros.expand('%{bsp_boards}').split():
+                if name not in macros.maps():
+                    raise error.general('board map not found: %s' % (name))
+                b = board(name, dict(macros.macros[name]))
+                self.boards += [b]
+                self.free += [b]
+
+    def __len__(self):
+        return len(self.boards)
+
+    def available(self):
+        '''The number of boards that can run tests.'''
+        self.lock.acquire()
+        try:
+            return len([b for b in self.boards if not b.retired])
+        finally:
+            self.lock.release()
+
+    def acquire(self):
+        self.lock.acquire()
+        try:
+            if len(self.free) == 0:
+                return None
+            b = self.free.pop(0)
+            b.tests += 1
+            return b
+        finally:
+            self.lock.release()
+
+    def release(self, b, failure = None):
+        self.lock.acquire()
+        try:
+            if failure is None:
+                b.consecutive_failures = 0
+            else:
+                b.failures += 1
+                b.consecutive_failures += 1
+                log.warning('board %s: %s' % (b.name, failure))
+                if b.consecutive_failures >= self.max_failures:
+                    b.retired = True
+                    log.warning('board %s: retired after %d failures' % \
+                                (b.name, b.consecutive_failures))
+            if not b.retired:
+                self.free += [b]
+        finally:
+            self.lock.release()
+
+    def summary(self):
+        log.notice('Boards:')
+        for b in self.boards:
+            log.notice(' %s' % (b))
@@ -120,9 +120,15 @@ class file(config.file):
             if self.console:
                 self.console.open()
             self.capture_console('run: %s' % (' '.join(data)))
+            #
+            # The test's timeout limits the test's run time. Output does not
+            # extend it.
+            #
+            timeout = float(self.expand('%{timeout}'))
             ec, proc = self.process.open(data,
-                                         timeout = (int(self.expand('%{timeout}')),
-                                                    self._timeout))
+                                         timeout = (timeout,
+                                                    self._timeout,
+                                                    timeout))
             self._lock()
             if not self.kill_good and ec > 0:
                 self._error('execute failed: %s: exit-code:%d' % (' '.join(data), ec))
@@ -135,22 +141,32 @@ class file(config.file):
     def _dir_gdb(self, data, total, index, exe, bsp_arch, bsp):
         if len(data) < 3 or len(data) > 4:
             raise error.general('invalid %gdb arguments')
-        self.process = gdb.gdb(bsp_arch, bsp,
-                               trace = self.debug_trace('gdb'),
-                               mi_trace = self.debug_trace('gdb-mi'))
-        script = self.expand('%%{%s}' % data[2])
-        if script:
-            script = [l.strip() for l in script.splitlines()]
-        if not self.in_error:
-            if self.console:
-                self.console.open()
-            self.process.open(data[0], data[1],
-                              script = script,
-                              output = self.capture,
-                              gdb_console = self.capture_console,
-                              timeout = int(self.expand('%{timeout}')))
-            if self.console:
-                self.console.close()
+        reuse = self.expand('%{gdb_reuse}') == '1'
+        if reuse:
+            self.process = gdb.sessions.get().session(data[0], bsp_arch, bsp,
+                                                      trace = self.debug_trace('gdb'),
+                                                      mi_trace = self.debug_trace('gdb-mi'))
+        else:
+            self.process = gdb.gdb(bsp_arch, bsp,
+                                   trace = self.debug_trace('gdb'),
+                                   mi_trace = self.debug_trace('gdb-mi'))
+        try:
+            script = self.expand('%%{%s}' % data[2])
+            if script:
+                script = [l.strip() for l in script.splitlines()]
+            if not self.in_error:
+                if self.console:
+                    self.console.open()
+                self.process.open(data[0], data[1],
+                                  script = script,
+                                  output = self.capture,
+                                  gdb_console = self.capture_console,
+                                  timeout = float(self.expand('%{timeout}')))
+                if self.console:
+                    self.console.close()
+        finally:
+            if reuse:
+                gdb.sessions.get().put(self.process)
 
     def _directive_filter(self, results, directive, info, data):
         if results[0] == 'directive':
@@ -34,8 +34,11 @@
 
 from __future__ import print_function
 
+import codecs
 import errno
 import os
+import select
+import sys
 import threading
 import time
 
@@ -43,10 +46,8 @@ import time
 # Not available on Windows. Not sure what this means.
 #
 if os.name != 'nt':
-    import fcntl
     from . import stty
 else:
-    fcntl = None
     stty = None
 
 def save():
@@ -88,13 +89,21 @@ class tty(console):
 
     raw = 'B115200,~BRKINT,IGNBRK,IGNCR,~ICANON,~ISIG,~IEXTEN,~ECHO,CLOCAL,~CRTSCTS'
 
+    # The longest time in seconds close waits for data still arriving.
+    drain_period = 1.0
+
     def __init__(self, dev, output, setup = None, trace = False):
         self.tty = None
         self.read_thread = None
+        self.wake_read = None
+        self.wake_write = None
+        self.wake_lock = threading.Lock()
+        self.reading = False
+        self.reader_closes = False
         self.dev = dev
         self.output = output
         if setup is None:
-            self.setup = raw
+            self.setup = tty.raw
         else:
             self.setup = setup
         super(tty, self).__init__(dev, trace)
@@ -103,37 +112,79 @@ class tty(console):
         super(tty, self).__del__()
         if self._tracing():
             print(':: tty close', self.dev)
-        if fcntl is not None:
-            fcntl.fcntl(me.tty.fd, fcntl.F_SETFL,
-                        fcntl.fcntl(me.tty.fd, fcntl.F_GETFL) & ~os.O_NONBLOCK)
         self.close()
 
+    def _close_wake(self, wake_read, wake_write):
+        os.close(wake_read)
+        os.close(wake_write)
+
     def open(self):
-        def _readthread(me, x):
+        def _readthread(me, port, wake_read, wake_write):
+            #
+            # The thread holds the port so it stays open while the thread
+            # runs.
+            #
+            try:
+                _reader(me, port, wake_read)
+            finally:
+                #
+                # If close has given up waiting for the thread the pipe is
+                # closed here.
+                #
+                me.wake_lock.acquire()
+                try:
+                    me.reading = False
+                    if me.reader_closes:
+                        me._close_wake(wake_read, wake_write)
+                finally:
+                    me.wake_lock.release()
+        def _reader(me, port, wake_read):
+            #
+            # Wait for data or the wake pipe. The wake pipe is written by
+            # close and the data waiting is read for up to the drain period
+            # before the thread exits.
+            #
             if self._tracing():
                 print(':: tty runner started', self.dev)
-            if fcntl is not None:
-                fcntl.fcntl(me.tty.fd, fcntl.F_SETFL,
-                            fcntl.fcntl(me.tty.fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+            fd = port.fd.fileno()
+            # str and bytes are the same type in Python2
+            if bytes is not str:
+                decoder = codecs.getincrementaldecoder(sys.stdout.encoding)('replace')
+            else:
+                decoder = None
             line = ''
-            while me.running:
-                time.sleep(0.05)
+            drain = None
+            while True:
+                if drain is None:
+                    timeout = None
+                else:
+                    timeout = 0
                 try:
-                    data = me.tty.fd.read()
-                except IOError as ioe:
-                    if ioe.errno == errno.EAGAIN:
+                    ready, _w, _x = select.select([fd, wake_read], [], [],
+                                                  timeout)
+                except (select.error, OSError, IOError) as err:
+                    if err.args[0] == errno.EINTR:
                         continue
                     raise
-                except:
-                    raise
-                for c in data:
-                    if len(c) == 0:
-                        continue
-                    if c != chr(0):
-                        line += c
-                    if c == '\n':
-                        me.output(line)
-                        line = ''
+                if drain is None and wake_read in ready:
+                    drain = time.time() + tty.drain_period
+                if fd not in ready:
+                    if drain is not None:
+                        break
+                    continue
+                data = os.read(fd, 4096)
+                if len(data) == 0:
+                    break
+                if decoder is not None:
+                    data = decoder.decode(data)
+                lines = (line + data.replace(chr(0), '')).split('\n')
+                line = lines.pop()
+                for l in lines:
+                    me.output(l + '\n')
+                if drain is not None and time.time() >= drain:
+                    break
+            if len(line):
+                me.output(line)
             if self._tracing():
                 print(':: tty runner finished', self.dev)
         if self._tracing():
@@ -141,17 +192,36 @@ class tty(console):
         self.tty = stty.tty(self.dev)
         self.tty.set(self.setup)
         self.tty.on()
+        self.wake_read, self.wake_write = os.pipe()
+        self.reading = True
+        self.reader_closes = False
         self.read_thread = threading.Thread(target = _readthread,
                                             name = 'tty[%s]' % (self.dev),
-                                            args = (self, 0))
+                                            args = (self,
+                                                    self.tty,
+                                                    self.wake_read,
+                                                    self.wake_write))
         self.read_thread.daemon = True
-        self.running = True
         self.read_thread.start()
 
     def close(self):
         if self.tty:
-            time.sleep(1)
             if self.read_thread:
-                self.running = False
-                self.read_thread.join(1)
+                os.write(self.wake_write, b'.')
+                self.read_thread.join(tty.drain_period + 1)
+                self.read_thread = None
+            #
+            # A reader thread still running may be in select on the port and
+            # pipe so the pipe is left to the thread to close.
+            #
+            self.wake_lock.acquire()
+            try:
+                if self.reading:
+                    self.reader_closes = True
+                else:
+                    self._close_wake(self.wake_read, self.wake_write)
+            finally:
+                self.wake_lock.release()
+            self.wake_read = None
+            self.wake_write = None
             self.tty = None
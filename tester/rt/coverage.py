@@ -7,8 +7,17 @@ from rtemstoolkit import path
 from rtemstoolkit import log
 from rtemstoolkit import execute
 from rtemstoolkit import macros
+import array
 import shutil
 import os
+import struct
+import sys
+import threading
+try:
+    import Queue
+    queue = Queue
+except ImportError:
+    import queue
 from datetime import datetime
 import options
 
@@ -27,6 +36,7 @@ class summary:
         self.branches_neverTaken = 0
         self.percentage_branchesCovered = 0.0
         self.isFailure = False
+        self.status = None
 
     def parse(self):
         if(not path.exists(self.summaryFilePath)):
@@ -63,9 +73,12 @@ class summary:
         return line.strip().split(' ')[0]
 
 class reportGen:
-    def __init__(self, p_symbolSetsList, p_targetDir):
+    def __init__(self, p_symbolSetsList, p_targetDir, p_statuses = None):
         self.symbolSetsList = p_symbolSetsList
         self.targetDir = p_targetDir
+        if p_statuses is None:
+            p_statuses = {}
+        self.statuses = p_statuses
         self.partialReportsFiles = list(["index.html", "summary.txt"])
         self.numberOfColumns = 1
 
@@ -74,6 +87,10 @@ class reportGen:
         for symbolSet in self.symbolSetsList:
             setSummary = summary(path.join(self.targetDir, "test", symbolSet))
             setSummary.parse()
+            status = self.statuses.get(symbolSet, "success")
+            if status != "success":
+                setSummary.isFailure = True
+                setSummary.status = status
             partialReports[symbolSet] = setSummary
         return partialReports
 
@@ -108,7 +125,10 @@ class reportGen:
         row = "<tr>"
         row += "<td>" + symbolSet + "</td>"
         if summary.isFailure:
-            row += ' <td colspan="' + str(self.numberOfColumns-1) + '" style="background-color:red">FAILURE</td>'
+            failure = "FAILURE"
+            if summary.status is not None:
+                failure += ": " + summary.status
+            row += ' <td colspan="' + str(self.numberOfColumns-1) + '" style="background-color:red">' + failure + '</td>'
         else:
             row += " <td>" + self._link(summary.indexFilePath,"Index") + "</td>"
             row += " <td>" + self._link(summary.summaryFilePath,"Summary") + "</td>"
@@ -194,7 +214,7 @@ class symbolsConfiguration(object):
                         if key == 'name':
                             self.symbolSets[-1].name = value
                         elif key == 'lib':
-                            lib = os.path.join(path_to_builddir, value)
+                            lib = path.abspath(os.path.join(path_to_builddir, value))
                             log.stderr(lib + "\n")
                             self.symbolSets[-1].libs.append(lib)
                         else:
@@ -243,45 +263,129 @@ class gcnos(object):
             with open(gcnos_config_file_path, 'r') as config_file:
                 for line in config_file:
                     if line.strip():
-                        gcnos_file.write(path.join(path_to_builddir, line))
+                        gcnos_file.write(path.abspath(path.join(path_to_builddir, line.strip())) + '\n')
 
 class covoar(object):
     '''
     Covoar runner
     '''
 
-    def __init__(self, baseResultDir, configDir, tracesDir, covoarSrcDir):
+    def __init__(self, baseResultDir, configDir, tracesDir, covoarSrcDir, jobs = 1):
         self.baseResultDir = baseResultDir
         self.configDir = configDir
         self.tracesDir = tracesDir
         self.covoarSrcDir = covoarSrcDir
+        self.jobs = jobs
 
     def run(self, setName, covoarConfigFile, symbolFile, gcnos_file):
+        '''
+        Run covoar for a symbol set and return the status. Covoar writes
+        temporary files to its working directory so each symbol set has its
+        own working directory. The output is logged when covoar finishes so
+        the output of symbol sets run in parallel is not mixed.
+        '''
         covoarResultDir = path.join(self.baseResultDir, setName)
+        covoarWorkDir = path.join(self.tracesDir, "work", setName)
 
         if (not path.exists(covoarResultDir)):
             path.mkdir(covoarResultDir)
+        if (not path.exists(covoarWorkDir)):
+            path.mkdir(covoarWorkDir)
 
         if (not path.exists(symbolFile)):
             log.stderr("Symbol set file: " + symbolFile + " doesn't exists! Covoar can not be run!")
             log.stderr("Skipping " + setName)
-            return
+            return "failure. Symbol set file not found"
 
-        command = "covoar -C" + covoarConfigFile + " -S " + symbolFile + " -O " + covoarResultDir + " " + path.join(self.tracesDir, "*.exe")
+        command = "covoar -C" + covoarConfigFile + " -S " + symbolFile
+        if self.jobs > 1:
+            command = command + " -j " + str(self.jobs)
+        command = command + " -O " + covoarResultDir + " " + path.join(self.tracesDir, "*.exe")
         if (path.exists(gcnos_file)):
             command = command + " -g " + gcnos_file
         log.notice("Running covoar for " + setName, stdout_only=True)
         log.notice(command, stdout_only=True)
-        executor = execute.execute(verbose=True, output=output_handler)
-        exit_code = executor.shell(command, cwd=os.getcwd())
+        output = []
+        executor = execute.execute(output=output.append)
+        exit_code = executor.shell(command, cwd=covoarWorkDir)
+        if len(output):
+            output_handler(''.join(output))
         shutil.copy2(path.join(self.covoarSrcDir, 'table.js'), path.join(covoarResultDir, 'table.js'))
         shutil.copy2(path.join(self.covoarSrcDir, 'covoar.css'), path.join(covoarResultDir, 'covoar.css'))
-        log.notice("Coverage run for " + setName + " finished ")
         status = "success"
         if (exit_code[0] != 0):
             status = "failure. Error code: " + str(exit_code[0])
         log.notice("Coverage run for " + setName + " finished " + status)
         log.notice("-----------------------------------------------")
+        return status
+
+    def multiSet(self):
+        '''
+        Return True if covoar can report more than one symbol set in a run.
+        Older versions of covoar only report the first symbol set.
+        '''
+        e = execute.capture_execution()
+        try:
+            exit_code, proc, output = e.shell("covoar -h")
+        except Exception:
+            return False
+        return "repeat for more symbol sets" in output
+
+    def multiJob(self):
+        '''
+        Return True if covoar can read the coverage files on more than one
+        thread.
+        '''
+        e = execute.capture_execution()
+        try:
+            exit_code, proc, output = e.shell("covoar -h")
+        except Exception:
+            return False
+        return "-j JOBS" in output
+
+    def runSets(self, symbolSets, covoarConfigFile, gcnos_file):
+        '''
+        Run covoar once for all the symbol sets and return the status of each
+        set. The executables and traces are processed once and covoar reports
+        each set in its own directory.
+        '''
+        covoarWorkDir = path.join(self.tracesDir, "work", "all")
+
+        if (not path.exists(self.baseResultDir)):
+            path.mkdir(self.baseResultDir)
+        if (not path.exists(covoarWorkDir)):
+            path.mkdir(covoarWorkDir)
+
+        command = "covoar -C" + covoarConfigFile
+        for setName, symbolFile in symbolSets:
+            command = command + " -S " + symbolFile
+        if self.jobs > 1:
+            command = command + " -j " + str(self.jobs)
+        command = command + " -O " + self.baseResultDir + " " + path.join(self.tracesDir, "*.exe")
+        if (path.exists(gcnos_file)):
+            command = command + " -g " + gcnos_file
+        log.notice("Running covoar for " + ", ".join([s[0] for s in symbolSets]), stdout_only=True)
+        log.notice(command, stdout_only=True)
+        output = []
+        executor = execute.execute(output=output.append)
+        exit_code = executor.shell(command, cwd=covoarWorkDir)
+        if len(output):
+            output_handler(''.join(output))
+        statuses = {}
+        for setName, symbolFile in symbolSets:
+            covoarResultDir = path.join(self.baseResultDir, setName)
+            if (exit_code[0] != 0):
+                status = "failure. Error code: " + str(exit_code[0])
+            elif (not path.exists(path.join(covoarResultDir, "summary.txt"))):
+                status = "failure. No report"
+            else:
+                shutil.copy2(path.join(self.covoarSrcDir, 'table.js'), path.join(covoarResultDir, 'table.js'))
+                shutil.copy2(path.join(self.covoarSrcDir, 'covoar.css'), path.join(covoarResultDir, 'covoar.css'))
+                status = "success"
+            log.notice("Coverage run for " + setName + " finished " + status)
+            statuses[setName] = status
+        log.notice("-----------------------------------------------")
+        return statuses
 
 class coverage_run(object):
     '''
@@ -302,9 +406,13 @@ class coverage_run(object):
         self.tracesDir = path.join(self.targetDir, 'coverage')
         self.config_map = self.macros.macros['coverage']
         self.executables = None
+        self.jobs = 1
         self.symbolSets = []
-        self.path_to_builddir = path_to_builddir
+        self.statuses = {}
+        self.path_to_builddir = path.abspath(path_to_builddir)
         self.gcnos_file_path = path.join(self.coverageConfigPath, "rtems.gcnos")
+        self.accumulated = queue.Queue()
+        self.accumulator = None
 
     def prepareEnvironment(self):
         if(path.exists(self.tracesDir)):
@@ -321,9 +429,80 @@ class coverage_run(object):
 #        ccf.write("gcnosFile = " + self.macros.expand(self.config_map['gcnosfile'][2]) + '\n')
         ccf.write("executableExtension = " + self.config_map['executableextension'][2] + '\n')
         ccf.write("projectName = " + self.config_map['projectname'][2] + '\n')
+        if 'cachedirectory' in self.config_map:
+            ccf.write("cacheDirectory = " + self.macros.expand(self.config_map['cachedirectory'][2]) + '\n')
+        if 'cachesize' in self.config_map:
+            ccf.write("cacheSize = " + self.config_map['cachesize'][2] + '\n')
         ccf.close()
 
+    def startAccumulator(self):
+        '''
+        Start the background accumulator. The accumulator prepares each
+        finished test's executable and trace for covoar while the other
+        tests run.
+        '''
+        if self.accumulator is None:
+            self.accumulator = threading.Thread(target = self._accumulator,
+                                                name = 'coverage-accumulator')
+            self.accumulator.daemon = True
+            self.accumulator.start()
+
+    def accumulate(self, executable):
+        '''
+        Hand a finished test's executable to the accumulator.
+        '''
+        if self.accumulator is not None:
+            self.accumulated.put(executable)
+
+    def stopAccumulator(self):
+        '''
+        Wait for the accumulator to prepare all the executables it has been
+        handed.
+        '''
+        if self.accumulator is not None:
+            self.accumulated.put(None)
+            while self.accumulator.is_alive():
+                self.accumulator.join(1)
+            self.accumulator = None
+
+    def _accumulator(self):
+        while True:
+            executable = self.accumulated.get()
+            if executable is None:
+                break
+            try:
+                self._accumulate(executable)
+            except Exception as e:
+                log.warning("coverage accumulator: " + executable + ": " + str(e))
+
+    def _accumulate(self, executable):
+        '''
+        Link the executable to the traces directory, consolidate its trace
+        and disassemble it. Covoar uses the disassembly if it is newer than
+        the executable so the final covoar run does not disassemble the
+        executables.
+        '''
+        name = path.basename(executable)
+        exe = path.join(self.tracesDir, name)
+        trace = exe[:len(exe) - len(self.config_map['executableextension'][2])] + \
+                self.config_map['coverageextension'][2]
+        if not path.exists(exe):
+            os.link(executable, exe)
+        if not path.exists(trace):
+            return
+        consolidateTrace(trace)
+        dump = exe + ".dmp"
+        command = self.config_map['target'][2] + "-objdump -Cda --section=.text --source " + \
+                  exe + " | sed -e 's/ *$//' >" + dump
+        e = execute.capture_execution()
+        exit_code, proc, output = e.shell(command)
+        if exit_code != 0:
+            if path.exists(dump):
+                os.remove(dump)
+            log.warning("coverage accumulator: disassembly failed: " + command)
+
     def run(self):
+        self.stopAccumulator()
         if self.executables == None:
             log.stderr("ERROR: Executables for coverage analysis unspecified!")
             raise Exception('Executable for coverage analysis unspecified')
@@ -344,26 +523,82 @@ class coverage_run(object):
         gcnos_file = path.join(self.tracesDir, "rtems.gcnos")
         gcnos().create_gcnos_file(self.gcnos_file_path, gcnos_file, self.path_to_builddir)
 
+        validSets = []
         for sset in symbolConfig.symbolSets:
             if sset.isValid():
                 symbolSetFile = path.join(self.tracesDir, sset.name + ".symcfg")
                 sset.writeSetFile(symbolSetFile)
                 self.symbolSets.append(sset.name)
-
-                covoar_run = covoar(self.testDir, self.symbolConfigPath, self.tracesDir, path.join(self.rtdir, 'covoar'))
-                covoar_run.run(sset.name, covoarConfigFile, symbolSetFile, gcnos_file)
+                validSets.append((sset.name, symbolSetFile))
             else:
                 log.stderr("Invalid symbol set " + sset.name + ". Skipping covoar run.")
+        self._runCovoar(validSets, covoarConfigFile, gcnos_file)
 
         self._generateReports();
         self._cleanup();
         self._summarize();
 
+    def _runCovoar(self, symbolSets, covoarConfigFile, gcnos_file):
+        '''
+        Run covoar once for all the symbol sets if it supports it else run
+        covoar for the symbol sets on up to the number of jobs worker
+        threads. Each worker takes the next symbol set until there are none
+        left. The jobs not used by the workers are shared between the covoar
+        runs to read the coverage files in parallel. Covoar is checked once
+        for the features used.
+        '''
+        covoar_run = covoar(self.testDir, self.symbolConfigPath, self.tracesDir, path.join(self.rtdir, 'covoar'))
+        if int(self.jobs) > 1 and covoar_run.multiJob():
+            covoar_run.jobs = int(self.jobs)
+        if len(symbolSets) > 1:
+            if covoar_run.multiSet():
+                try:
+                    self.statuses.update(covoar_run.runSets(symbolSets, covoarConfigFile, gcnos_file))
+                except Exception as e:
+                    for setName, symbolSetFile in symbolSets:
+                        self.statuses[setName] = "failure. " + str(e)
+                return
+        pending = list(symbolSets)
+        lock = threading.Lock()
+        def _worker():
+            while True:
+                lock.acquire()
+                try:
+                    if len(pending) == 0:
+                        return
+                    setName, symbolSetFile = pending.pop(0)
+                finally:
+                    lock.release()
+                covoar_run = covoar(self.testDir, self.symbolConfigPath, self.tracesDir, path.join(self.rtdir, 'covoar'), covoar_jobs)
+                try:
+                    status = covoar_run.run(setName, covoarConfigFile, symbolSetFile, gcnos_file)
+                except Exception as e:
+                    status = "failure. " + str(e)
+                lock.acquire()
+                try:
+                    self.statuses[setName] = status
+                finally:
+                    lock.release()
+        jobs = max(1, min(int(self.jobs), len(symbolSets)))
+        covoar_jobs = max(1, covoar_run.jobs // jobs)
+        log.notice("Running covoar for " + str(len(symbolSets)) + " symbol sets with " + str(jobs) + " jobs")
+        workers = []
+        for w in range(0, jobs):
+            worker = threading.Thread(target = _worker, name = 'covoar[%d]' % (w))
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+        for worker in workers:
+            while worker.is_alive():
+                worker.join(1)
+
     def _linkExecutables(self):
         log.notice("Linking executables to " + self.tracesDir)
 
         for exe in self.executables:
             dst = path.join(self.tracesDir, path.basename(exe))
+            if path.exists(dst):
+                continue
             try:
                 os.link(exe, dst)
             except OSError, e:
@@ -373,7 +608,7 @@ class coverage_run(object):
 
     def _generateReports(self):
         log.notice("Generating reports")
-        report = reportGen(self.symbolSets, self.targetDir)
+        report = reportGen(self.symbolSets, self.targetDir, self.statuses)
         report.generate()
 
     def _cleanup(self):
@@ -381,7 +616,91 @@ class coverage_run(object):
         path.removeall(self.tracesDir)
 
     def _summarize(self):
+        failures = [s for s in self.symbolSets if self.statuses.get(s) != "success"]
+        if len(failures):
+            log.notice("Coverage analysis failed for symbol sets: " + ", ".join(failures))
         log.notice("Coverage analysis finished. You can find results in " + self.targetDir)
 
 def output_handler(text):
     log.notice(text, stdout_only = False)
+
+#
+# QEMU trace file layout, see covoar/qemu-traces.h. The header is followed by
+# the trace entries. An entry with a 32bit pc is the pc, a 16bit size and an
+# 8bit op padded to 8 bytes in the host's byte order.
+#
+QEMU_TRACE_MAGIC = '#QEMU-Traces'
+QEMU_TRACE_HEADER_SIZE = 20
+QEMU_TRACE_KIND_RAW = 0
+QEMU_TRACE_KIND_CONSOLIDATED = 248
+
+def consolidateTrace(tracePath, chunkSize = 8 * 1024 * 1024):
+    '''
+    Rewrite a raw QEMU trace as a consolidated trace. A raw trace has an
+    entry each time a block is executed. The consolidated trace has an entry
+    for each block with the ops of the block's entries OR-ed together. The
+    coverage of the trace does not change, the execution counts do. Return
+    the number of entries read and written or None if the trace is not a raw
+    trace with a 32bit pc.
+    '''
+    traceFile = open(tracePath, 'rb')
+    try:
+        header = traceFile.read(QEMU_TRACE_HEADER_SIZE)
+        if len(header) != QEMU_TRACE_HEADER_SIZE or \
+           header[0:12] != QEMU_TRACE_MAGIC or \
+           ord(header[13]) != QEMU_TRACE_KIND_RAW or \
+           ord(header[14]) != 4:
+            return None
+        if ord(header[15]) != 0:
+            entryFormat = '>IHBx'
+        else:
+            entryFormat = '<IHBx'
+        #
+        # Collect the unique entries as 64bit values if the host has them,
+        # it is much faster than a tuple of two 32bit values for each entry.
+        # Only the unique entries are unpacked.
+        #
+        entryTypecode = None
+        for typecode in ['L', 'Q']:
+            try:
+                if array.array(typecode).itemsize == 8:
+                    entryTypecode = typecode
+                    break
+            except ValueError:
+                pass
+        entries = 0
+        uniqueEntries = set()
+        while True:
+            data = traceFile.read(chunkSize)
+            if len(data) < 8:
+                break
+            data = data[:len(data) & ~7]
+            entries += len(data) / 8
+            if entryTypecode is not None:
+                words = array.array(entryTypecode)
+                words.fromstring(data)
+                uniqueEntries.update(words)
+            else:
+                words = array.array('I')
+                words.fromstring(data)
+                uniqueEntries.update(zip(words[0::2], words[1::2]))
+    finally:
+        traceFile.close()
+    blocks = {}
+    for entry in uniqueEntries:
+        if entryTypecode is not None:
+            entry = array.array(entryTypecode, [entry])
+        else:
+            entry = array.array('I', entry)
+        pc, size, op = struct.unpack(entryFormat, entry.tostring())
+        blocks[(pc, size)] = blocks.get((pc, size), 0) | op
+    consolidatedPath = tracePath + '.consolidated'
+    consolidatedFile = open(consolidatedPath, 'wb')
+    try:
+        consolidatedFile.write(header[0:13] + chr(QEMU_TRACE_KIND_CONSOLIDATED) + header[14:])
+        consolidatedFile.write(''.join([struct.pack(entryFormat, pc, size, blocks[(pc, size)])
+                                        for pc, size in sorted(blocks)]))
+    finally:
+        consolidatedFile.close()
+    os.rename(consolidatedPath, tracePath)
+    return entries, len(blocks)
@@ -42,6 +42,7 @@ except ImportError:
     import queue
 import sys
 import threading
+import time
 
 from rtemstoolkit import error
 from rtemstoolkit import execute
@@ -59,15 +60,11 @@ except (ValueError, SystemError):
     import console
     import pygdb
 
-#
-# The MI parser needs a global lock. It has global objects.
-#
-mi_lock = threading.Lock()
-
 class gdb(object):
     '''RTEMS Testing GDB base.'''
 
-    def __init__(self, bsp_arch, bsp, trace = False, mi_trace = False):
+    def __init__(self, bsp_arch, bsp, trace = False, mi_trace = False,
+                 reuse = False):
         self.trace = trace
         self.mi_trace = mi_trace
         self.lock_trace = False
@@ -85,8 +82,15 @@ class gdb(object):
         self.running = False
         self.breakpoints = {}
         self.output = None
-        self.output_buffer = ''
+        self.output_buffer = []
         self.lc = 0
+        self.reuse = reuse
+        self.reusable = reuse
+        self.session = None
+        self.session_error = None
+        self.test_done = threading.Event()
+        self.started = None
+        self.startup = 0.0
 
     def _lock(self, msg):
         if self.lock_trace:
@@ -98,12 +102,6 @@ class gdb(object):
             print('|] UNLOCK:%s [|' % (msg))
         self.lock.release()
 
-    def _mi_lock(self):
-        mi_lock.acquire()
-
-    def _mi_unlock(self):
-        mi_lock.release()
-
     def _put(self, text):
         if self.trace:
             print(')))', text)
@@ -130,6 +128,12 @@ class gdb(object):
             print('<<<', line)
         try:
             self.lc += 1
+            if self.started is not None and line.startswith('(gdb)'):
+                self.startup = time.time() - self.started
+                self.started = None
+            if self.reuse and self.script is None:
+                # A reused session between tests.
+                return
             if line.startswith('(gdb)'):
                 if self.trace:
                     print('^^^ (gdb)')
@@ -190,6 +194,7 @@ class gdb(object):
                 self._put('bt')
             self._put('quit')
             self._put('None')
+            self.reusable = False
             if self.script:
                 self.script_line = len(self.script)
         finally:
@@ -198,6 +203,10 @@ class gdb(object):
     def open(self, command, executable,
              output, gdb_console, script = None, tty = None,
              timeout = 300):
+        if self.reuse:
+            self._open_session(command, executable, output, gdb_console,
+                               script, tty, timeout)
+            return
         self._lock('_open')
         try:
             cmds = execute.arg_list(command) + ['-i=mi',
@@ -218,7 +227,9 @@ class gdb(object):
             self._unlock('_open')
         try:
             self.gdb_console('gdb: %s' % (' '.join(cmds)))
-            ec, proc = self.process.open(cmds, timeout = (timeout, self._timeout))
+            ec, proc = self.process.open(cmds, timeout = (timeout,
+                                                          self._timeout,
+                                                          timeout))
             if self.trace:
                 print('gdb done', ec)
             if ec > 0:
@@ -231,6 +242,109 @@ class gdb(object):
         finally:
             self._unlock('_open')
 
+    def _session(self, exe, cmds, timeout):
+        ec = 0
+        try:
+            ec, proc = exe.open(cmds, timeout = (timeout,
+                                                 self._timeout,
+                                                 timeout))
+            if self.trace:
+                print('gdb session done', ec)
+        finally:
+            self._lock('_session')
+            try:
+                if ec > 0:
+                    self.session_error = \
+                        'gdb exec: %s: %s' % (cmds[0], os.strerror(ec))
+                self.process = None
+                self.reusable = False
+                self.test_done.set()
+            finally:
+                self._unlock('_session')
+
+    def _open_session(self, command, executable,
+                      output, gdb_console, script, tty, timeout):
+        #
+        # The session's gdb is started without an executable and each test
+        # loads its executable. A session left at the prompt by the previous
+        # test is started on the new script. The process timeout limits the
+        # test's run time and it is restarted for each test.
+        #
+        cmds = None
+        self._lock('_open')
+        try:
+            if executable:
+                executable = executable.replace('\\', '\\\\')
+                executable = executable.replace('"', '\\"')
+                self.script = ['-file-exec-and-symbols "%s"' % (executable)]
+            else:
+                self.script = []
+            if script:
+                self.script += script
+            self.script_line = 0
+            self.output = output
+            self.gdb_console = gdb_console
+            self.running = False
+            self.breakpoints = {}
+            self.output_buffer = []
+            self.test_done.clear()
+            if self.process is None:
+                cmds = execute.arg_list(command) + ['-i=mi',
+                                                    '--nx',
+                                                    '--quiet']
+                if tty:
+                    cmds += ['--tty=%s' % tty]
+                self.process = execute.execute(output = self._reader,
+                                               input = self._writer,
+                                               cleanup = self._cleanup)
+                self.session = threading.Thread(target = self._session,
+                                                name = '_gdb[%s]' % (cmds[0]),
+                                                args = (self.process,
+                                                        cmds,
+                                                        timeout))
+                self.session.daemon = True
+                self.session_error = None
+                self.reusable = True
+                self.started = time.time()
+            else:
+                self.process.restart_timeout(timeout, timeout)
+                self.gdb_expect()
+                self._input_commands()
+        finally:
+            self._unlock('_open')
+        if cmds is not None:
+            self.gdb_console('gdb: %s' % (' '.join(cmds)))
+            self.session.start()
+        else:
+            self.gdb_console('gdb: reusing session')
+        self.test_done.wait()
+        if self.session_error is not None:
+            raise error.general(self.session_error)
+
+    def _test_end(self):
+        self.script = None
+        self.output = None
+        self.gdb_console = None
+        self.test_done.set()
+
+    def alive(self):
+        '''A session that can run another test.'''
+        self._lock('_alive')
+        try:
+            return self.reusable and self.process is not None
+        finally:
+            self._unlock('_alive')
+
+    def close(self):
+        '''Close a session. Closing gdb's input ends gdb.'''
+        self._lock('_close')
+        try:
+            if self.process is not None:
+                self.reusable = False
+                self.input.put(None)
+        finally:
+            self._unlock('_close')
+
     def kill(self):
         self._lock('_open')
         try:
@@ -245,7 +359,10 @@ class gdb(object):
             print('}}} gdb-expect')
         if self.process and not self.running and self.script is not None:
             if self.script_line == len(self.script):
-                self._put(None)
+                if self.reuse:
+                    self._test_end()
+                else:
+                    self._put(None)
             else:
                 if self.script_line == 0:
                     self._put('-gdb-set confirm no')
@@ -256,15 +373,38 @@ class gdb(object):
         else:
             self._put(line)
 
+    def _gdb_stream(self, type, value):
+        if type == 'console' or type == 'log':
+            for line in value.splitlines():
+                self.gdb_console(line)
+        elif type == 'target':
+            #
+            # The output buffer is a list of the pieces of a partial line.
+            #
+            last_lf = value.rfind('\n')
+            if last_lf < 0:
+                self.output_buffer.append(value)
+            else:
+                self.output_buffer.append(value[:last_lf])
+                text = ''.join(self.output_buffer)
+                self.output_buffer = [value[last_lf + 1:]]
+                if self.trace:
+                    print('/// console output')
+                for line in text.splitlines():
+                    self.output(line)
+
     def gdb_parse(self, lines):
         try:
-            self._mi_lock()
-            try:
-                if self.mi_trace:
-                    print('mi-data:', lines)
-                rec = pygdb.mi_parser.process(lines)
-            finally:
-                self._mi_unlock()
+            if self.mi_trace:
+                print('mi-data:', lines)
+            if lines[:1] in ['@', '~', '&']:
+                stream = pygdb.mi_parser.stream(lines)
+                if stream is not None:
+                    if self.mi_trace:
+                        print('mi-stream:', stream)
+                    self._gdb_stream(stream[0], stream[1])
+                    return
+            rec = pygdb.mi_parser.process(lines)
             if self.mi_trace:
                 print('mi-rec:', rec)
             if rec.record_type == 'result':
@@ -297,25 +437,102 @@ class gdb(object):
             elif rec.record_type == 'error':
                 self._gdb_quit()
             elif rec.record_type == 'stream':
-                if rec.type == 'console' or rec.type == 'log':
-                    for line in rec.value.splitlines():
-                        self.gdb_console(line)
-                if rec.type == 'target':
-                    self.output_buffer += rec.value
-                    last_lf = self.output_buffer.rfind('\n')
-                    if last_lf >= 0:
-                        lines = self.output_buffer[:last_lf]
-                        if self.trace:
-                            print('/// console output')
-                        for line in lines.splitlines():
-                            self.output(line)
-                        self.output_buffer = self.output_buffer[last_lf + 1:]
+                self._gdb_stream(rec.type, rec.value)
         except:
             if self.trace:
                 print('/// console output')
             for line in lines.splitlines():
                 self.output(line)
 
+class sessions(object):
+    '''A pool of gdb sessions kept running between tests. A test takes an
+    idle session for its gdb command and BSP or a new session is created, and
+    it returns the session when it finishes. A session that has an error or
+    times out is not reused. A forked process creates its own pool.'''
+
+    _lock = threading.Lock()
+    _sessions = None
+
+    @staticmethod
+    def get():
+        sessions._lock.acquire()
+        try:
+            if sessions._sessions is None or \
+               sessions._sessions.pid != os.getpid():
+                sessions._sessions = sessions()
+        finally:
+            sessions._lock.release()
+        return sessions._sessions
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.sessions = []
+        self.reused = 0
+
+    def session(self, command, bsp_arch, bsp, trace = False, mi_trace = False):
+        key = (command, bsp_arch, bsp)
+        self.lock.acquire()
+        try:
+            idle = self.idle.get(key, [])
+            while len(idle):
+                session = idle.pop()
+                if session.alive():
+                    session.trace = trace
+                    session.mi_trace = mi_trace
+                    self.reused += 1
+                    return session
+                session.close()
+            session = gdb(bsp_arch, bsp, trace, mi_trace, reuse = True)
+            session.pool_key = key
+            self.sessions += [session]
+        finally:
+            self.lock.release()
+        return session
+
+    def put(self, session):
+        self.lock.acquire()
+        try:
+            if session.alive():
+                if session.pool_key not in self.idle:
+                    self.idle[session.pool_key] = []
+                self.idle[session.pool_key] += [session]
+            else:
+                session.kill()
+        finally:
+            self.lock.release()
+
+    def started(self):
+        return len(self.sessions)
+
+    def startup_average(self):
+        '''The average time in seconds from starting gdb to its first
+        prompt.'''
+        self.lock.acquire()
+        try:
+            startups = [s.startup for s in self.sessions if s.startup > 0]
+            if len(startups) == 0:
+                return 0.0
+            return sum(startups) / len(startups)
+        finally:
+            self.lock.release()
+
+    def close(self):
+        self.lock.acquire()
+        try:
+            for session in self.sessions:
+                session.close()
+            for session in self.sessions:
+                if session.session is not None:
+                    session.session.join(2)
+                    if session.session.is_alive():
+                        session.kill()
+            self.idle = {}
+            self.sessions = []
+        finally:
+            self.lock.release()
+
 if __name__ == "__main__":
     stdtty = console.save()
     try:
@@ -63,11 +63,13 @@ class command_line(options.command_line):
         long_opts = {
             # key             macro            handler      param  defs   init
             '--target'     : ('_target',       "triplet",   True,  None,  False),
-            '--timeout'    : ('timeout',       "int",       True,  None,  False),
+            '--timeout'    : ('timeout',       "float",     True,  None,  False),
+            '--gdb-reuse'  : ('gdb_reuse',     "bool",      False, '0',   True),
         }
         long_opts_help = {
             '--target': 'Set the target triplet',
-            '--timeout': 'Set the test timeout in seconds (default 180 seconds)'
+            '--timeout': 'Set the test timeout in seconds (default 180 seconds)',
+            '--gdb-reuse': 'Reuse gdb sessions between tests'
         }
         super(command_line, self).__init__('rt', argv, optargs, defaults,
                                            long_opts, long_opts_help, command_path);
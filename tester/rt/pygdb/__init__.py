@@ -20,3 +20,4 @@ all = ['mi_parser']
 from . import mi_parser
 scan = mi_parser.scan
 process = mi_parser.process
+stream = mi_parser.stream
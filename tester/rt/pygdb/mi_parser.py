@@ -33,343 +33,321 @@ from __future__ import print_function
 import re
 import pprint
 
-from . import spark
-
-def __private():
-	class Token:
-		def __init__(self, type, value=None):
-			self.type = type
-			self.value = value
-		def __cmp__(self, o):
-			return cmp(self.type, o)
-		def __repr__(self):
-			return self.value or self.type
-
-	class AST:
-		def __init__(self, type):
-			self.type = type
-			self._kids = []
-		def __getitem__(self, i):
-			return self._kids[i]
-		def __len__(self):
-			return len(self._kids)
-		def __setslice__(self, low, high, seq):
-			self._kids[low:high] = seq
-		def __cmp__(self, o):
-			return cmp(self.type, o)
-
-	class GdbMiScannerBase(spark.GenericScanner):
-		def tokenize(self, input):
-			self.rv = []
-			spark.GenericScanner.tokenize(self, input)
-			return self.rv
-
-		def t_nl(self, s):
-			r'\n|\r\n'
-			self.rv.append(Token('nl'))
-
-		def t_whitespace(self, s):
-			r'[ \t\f\v]+'
-			pass
-
-		def t_symbol(self, s):
-			r',|\{|\}|\[|\]|\='
-			self.rv.append(Token(s, s))
-
-		def t_result_type(self, s):
-			r'\*|\+|\^'
-			self.rv.append(Token('result_type', s))
-
-		def t_stream_type(self, s):
-			r'\@|\&|\~'
-			self.rv.append(Token('stream_type', s))
-
-		def t_string(self, s):
-			r'[\w-]+'
-			self.rv.append(Token('string', s))
-
-		def t_c_string(self, s):
-			r'\".*?(?<![\\\\])\"'
-			inner = self.__unescape(s[1:len(s)-1])
-			self.rv.append(Token('c_string', inner))
-
-		def t_default(self, s):
-			r'( . | \n )+'
-			raise Exception("Specification error: unmatched input for '%s'" % s)
-
-		def __unescape(self, s):
-			s = re.sub(r'\\r', r'\r', s)
-			s = re.sub(r'\\n', r'\n', s)
-			s = re.sub(r'\\t', r'\t', s)
-			return re.sub(r'\\(.)', r'\1', s)
-
-
-	class GdbMiScanner(GdbMiScannerBase):
-		def t_token(self, s):
-			r'\d+'
-			self.rv.append(Token('token', s))
-
-	class GdbMiParser(spark.GenericASTBuilder):
-		def __init__(self):
-			spark.GenericASTBuilder.__init__(self, AST, 'output')
-
-		def p_output(self, args):
-			'''
-				output ::= record_list
-				record_list ::= generic_record
-				record_list ::= generic_record record_list
-				generic_record ::= result_record
-				generic_record ::= stream_record
-				result_record ::= result_header result_list nl
-				result_record ::= result_header nl
-				result_header ::= token result_type class
-				result_header ::= result_type class
-				result_header ::= token = class
-				result_header ::= = class
-				stream_record ::= stream_type c_string nl
-				result_list ::= , result result_list
-				result_list ::= , result
-				result_list ::= , tuple
-				result ::= variable = value
-				class ::= string
-				variable ::= string
-				value ::= const
-				value ::= tuple
-				value ::= list
-				value_list ::= , value
-				value_list ::= , value value_list
-				const ::= c_string
-				tuple ::= { }
-				tuple ::= { result }
-				tuple ::= { result result_list }
-				list ::= [ ]
-				list ::= [ value ]
-				list ::= [ value value_list ]
-				list ::= [ result ]
-				list ::= [ result result_list ]
-				list ::= { value }
-				list ::= { value value_list }
-			'''
-			pass
-
-		def terminal(self, token):
-			#  Homogeneous AST.
-			rv = AST(token.type)
-			rv.value = token.value
-			return rv
-
-		def nonterminal(self, type, args):
-			#  Flatten AST a bit by not making nodes if there's only one child.
-			exclude = [
-				'record_list'
-			]
-			if len(args) == 1 and type not in exclude:
-				return args[0]
-			return spark.GenericASTBuilder.nonterminal(self, type, args)
-
-		def error(self, token, i=0, tokens=None):
-			if i > 2:
-				print('%s %s %s %s' % (tokens[i-3], tokens[i-2], tokens[i-1], tokens[i]))
-			raise Exception("Syntax error at or near %d:'%s' token" % (i, token))
-
-	class GdbMiInterpreter(spark.GenericASTTraversal):
-		def __init__(self, ast):
-			spark.GenericASTTraversal.__init__(self, ast)
-			self.postorder()
-
-		def __translate_type(self, type):
-			table = {
-				'^': 'result',
-				'=': 'notify',
-				'+': 'status',
-				'*': 'exec',
-				'~': 'console',
-				'@': 'target',
-				'&': 'log'
-			}
-			return table[type]
-
-		def n_result(self, node):
-			# result ::= variable = value
-			node.value = { node[0].value: node[2].value }
-			#print 'result: %s' % node.value
-
-		def n_tuple(self, node):
-			if len(node) == 2:
-				# tuple ::= {}
-				node.value = {}
-			elif len(node) == 3:
-				# tuple ::= { result }
-				node.value = node[1].value
-			elif len(node) == 4:
-				# tuple ::= { result result_list }
-				node.value = node[1].value
-				for result in node[2].value:
-					for n, v in list(result.items()):
-						if n in node.value:
-							#print '**********list conversion: [%s] %s -> %s' % (n, node.value[n], v)
-							old = node.value[n]
-							if not isinstance(old, list):
-								node.value[n] = [ node.value[n] ]
-							node.value[n].append(v)
-						else:
-							node.value[n] = v
-			else:
-				raise Exception('Invalid tuple')
-			#print 'tuple: %s' % node.value
-
-		def n_list(self, node):
-			if len(node) == 2:
-				# list ::= []
-				node.value = []
-			elif len(node) == 3:
-				# list ::= [ value ]
-				node.value = [ node[1].value ]
-			elif len(node) == 4:
-				# list ::= [ value value_list ]
-				node.value = [ node[1].value ] + node[2].value
-				#list ::= [ result ]
-				#list ::= [ result result_list ]
-				#list ::= { value }
-				#list ::= { value value_list }
-			#print 'list %s' % node.value
-
-		def n_value_list(self, node):
-			if len(node) == 2:
-				#value_list ::= , value
-				node.value = [ node[1].value ]
-			elif len(node) == 3:
-				#value_list ::= , value value_list
-				node.value = [ node[1].value ] + node[2].value
-
-		def n_result_list(self, node):
-			if len(node) == 2:
-				# result_list ::= , result
-				node.value = [ node[1].value ]
-			else:
-				# result_list ::= , result result_list
-				node.value = [ node[1].value ] + node[2].value
-			#print 'result_list: %s' % node.value
-
-		def n_result_record(self, node):
-			node.value = node[0].value
-			if len(node) == 3:
-				# result_record ::= result_header result_list nl
-				node.value['results'] = node[1].value
-			elif len(node) == 2:
-				# result_record ::= result_header nl
-				pass
-			#print 'result_record: %s' % (node.value)
-
-		def n_result_header(self, node):
-			if len(node) == 3:
-				# result_header ::= token result_type class
-				node.value = {
-					'token': node[0].value,
-					'type': self.__translate_type(node[1].value),
-					'class_': node[2].value,
-					'record_type': 'result'
-				}
-			elif len(node) == 2:
-				# result_header ::= result_type class
-				node.value = {
-					'token': None,
-					'type': self.__translate_type(node[0].value),
-					'class_': node[1].value,
-					'record_type': 'result'
-				}
-
-		def n_stream_record(self, node):
-			# stream_record ::= stream_type c_string nl
-			node.value = {
-				'type': self.__translate_type(node[0].value),
-				'value': node[1].value,
-				'record_type': 'stream'
-			}
-			#print 'stream_record: %s' % node.value
-
-		def n_record_list(self, node):
-			if len(node) == 1:
-				# record_list ::= generic_record
-				node.value = [ node[0].value ]
-			elif len(node) == 2:
-				# record_list ::= generic_record record_list
-				node.value = [ node[0].value ] + node[1].value
-			#print 'record_list: %s' % node.value
-
-		#def default(self, node):
-			#print 'default: ' + node.type
+#
+# The GDB/MI output records are parsed by a recursive descent parser. The
+# parser has no global state so it can be used by more than one thread at a
+# time. The grammar is:
+#
+#	output ::= record_list
+#	record_list ::= generic_record
+#	record_list ::= generic_record record_list
+#	generic_record ::= result_record
+#	generic_record ::= stream_record
+#	result_record ::= result_header result_list nl
+#	result_record ::= result_header nl
+#	result_header ::= token result_type class
+#	result_header ::= result_type class
+#	result_header ::= token = class
+#	result_header ::= = class
+#	stream_record ::= stream_type c_string nl
+#	result_list ::= , result result_list
+#	result_list ::= , result
+#	result_list ::= , tuple
+#	result ::= variable = value
+#	class ::= string
+#	variable ::= string
+#	value ::= const
+#	value ::= tuple
+#	value ::= list
+#	value_list ::= , value
+#	value_list ::= , value value_list
+#	const ::= c_string
+#	tuple ::= { }
+#	tuple ::= { result }
+#	tuple ::= { result result_list }
+#	list ::= [ ]
+#	list ::= [ value ]
+#	list ::= [ value value_list ]
+#	list ::= [ result ]
+#	list ::= [ result result_list ]
+#	list ::= { value }
+#	list ::= { value value_list }
+#
 
-	class GdbDynamicObject:
-		def __init__(self, dict_):
-			self.graft(dict_)
+#
+# A C string ends at the first quote not escaped with a backslash.
+#
+_c_string = r'"([^"\n]*(?:(?<=\\)"[^"\n]*)*)(?<!\\)"'
 
-		def __repr__(self):
-			return pprint.pformat(self.__dict__)
+#
+# The scanner skips white space and any other character is an error.
+#
+_scanner = re.compile(r'[ \t\f\v]*(?:(\n|\r\n)|([,{}\[\]=])|([*+^])|([@&~])|' + \
+		      r'(\d+)|([\w-]+)|' + _c_string + r'|(.)|\Z)')
 
-		def __bool__(self):
-			return len(self.__dict__) > 0
+_scanner_types = [None, 'nl', 'symbol', 'result_type', 'stream_type',
+		  'token', 'string', 'c_string', 'error']
 
-		def __getitem__(self, i):
-			if i == 0 and len(self.__dict__) > 0:
-				return self
+#
+# A stream record is most of the output when a test is running so it has its
+# own pattern.
+#
+_stream_record = re.compile(r'[ \t\f\v]*([@&~])[ \t\f\v]*' + _c_string + \
+			    r'[ \t\f\v]*(?:\n|\r\n)\Z')
+
+_types = {
+	'^': 'result',
+	'=': 'notify',
+	'+': 'status',
+	'*': 'exec',
+	'~': 'console',
+	'@': 'target',
+	'&': 'log'
+}
+
+_escaped = re.compile(r'\\(.)')
+
+def _unescape(s):
+	if '\\' in s:
+		s = s.replace('\\r', '\r').replace('\\n', '\n').replace('\\t', '\t')
+		if '\\' in s:
+			s = _escaped.sub(lambda m: m.group(1), s)
+	return s
+
+class Token:
+	def __init__(self, type, value=None):
+		self.type = type
+		self.value = value
+	def __repr__(self):
+		return self.value or self.type
+
+def _tokenize(input):
+	'''Return the tokens in the input as a list of (type, value) tuples.'''
+	tokens = []
+	for m in _scanner.finditer(input):
+		index = m.lastindex
+		if index is None:
+			continue
+		type = _scanner_types[index]
+		value = m.group(index)
+		if type == 'c_string':
+			tokens.append((type, _unescape(value)))
+		elif type == 'symbol':
+			tokens.append((value, value))
+		elif type == 'nl':
+			tokens.append((type, None))
+		elif type == 'error':
+			raise Exception("Specification error: unmatched input for '%s'" % \
+					(input[m.start(index):]))
+		else:
+			tokens.append((type, value))
+	return tokens
+
+class _parser(object):
+	'''Parse a list of tokens into a list of records. A parser is used once.'''
+
+	def __init__(self, tokens):
+		self.tokens = tokens + [('eof', None)]
+		self.pos = 0
+
+	def _error(self):
+		type, value = self.tokens[self.pos]
+		raise Exception("Syntax error at or near %d:'%s' token" % \
+				(self.pos, value or type))
+
+	def _peek(self):
+		return self.tokens[self.pos][0]
+
+	def _expect(self, type):
+		token = self.tokens[self.pos]
+		if token[0] != type:
+			self._error()
+		self.pos += 1
+		return token[1]
+
+	def records(self):
+		records = [self._record()]
+		while self._peek() != 'eof':
+			records.append(self._record())
+		return records
+
+	def _record(self):
+		type, value = self.tokens[self.pos]
+		if type == 'stream_type':
+			self.pos += 1
+			record = {
+				'type': _types[value],
+				'value': self._expect('c_string'),
+				'record_type': 'stream'
+			}
+			self._expect('nl')
+			return record
+		token = None
+		if type == 'token':
+			token = value
+			self.pos += 1
+			type, value = self.tokens[self.pos]
+		if type != 'result_type' and type != '=':
+			self._error()
+		self.pos += 1
+		record = {
+			'token': token,
+			'type': _types[value],
+			'class_': self._expect('string'),
+			'record_type': 'result'
+		}
+		if self._peek() == ',':
+			record['results'] = self._result_list()
+		self._expect('nl')
+		return record
+
+	def _result_list(self):
+		results = []
+		while self._peek() == ',':
+			self.pos += 1
+			if self._peek() == '{':
+				results.append(self._tuple())
+				break
+			results.append(self._result())
+		return results
+
+	def _result(self):
+		variable = self._expect('string')
+		self._expect('=')
+		return { variable: self._value() }
+
+	def _value(self):
+		type, value = self.tokens[self.pos]
+		if type == 'c_string':
+			self.pos += 1
+			return value
+		if type == '{':
+			if self.tokens[self.pos + 1][0] in ['}', 'string']:
+				return self._tuple()
+			return self._list('{', '}')
+		if type == '[':
+			return self._list('[', ']')
+		self._error()
+
+	def _tuple(self):
+		self._expect('{')
+		if self._peek() == '}':
+			self.pos += 1
+			return {}
+		value = self._result()
+		if self._peek() == ',':
+			for result in self._result_list():
+				for n, v in list(result.items()):
+					if n in value:
+						old = value[n]
+						if not isinstance(old, list):
+							value[n] = [ value[n] ]
+						value[n].append(v)
+					else:
+						value[n] = v
+		self._expect('}')
+		return value
+
+	def _list(self, open, close):
+		self._expect(open)
+		if open == '[':
+			if self._peek() == ']':
+				self.pos += 1
+				return []
+			if self._peek() == 'string':
+				value = [ self._result() ]
+				if self._peek() == ',':
+					value += self._result_list()
+				self._expect(']')
+				return value
+		value = [ self._value() ]
+		while self._peek() == ',':
+			self.pos += 1
+			value.append(self._value())
+		self._expect(close)
+		return value
+
+class GdbDynamicObject:
+	def __init__(self, dict_):
+		self.graft(dict_)
+
+	def __repr__(self):
+		return pprint.pformat(self.__dict__)
+
+	def __bool__(self):
+		return len(self.__dict__) > 0
+
+	def __getitem__(self, i):
+		if i == 0 and len(self.__dict__) > 0:
+			return self
+		else:
+			raise IndexError
+
+	def __getattr__(self, name):
+		if name.startswith('__'):
+			raise AttributeError
+		return None
+
+	def graft(self, dict_):
+		for name, value in list(dict_.items()):
+			name = name.replace('-', '_')
+			if isinstance(value, dict):
+				value = GdbDynamicObject(value)
+			elif isinstance(value, list):
+				x = value
+				value = []
+				for item in x:
+					if isinstance(item, dict):
+						item = GdbDynamicObject(item)
+					value.append(item)
+			setattr(self, name, value)
+
+class GdbMiRecord:
+	def __init__(self, record):
+		self.result = None
+		for name, value in list(record[0].items()):
+			name = name.replace('-', '_')
+			if name == 'results':
+				for result in value:
+					if not self.result:
+						self.result = GdbDynamicObject(result)
+					else:
+						# graft this result to self.results
+						self.result.graft(result)
 			else:
-				raise IndexError
-
-		def __getattr__(self, name):
-			if name.startswith('__'):
-				raise AttributeError
-			return None
-
-		def graft(self, dict_):
-			for name, value in list(dict_.items()):
-				name = name.replace('-', '_')
-				if isinstance(value, dict):
-					value = GdbDynamicObject(value)
-				elif isinstance(value, list):
-					x = value
-					value = []
-					for item in x:
-						if isinstance(item, dict):
-							item = GdbDynamicObject(item)
-						value.append(item)
 				setattr(self, name, value)
 
-	class GdbMiRecord:
-		def __init__(self, record):
-			self.result = None
-			for name, value in list(record[0].items()):
-				name = name.replace('-', '_')
-				if name == 'results':
-					for result in value:
-						if not self.result:
-							self.result = GdbDynamicObject(result)
-						else:
-							# graft this result to self.results
-							self.result.graft(result)
-				else:
-					setattr(self, name, value)
-
-		def __repr__(self):
-			return pprint.pformat(self.__dict__)
-
-	return (GdbMiScanner(), GdbMiParser(), GdbMiInterpreter, GdbMiRecord)
-
-(__the_scanner, __the_parser, __the_interpreter, __the_output) = __private()
+	def __repr__(self):
+		return pprint.pformat(self.__dict__)
 
 def scan(input):
-	return __the_scanner.tokenize(input)
+	return [Token(type, value) for type, value in _tokenize(input)]
 
 def parse(tokens):
-	return __the_parser.parse(tokens)
+	return _parser([(t.type, t.value) for t in tokens]).records()
+
+def stream(input):
+	'''Return the type and value of a stream record or None if the input is
+	not a single stream record.'''
+	m = _stream_record.match(input)
+	if m is None:
+		return None
+	return _types[m.group(1)], _unescape(m.group(2))
 
 def process(input):
-	tokens = scan(input)
-	ast = parse(tokens)
-	__the_interpreter(ast)
-	return __the_output(ast.value)
+	s = stream(input)
+	if s is not None:
+		return GdbMiRecord([{
+			'type': s[0],
+			'value': s[1],
+			'record_type': 'stream'
+		}])
+	return GdbMiRecord(_parser(_tokenize(input)).records())
 
 if __name__ == '__main__':
+	import sys
+	import time
+
 	def main():
 		def print_tokens(tokens):
 			print()
@@ -385,9 +363,7 @@ if __name__ == '__main__':
 				tokens = scan(line + '\n')
 				#print_tokens(tokens)
 
-				ast = parse(tokens)
-				__the_interpreter(ast)
-				output = __the_output(ast.value)
+				output = process(line + '\n')
 				print(output)
 
 		x = '"No symbol table is loaded.  Use the \\"file\\" command."'
@@ -415,6 +391,38 @@ if __name__ == '__main__':
 '''
 		test6 = '10^done,stack-args={frame={level="0",args={}}},time={wallclock="0.00006",user="0.00004",system="0.00002",start="1210530442.460765",end="1210530442.460825"}\n'
 
+		def benchmark(transcript, loops):
+			if transcript is None:
+				lines = []
+				for test in [test1, test2, test3, test4, test5, test6]:
+					lines += [l + '\n' for l in test.splitlines()]
+				for l in range(0, 200):
+					lines += ['@"test output line %d: abcdefghijklmnopqrstuvwxyz\\n"\n' % (l)]
+			else:
+				with open(transcript) as f:
+					lines = f.readlines()
+			records = 0
+			errors = 0
+			start = time.time()
+			for loop in range(0, loops):
+				for line in lines:
+					try:
+						process(line)
+						records += 1
+					except:
+						errors += 1
+			elapsed = time.time() - start
+			print('benchmark: %d records, %d errors in %.3f secs: %.2f usecs/record' % \
+			      (records, errors, elapsed, elapsed * 1e6 / (records + errors)))
+
+		if len(sys.argv) > 1 and sys.argv[1] == 'benchmark':
+			if len(sys.argv) > 2:
+				transcript = sys.argv[2]
+			else:
+				transcript = None
+			benchmark(transcript, 100)
+			return
+
 		run_test(test1)
 		run_test(test2)
 		run_test(test3)
@@ -69,7 +69,9 @@ class report(object):
         msg += 'Invalid:       %*d%s' % (self.total_len, self.invalids, os.linesep)
         return msg
 
-    def start(self, index, total, name, executable, bsp_arch, bsp):
+    def start(self, index, total, name, executable, bsp_arch, bsp, start_time = None):
+        if start_time is None:
+            start_time = datetime.datetime.now()
         header = '[%*d/%*d] p:%-*d f:%-*d u:%-*d e:%-*d I:%-*d B:%-*d t:%-*d i:%-*d | %s/%s: %s' % \
                  (len(str(total)), index,
                   len(str(total)), total,
@@ -92,7 +94,7 @@ class report(object):
                                'bsp': bsp,
                                'bsp_arch': bsp_arch,
                                'exe': executable,
-                               'start': datetime.datetime.now(),
+                               'start': start_time,
                                'end': None,
                                'result': None,
                                'output': None,
@@ -101,7 +103,9 @@ class report(object):
         self.lock.release()
         log.notice(header, stdout_only = True)
 
-    def end(self, name, output):
+    def end(self, name, output, end_time = None):
+        if end_time is None:
+            end_time = datetime.datetime.now()
         start = False
         end = False
         state = None
@@ -126,7 +130,7 @@ class report(object):
         if self.results[name]['end'] is not None:
             self.lock.release()
             raise error.general('test already finished: %s' % (name))
-        self.results[name]['end'] = datetime.datetime.now()
+        self.results[name]['end'] = end_time
         if state is None:
             if start and end:
                 if state is None:
@@ -171,6 +175,16 @@ class report(object):
             self.name_max_len = len(path.basename(name))
         self.lock.release()
 
+    def result(self, name):
+        '''The result of a finished test else None.'''
+        self.lock.acquire()
+        try:
+            if name not in self.results:
+                return None
+            return self.results[name]['result']
+        finally:
+            self.lock.release()
+
     def log(self, name, mode):
         if mode != 'none':
             self.lock.acquire()
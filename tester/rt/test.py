@@ -33,10 +33,17 @@ from __future__ import print_function
 import copy
 import datetime
 import fnmatch
+import multiprocessing
 import os
+try:
+    import Queue
+    queue = Queue
+except ImportError:
+    import queue
+import signal
 import sys
 import threading
-import time
+import traceback
 
 from rtemstoolkit import error
 from rtemstoolkit import log
@@ -44,9 +51,11 @@ from rtemstoolkit import path
 from rtemstoolkit import stacktraces
 from rtemstoolkit import version
 
+from . import boards
 from . import bsps
 from . import config
 from . import console
+from . import gdb
 from . import options
 from . import report
 
@@ -96,7 +105,8 @@ else:
 """)
 
 class test(object):
-    def __init__(self, index, total, report, executable, rtems_tools, bsp, bsp_config, opts):
+    def __init__(self, index, total, report, executable, rtems_tools, bsp, bsp_config, opts,
+                 board = None):
         self.index = index
         self.total = total
         self.report = report
@@ -117,9 +127,17 @@ class test(object):
             if not path.isdir(rtems_tools_bin):
                 raise error.general('cannot find RTEMS tools path: %s' % (rtems_tools_bin))
             self.opts.defaults['rtems_tools'] = rtems_tools_bin
+        self.board = board
+        self.board_failure = None
+        if board is not None:
+            board.apply(self.opts.defaults, bsp)
         self.config = config.file(self.report, self.bsp_config, self.opts)
 
     def run(self):
+        if self.board is not None:
+            self.board_failure = self.board.reset(self.opts.defaults)
+            if self.board_failure is not None:
+                return
         if self.config:
             self.config.run()
 
@@ -128,9 +146,12 @@ class test(object):
             self.config.kill()
 
 class test_run(object):
-    def __init__(self, index, total, report, executable, rtems_tools, bsp, bsp_config, opts):
+    def __init__(self, index, total, report, executable, rtems_tools, bsp, bsp_config, opts,
+                 completed = None, board = None):
         self.test = None
         self.result = None
+        self.board = board
+        self.board_failure = None
         self.start_time = None
         self.end_time = None
         self.index = copy.copy(index)
@@ -141,6 +162,7 @@ class test_run(object):
         self.bsp = bsp
         self.bsp_config = bsp_config
         self.opts = opts
+        self.completed = completed
 
     def runner(self):
         self.start_time = datetime.datetime.now()
@@ -148,13 +170,16 @@ class test_run(object):
             self.test = test(self.index, self.total, self.report,
                              self.executable, self.rtems_tools,
                              self.bsp, self.bsp_config,
-                             self.opts)
+                             self.opts, self.board)
             self.test.run()
+            self.board_failure = self.test.board_failure
         except KeyboardInterrupt:
             pass
         except:
             self.result = sys.exc_info()
         self.end_time = datetime.datetime.now()
+        if self.completed is not None:
+            self.completed.put(self)
 
     def run(self):
         self.thread = threading.Thread(target = self.runner,
@@ -172,6 +197,189 @@ class test_run(object):
         if self.test:
             self.test.kill()
 
+#
+# The process executor runs each test in a worker process of a process
+# pool. The workers are forked after the options are loaded so the options
+# are inherited and only the test details are sent to a worker. The report
+# calls a test makes are held in the worker and returned to the tester's
+# report when the test finishes.
+#
+_process_opts = None
+_process_test = None
+
+class _report_capture(object):
+    '''Hold a test's report data in a worker process.'''
+
+    def __init__(self):
+        self.started = None
+        self.ended = None
+
+    def start(self, index, total, name, executable, bsp_arch, bsp, start_time = None):
+        if start_time is None:
+            start_time = datetime.datetime.now()
+        self.started = (index, total, name, executable, bsp_arch, bsp,
+                        start_time)
+
+    def end(self, name, output, end_time = None):
+        if end_time is None:
+            end_time = datetime.datetime.now()
+        self.ended = (name, output, end_time)
+
+def _process_terminate(signum, frame):
+    if _process_test is not None:
+        _process_test.kill()
+    os._exit(1)
+
+def _process_init():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _process_terminate)
+
+def _process_runner(index, total, executable, rtems_tools, bsp, bsp_config,
+                    board):
+    global _process_test
+    reports = _report_capture()
+    result = None
+    try:
+        _process_test = test(index, total, reports,
+                             executable, rtems_tools,
+                             bsp, bsp_config,
+                             _process_opts, board)
+        _process_test.run()
+        if _process_test.board_failure is not None:
+            result = ('board', _process_test.board_failure)
+    except KeyboardInterrupt:
+        pass
+    except error.general as gerr:
+        result = ('general', str(gerr))
+    except error.internal as ierr:
+        result = ('internal', str(ierr))
+    except:
+        result = ('internal', 'internal error: %s' % (traceback.format_exc()))
+    _process_test = None
+    log.flush()
+    return (reports.started, reports.ended, result)
+
+def _process_pool(jobs, opts):
+    global _process_opts
+    _process_opts = opts
+    if hasattr(multiprocessing, 'get_context'):
+        try:
+            mp = multiprocessing.get_context('fork')
+        except ValueError:
+            raise error.general('process executor not supported on this host')
+    elif os.name == 'nt':
+        raise error.general('process executor not supported on this host')
+    else:
+        mp = multiprocessing
+    #
+    # Do not fork with the log writer running as it holds the log's lock
+    # when writing.
+    #
+    log.default.stop_writer()
+    try:
+        pool = mp.Pool(processes = jobs, initializer = _process_init)
+    finally:
+        log.default.start_writer()
+    return pool
+
+#
+# A worker that dies does not complete its task. A test whose result is not
+# ready this many seconds after its timeout, or after twice its timeout when
+# its board is reset, is given up on.
+#
+_process_lost_margin = 60
+
+class test_run_process(test_run):
+    '''Run a test in a worker process of a process pool.'''
+
+    def __init__(self, index, total, report, executable, rtems_tools, bsp, bsp_config, opts,
+                 completed = None, pool = None, board = None):
+        super(test_run_process, self).__init__(index, total, report,
+                                               executable, rtems_tools,
+                                               bsp, bsp_config, opts,
+                                               completed, board)
+        self.pool = pool
+        self.running = False
+        self.async_result = None
+        self.lock = threading.Lock()
+
+    def _complete(self):
+        '''Return True if the test was running and is now complete. The
+        test is completed once by the result or by being given up on.'''
+        self.lock.acquire()
+        try:
+            running = self.running
+            self.running = False
+            return running
+        finally:
+            self.lock.release()
+
+    def _finished(self, results):
+        if not self._complete():
+            return
+        started, ended, self.result = results
+        if self.result is not None and self.result[0] == 'board':
+            self.board_failure = self.result[1]
+            self.result = None
+        try:
+            if started is not None:
+                self.report.start(*started)
+            if ended is not None:
+                self.report.end(*ended)
+        except error.general as gerr:
+            self.result = ('general', str(gerr))
+        self.end_time = datetime.datetime.now()
+        if self.completed is not None:
+            self.completed.put(self)
+
+    def _failed(self, why):
+        if not self._complete():
+            return
+        self.result = ('internal', 'internal error: %s: %s' % \
+                       (path.basename(self.executable), why))
+        self.end_time = datetime.datetime.now()
+        if self.completed is not None:
+            self.completed.put(self)
+
+    def run(self):
+        self.start_time = datetime.datetime.now()
+        timeout = float(self.opts.defaults.expand('%{timeout}'))
+        if self.board is not None:
+            timeout *= 2
+        self.lost_time = self.start_time + \
+            datetime.timedelta(seconds = timeout + _process_lost_margin)
+        self.running = True
+        kwargs = { 'callback': self._finished }
+        if sys.version_info[0] >= 3:
+            kwargs['error_callback'] = lambda e: self._failed('worker: %s' % (e))
+        self.async_result = \
+            self.pool.apply_async(_process_runner,
+                                  (self.index, self.total, self.executable,
+                                   self.rtems_tools, self.bsp, self.bsp_config,
+                                   self.board),
+                                  **kwargs)
+
+    def check_lost(self):
+        '''Give up on the test if its result is not ready in time. The
+        worker running it has died.'''
+        if self.running and not self.async_result.ready() and \
+           datetime.datetime.now() > self.lost_time:
+            self._failed('worker lost, no result after %s' % \
+                         (str(self.lost_time - self.start_time)))
+
+    def is_alive(self):
+        return self.running
+
+    def reraise(self):
+        if self.result is not None:
+            kind, msg = self.result
+            if kind == 'general':
+                err = error.general('')
+            else:
+                err = error.internal('')
+            err.set_output(msg)
+            raise err
+
 def find_executables(paths, glob, path_to_builddir):
     executables = []
     for p in paths:
@@ -228,6 +436,17 @@ def list_bsps(opts):
         log.notice('  %s' % (path.basename(bsp[:-3])))
     raise error.exit()
 
+def _board_failure(tst, reports):
+    '''Return the reason a test failed its board else None. A test that
+    timed out or had no console output fails its board.'''
+    if tst.board_failure is not None:
+        return tst.board_failure
+    if tst.result is None:
+        result = reports.result(tst.executable)
+        if result in ['timeout', 'invalid']:
+            return 'test %s: %s' % (path.basename(tst.executable), result)
+    return None
+
 def killall(tests):
     for test in tests:
         test.kill()
@@ -237,6 +456,7 @@ def run(command_path = None):
     tests = []
     stdtty = console.save()
     opts = None
+    pool = None
     default_exefilter = '*.exe'
     try:
         optargs = { '--rtems-tools': 'The path to the RTEMS tools',
@@ -247,10 +467,12 @@ def run(command_path = None):
                     '--filter':      'Glob that executables must match to run (default: ' +
                               default_exefilter + ')',
                     '--stacktrace':  'Dump a stack trace on a user termination (^C)',
+                    '--executor':    'Test executor, thread (default) or process',
                     '--rtems-builddir': 'Include path to the bsp build directory'} 
         opts = options.load(sys.argv,
                             optargs = optargs,
                             command_path = command_path)
+        log.default.start_writer()
         log.notice('RTEMS Testing - Tester, %s' % (version.str()))
         if opts.find_arg('--list-bsps'):
             bsps.list(opts)
@@ -304,6 +526,7 @@ def run(command_path = None):
                 raise error.general("Covoar not found!")
             coverage = coverage.coverage_run(opts.defaults, path_to_builddir[1])
             coverage.prepareEnvironment()
+            coverage.startAccumulator()
         report_mode = opts.find_arg('--report-mode')
         if report_mode:
             if report_mode[1] != 'failures' and \
@@ -313,6 +536,13 @@ def run(command_path = None):
             report_mode = report_mode[1]
         else:
             report_mode = 'failures'
+        executor = opts.find_arg('--executor')
+        if executor:
+            if len(executor) != 2 or executor[1] not in ['thread', 'process']:
+                raise error.general('invalid executor, can be: thread,process')
+            executor = executor[1]
+        else:
+            executor = 'thread'
         executables = find_executables(opts.params(), exe_filter, path_to_builddir[1])
         if len(executables) == 0:
             raise error.general('no executables supplied')
@@ -323,38 +553,94 @@ def run(command_path = None):
         jobs = int(opts.jobs(opts.defaults['_ncpus']))
         exe = 0
         finished = []
+        #
+        # Each test run posts itself to the completed queue when it finishes
+        # so a free job slot is filled as soon as a test ends. The get has a
+        # timeout so a user termination (^C) is seen with Python 2.
+        #
+        completed = queue.Queue()
+        #
+        # A BSP with boards runs a test on each free board. A test that
+        # fails because of its board is requeued to run on another board.
+        #
+        farm = boards.farm(opts.defaults)
+        if len(farm) > 0:
+            jobs = min(jobs, len(farm))
+        requeued = []
         if jobs > len(executables):
             jobs = len(executables)
-        while exe < total or len(tests) > 0:
-            if exe < total and len(tests) < jobs:
-                tst = test_run(exe + 1, total, reports,
-                               executables[exe],
-                               rtems_tools, bsp, bsp_config,
-                               opts)
-                exe += 1
+        if executor == 'process':
+            pool = _process_pool(jobs, opts)
+        while exe < total or len(requeued) > 0 or len(tests) > 0:
+            starting = (exe < total or len(requeued) > 0) and len(tests) < jobs
+            board = None
+            if starting and len(farm) > 0:
+                board = farm.acquire()
+                if board is None and len(tests) == 0:
+                    raise error.general('no boards available')
+                starting = board is not None
+            if starting:
+                if len(requeued) > 0:
+                    index, executable = requeued.pop(0)
+                else:
+                    exe += 1
+                    index, executable = exe, executables[exe - 1]
+                if pool is not None:
+                    tst = test_run_process(index, total, reports,
+                                           executable,
+                                           rtems_tools, bsp, bsp_config,
+                                           opts, completed, pool, board)
+                else:
+                    tst = test_run(index, total, reports,
+                                   executable,
+                                   rtems_tools, bsp, bsp_config,
+                                   opts, completed, board)
                 tests += [tst]
                 if job_trace:
                     _job_trace(tst, 'create',
                                total, exe, tests, reporting)
                 tst.run()
             else:
-                dead = [t for t in tests if not t.is_alive()]
+                dead = []
+                try:
+                    dead += [completed.get(timeout = 1)]
+                    while True:
+                        dead += [completed.get(block = False)]
+                except queue.Empty:
+                    pass
+                if pool is not None:
+                    for tst in tests:
+                        tst.check_lost()
                 tests[:] = [t for t in tests if t not in dead]
                 for tst in dead:
                     if job_trace:
                         _job_trace(tst, 'dead',
                                    total, exe, tests, reporting)
+                    if tst.board is not None:
+                        farm.release(tst.board,
+                                     _board_failure(tst, reports))
+                        if tst.board_failure is not None:
+                            requeued += [(tst.index, tst.executable)]
+                        if farm.available() == 0 and \
+                           (exe < total or len(requeued) > 0):
+                            raise error.general('no boards available')
+                        if tst.board_failure is not None:
+                            continue
                     finished += [tst]
+                    if coverage_enabled:
+                        coverage.accumulate(tst.executable)
                     tst.reraise()
                 del dead
-                if len(tests) >= jobs or exe >= total:
-                    time.sleep(0.250)
                 if len(finished):
                     reporting = report_finished(reports,
                                                 report_mode,
                                                 reporting,
                                                 finished,
                                                 job_trace)
+        if pool is not None:
+            pool.close()
+            pool.join()
+            pool = None
         finished_time = datetime.datetime.now()
         reporting = report_finished(reports, report_mode,
                                     reporting, finished, job_trace)
@@ -365,19 +651,35 @@ def run(command_path = None):
         end_time = datetime.datetime.now()
         log.notice('Average test time: %s' % (str((end_time - start_time) / total)))
         log.notice('Testing time     : %s' % (str(end_time - start_time)))
+        if len(farm) > 0:
+            farm.summary()
+        gdb_sessions = gdb.sessions.get()
+        if gdb_sessions.started():
+            startup = gdb_sessions.startup_average()
+            saved = gdb_sessions.reused * startup
+            log.notice('GDB sessions     : %d started, %d reused' % \
+                       (gdb_sessions.started(), gdb_sessions.reused))
+            log.notice('GDB start time   : %s average, %s saved (all jobs)' % \
+                       (str(datetime.timedelta(seconds = startup)),
+                        str(datetime.timedelta(seconds = saved))))
         if coverage_enabled:
             coverage.config_map = opts.defaults.macros['coverage']
             coverage.executables = executables
+            coverage.jobs = opts.jobs(opts.defaults['_ncpus'])
             coverage.run()
     except error.general as gerr:
+        log.flush()
         print(gerr)
         sys.exit(1)
     except error.internal as ierr:
+        log.flush()
         print(ierr)
         sys.exit(1)
     except error.exit:
+        log.flush()
         sys.exit(2)
     except KeyboardInterrupt:
+        log.flush()
         if opts is not None and opts.find_arg('--stacktrace'):
             print('}} dumping:', threading.active_count())
             for t in threading.enumerate():
@@ -387,6 +689,10 @@ def run(command_path = None):
         killall(tests)
         sys.exit(1)
     finally:
+        if pool is not None:
+            pool.terminate()
+        gdb.sessions.get().close()
+        log.flush()
         console.restore(stdtty)
     sys.exit(0)
 